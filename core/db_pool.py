@@ -0,0 +1,78 @@
+"""
+Состояние соединений с БД для /api/metrics/ и /api/ready/.
+
+Режим задается DB_POOL_MODE (см. settings). При pool статистика берется
+из пула psycopg (ConnectionPool.get_stats): размер, занятые и свободные
+соединения, ожидающие запросы, число ожиданий и их суммарное время,
+таймауты получения соединения, потерянные соединения. Пул у каждого
+процесса gunicorn свой, поэтому значения относятся к воркеру, который
+ответил на запрос.
+
+В режимах persistent и pgbouncer считается число новых соединений
+(сигнал connection_created): если оно растет вместе с числом запросов,
+соединения не переиспользуются (обрывы, неверный DB_CONN_MAX_AGE).
+"""
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+CONNECTIONS_OPENED = 'db.connections_opened'
+
+
+def _pool_mode():
+    return getattr(settings, 'DB_POOL_MODE', 'persistent')
+
+
+def _connection_opened(sender, connection, **kwargs):
+    metrics.incr(CONNECTIONS_OPENED)
+
+
+if _pool_mode() != 'pool':
+    # В режиме pool сигнал приходит на каждую выдачу соединения из пула
+    metrics.register(CONNECTIONS_OPENED)
+    connection_created.connect(_connection_opened, dispatch_uid='core.db_pool.connection_opened')
+
+
+def pool_stats(alias='default') -> dict:
+    """
+    Статистика соединений.
+
+    Returns:
+        dict: mode; для pool - open и у открытого пула min_size, max_size,
+              size, in_use, available, waiting (ждут сейчас), waits (всего
+              ожиданий), wait_ms, timeouts, connections_lost
+    """
+    stats = {'mode': _pool_mode()}
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return stats
+    # Django открывает пул при первом запросе к БД
+    stats['open'] = not pool.closed
+    if pool.closed:
+        return stats
+    raw = pool.get_stats()
+    size = raw.get('pool_size', 0)
+    available = raw.get('pool_available', 0)
+    stats.update({
+        'min_size': raw.get('pool_min', 0),
+        'max_size': raw.get('pool_max', 0),
+        'size': size,
+        'in_use': size - available,
+        'available': available,
+        'waiting': raw.get('requests_waiting', 0),
+        'waits': raw.get('requests_queued', 0),
+        'wait_ms': raw.get('requests_wait_ms', 0),
+        'timeouts': raw.get('requests_errors', 0),
+        'connections_lost': raw.get('connections_lost', 0),
+    })
+    return stats
+
+
+def check_db_pool():
+    """Проверка готовности: degraded, если запросы ждут соединение из исчерпанного пула."""
+    stats = pool_stats()
+    exhausted = stats.get('waiting', 0) > 0 and stats.get('available', 0) == 0
+    return {'status': 'degraded' if exhausted else 'ok', **stats}
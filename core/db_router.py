@@ -0,0 +1,137 @@
+"""
+Чтение с реплики PostgreSQL (REPLICA_DATABASE_URL).
+
+Запросы, которые только читают (списки и карточки отчетов, выгрузки,
+сводки ревизий, продажи по дням, статистика ассистента), идут на
+базу 'replica'; запись, расчет и утверждение ревизий - всегда на
+основную 'default'. Куда читать, решает флаг контекста: его ставят
+ReplicaReadMixin у ViewSet и read_from_replica() в функциях-view,
+ReplicaRouter только смотрит на флаг.
+
+Read-your-writes: после успешного изменяющего запроса пользователь
+REPLICA_READ_YOUR_WRITES_SECONDS секунд читает с основной базы
+(метка в кэше, общем для воркеров), поэтому отставание реплики
+не показывает ему старые данные. POST-view, которые ничего не пишут
+(чат ассистента), помечаются @read_only_view и пользователя не
+привязывают. Без REPLICA_DATABASE_URL все читается с default.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics
+
+REPLICA_ALIAS = 'replica'
+# Кэш в БД (CACHE_BACKEND=db) и сессии всегда читаются с default: метка
+# read-your-writes и счетчики не должны зависеть от отставания реплики
+PRIMARY_ONLY_APPS = {'django_cache', 'sessions'}
+REPLICA_REQUESTS = 'db.replica_requests'
+PRIMARY_PINNED = 'db.primary_pinned'
+metrics.register(REPLICA_REQUESTS, PRIMARY_PINNED)
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'db:read-primary:{user_id}'
+
+
+def remember_write(user):
+    """Пользователь что-то изменил: ближайшее время читать с основной базы."""
+    if not replica_configured() or not getattr(user, 'is_authenticated', False):
+        return
+    cache.set(_pin_key(user.pk), 1, timeout=settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+
+def read_only_view(view_func):
+    """
+    Изменяющий метод, но без записи в БД: запрос не привязывает
+    пользователя к основной базе (см. ReadYourWritesMiddleware).
+    Ставится поверх @api_view.
+    """
+    view_func.db_read_only = True
+    return view_func
+
+
+def can_read_from_replica(user) -> bool:
+    """Реплика настроена и пользователь недавно ничего не менял."""
+    if not replica_configured():
+        return False
+    if getattr(user, 'is_authenticated', False) and cache.get(_pin_key(user.pk)) is not None:
+        metrics.incr(PRIMARY_PINNED)
+        return False
+    metrics.incr(REPLICA_REQUESTS)
+    return True
+
+
+def read_alias() -> str:
+    """База для чтения в текущем контексте."""
+    return REPLICA_ALIAS if _read_from_replica.get() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_from_replica(user):
+    """Читать с реплики внутри блока (для функций-view, которые ничего не пишут)."""
+    token = _read_from_replica.set(can_read_from_replica(user))
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение - по флагу контекста, запись - всегда на default."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        # Явно, а не None: иначе объект, прочитанный с реплики, тянул бы
+        # с нее же связанные объекты и после выхода из блока
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия default, объекты из обеих баз связаны
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Mixin для ViewSet: неизменяющие запросы к действиям из
+    replica_actions читаются с реплики.
+    """
+
+    replica_actions = ('list', 'retrieve', 'export')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and self.action in self.replica_actions:
+            self._replica_token = _read_from_replica.set(can_read_from_replica(request.user))
+
+    def dispatch(self, request, *args, **kwargs):
+        # Не finalize_response: при необработанном исключении он не вызывается
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            token = getattr(self, '_replica_token', None)
+            if token is not None:
+                self._replica_token = None
+                _read_from_replica.reset(token)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if _read_from_replica.get():
+            # export читает queryset уже после выхода из view (StreamingHttpResponse)
+            queryset = queryset.using(REPLICA_ALIAS)
+        return queryset
@@ -0,0 +1,84 @@
+"""
+Потоковая выгрузка queryset в JSON / JSON Lines / CSV.
+
+GET /api/<resource>/export/?format=json|jsonl|csv|xlsx
+
+Queryset читается через values_list().iterator(chunk_size=...), строки
+сразу пишутся в StreamingHttpResponse, поэтому потребление памяти
+не зависит от количества строк.
+"""
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+
+from .renderers import EXPORT_RENDERERS
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_export_rows(queryset, export_fields, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Построчно прочитать queryset.
+
+    Args:
+        queryset: исходный queryset
+        export_fields: ((колонка, lookup) | (колонка, lookup, transform), ...)
+        chunk_size: размер пачки для iterator()
+
+    Yields:
+        dict {колонка: значение}
+    """
+    lookups = []
+    columns = []
+    for spec in export_fields:
+        column, lookup = spec[0], spec[1]
+        transform = spec[2] if len(spec) > 2 else None
+        if lookup not in lookups:
+            lookups.append(lookup)
+        columns.append((column, lookups.index(lookup), transform))
+
+    values = queryset.prefetch_related(None).values_list(*lookups)
+    for row in values.iterator(chunk_size=chunk_size):
+        yield {
+            column: transform(row[index]) if transform else row[index]
+            for column, index, transform in columns
+        }
+
+
+class StreamingExportMixin:
+    """
+    Mixin для ViewSet: action export с потоковой выгрузкой.
+
+    export_fields = (('id', 'id'), ('unit_display', 'ingredient__unit', dict(CHOICES_UNIT).get), ...)
+    """
+
+    export_fields = ()
+    export_filename = 'export'
+    export_chunk_size = DEFAULT_EXPORT_CHUNK_SIZE
+
+    def get_export_rows(self, queryset):
+        return iter_export_rows(queryset, self.export_fields, self.export_chunk_size)
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Потоковая выгрузка с учетом фильтров списка.
+
+        GET /api/<resource>/export/?format=json|jsonl|csv|xlsx
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        columns = [spec[0] for spec in self.export_fields]
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(self.get_export_rows(queryset), columns),
+            content_type=content_type,
+        )
+        if renderer.format != 'json':
+            response['Content-Disposition'] = (
+                f'attachment; filename="{self.export_filename}.{renderer.format}"'
+            )
+        return response
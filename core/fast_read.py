@@ -0,0 +1,126 @@
+"""
+Быстрое чтение списков через values_list().
+
+Для read-only списков основное время уходит на создание экземпляров
+моделей и обход полей ModelSerializer по каждой строке. ValuesReader
+по полям serializer один раз строит список колонок (source 'ingredient.title'
+→ lookup 'ingredient__title', 'get_unit_display' → колонка unit + choices)
+и формирует тот же JSON напрямую из кортежей values_list().
+
+Поддерживаются только плоские поля: SerializerMethodField и вложенные
+serializers не поддерживаются.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+_readers = {}
+
+
+class _Column:
+    __slots__ = ('name', 'index', 'guard_index', 'convert')
+
+    def __init__(self, name, index, guard_index, convert):
+        self.name = name
+        self.index = index
+        self.guard_index = guard_index
+        self.convert = convert
+
+
+class ValuesReader:
+    """Формирует вывод serializer_class из values_list() без создания моделей."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.lookups = []
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.columns.append(self._build_column(name, field))
+
+    def _lookup_index(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def _build_column(self, name, field):
+        if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+            raise ImproperlyConfigured(
+                f'{self.serializer_class.__name__}.{name}: поле не поддерживается ValuesReader'
+            )
+
+        parts = field.source.split('.')
+        model = self.model
+        path = []
+        guard = None
+        for position, part in enumerate(parts):
+            is_last = position == len(parts) - 1
+            if is_last and part.startswith('get_') and part.endswith('_display'):
+                model_field = model._meta.get_field(part[len('get_'):-len('_display')])
+                choices = dict(model_field.flatchoices)
+                index = self._lookup_index('__'.join(path + [model_field.name]))
+                return _Column(name, index, guard, lambda value, choices=choices: str(choices.get(value, value)))
+
+            model_field = model._meta.get_field(part)
+            if model_field.is_relation and not is_last:
+                path.append(part)
+                if model_field.null and guard is None:
+                    # DRF пропускает поле, если промежуточная связь пустая
+                    guard = self._lookup_index('__'.join(path[:-1] + [model_field.attname]))
+                model = model_field.related_model
+                continue
+
+            index = self._lookup_index('__'.join(path + [part]))
+            if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+                return _Column(name, index, guard, None)
+            return _Column(name, index, guard, field.to_representation)
+
+        raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name}: не удалось определить колонку')
+
+    def iter_rows(self, queryset, chunk_size=None):
+        """Построчно отдать dict в формате serializer."""
+        values = queryset.prefetch_related(None).values_list(*self.lookups)
+        if chunk_size:
+            values = values.iterator(chunk_size=chunk_size)
+        columns = self.columns
+        for row in values:
+            item = {}
+            for column in columns:
+                if column.guard_index is not None and row[column.guard_index] is None:
+                    continue
+                value = row[column.index]
+                if value is not None and column.convert is not None:
+                    value = column.convert(value)
+                item[column.name] = value
+            yield item
+
+    def read(self, queryset):
+        """Прочитать весь queryset списком."""
+        return list(self.iter_rows(queryset))
+
+
+def get_values_reader(serializer_class) -> ValuesReader:
+    """ValuesReader для serializer_class (строится один раз на процесс)."""
+    reader = _readers.get(serializer_class)
+    if reader is None:
+        reader = _readers[serializer_class] = ValuesReader(serializer_class)
+    return reader
+
+
+class ValuesListMixin:
+    """
+    Mixin для ViewSet: list() через ValuesReader вместо ModelSerializer.
+
+    При включенной пагинации используется обычный list().
+    """
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = get_values_reader(self.get_serializer_class())
+        return Response(reader.read(queryset))
@@ -0,0 +1,48 @@
+"""
+Простые счетчики для мониторинга.
+
+Счетчики хранятся в общем кэше (settings.CACHES['default']), поэтому при
+file/db-кэше их видят все воркеры gunicorn. Имена счетчиков регистрируются
+при импорте модулей, которые их используют, и отдаются через /api/metrics/.
+"""
+
+import logging
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+METRICS_CACHE_ALIAS = 'default'
+_KEY_PREFIX = 'metrics:'
+_registered = set()
+
+
+def register(*names):
+    """Зарегистрировать имена счетчиков, чтобы они попадали в snapshot()."""
+    _registered.update(names)
+
+
+def incr(name, delta=1):
+    """Увеличить счетчик. Ошибки кэша не должны ломать запрос."""
+    _registered.add(name)
+    cache = caches[METRICS_CACHE_ALIAS]
+    key = _KEY_PREFIX + name
+    try:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+    except ValueError:
+        # Ключ истек между add() и incr()
+        cache.set(key, delta, timeout=None)
+    except Exception as e:
+        logger.warning(f"Не удалось обновить метрику {name}: {e}")
+
+
+def snapshot() -> dict:
+    """Текущие значения всех зарегистрированных счетчиков."""
+    names = sorted(_registered)
+    try:
+        values = caches[METRICS_CACHE_ALIAS].get_many([_KEY_PREFIX + name for name in names])
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать метрики: {e}")
+        values = {}
+    return {name: values.get(_KEY_PREFIX + name, 0) for name in names}
@@ -0,0 +1,44 @@
+"""
+Middleware проекта.
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+
+from . import db_router, readiness
+
+
+class InFlightRequestsMiddleware:
+    """Учитывает запросы в работе для проверки готовности (/api/ready/)."""
+
+    # Сами пробы балансировщика не учитываются
+    skip_paths = ('/api/ready/', '/api/health/')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path in self.skip_paths:
+            return self.get_response(request)
+        token = readiness.request_started()
+        try:
+            return self.get_response(request)
+        finally:
+            readiness.request_finished(token)
+
+
+class ReadYourWritesMiddleware:
+    """После успешного изменяющего запроса пользователь читает с основной БД (см. core/db_router.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # request.user здесь уже с учетом аутентификации DRF (токен и т.п.)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and not getattr(request, 'db_read_only', False)):
+            db_router.remember_write(getattr(request, 'user', None))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.db_read_only = getattr(view_func, 'db_read_only', False)
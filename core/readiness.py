@@ -0,0 +1,191 @@
+"""
+Проверки готовности воркера для GET /api/ready/.
+
+В отличие от /api/health/ (процесс жив) readiness показывает, может ли
+воркер обслуживать запросы: доступна ли БД и с какой задержкой, не
+исчерпан ли пул соединений, работает ли кэш, сколько запросов воркер
+обрабатывает сейчас и как долго идет самый старый из них. Другие модули
+добавляют свои проверки через register_check() (например, очередь задач
+импорта).
+
+Проверки выполняются параллельно в пуле потоков (по потоку на проверку)
+и ограничены общим бюджетом READINESS_TIMEOUT; не успевшая проверка
+получает статус timeout. Зависшая проверка (например, connect к БД)
+не запускается повторно, пока не завершится: следующие вызовы ждут ту же
+задачу, поэтому она занимает один поток и не задерживает остальные. Итог:
+    ok       - 200
+    degraded - 200 (работает, но медленно / без кэша / очередь растет)
+    fail     - 503 (критичная проверка упала или не уложилась в бюджет)
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from .db_pool import check_db_pool
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_DEGRADED = 'degraded'
+STATUS_FAIL = 'fail'
+_SEVERITY = {STATUS_OK: 0, STATUS_DEGRADED: 1, STATUS_FAIL: 2}
+
+_checks = {}
+_executor = None
+_executor_size = 0
+# Незавершенные задачи проверок с прошлых вызовов: {имя: future}
+_running = {}
+_submit_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def register_check(name, func, critical=False):
+    """
+    Зарегистрировать проверку.
+
+    Args:
+        name: имя в ответе
+        func: функция без аргументов, возвращает dict с ключом 'status'
+              (ok / degraded / fail) и произвольными метриками
+        critical: если True, таймаут или исключение дают fail, иначе degraded
+    """
+    _checks[name] = (func, critical)
+
+
+# --- запросы в работе (см. InFlightRequestsMiddleware) ---
+
+_in_flight_lock = threading.Lock()
+_in_flight = {}
+
+
+def request_started():
+    token = object()
+    with _in_flight_lock:
+        _in_flight[token] = time.monotonic()
+    return token
+
+
+def request_finished(token):
+    with _in_flight_lock:
+        _in_flight.pop(token, None)
+
+
+def in_flight_snapshot():
+    """(количество запросов, возраст самого старого в секундах)."""
+    now = time.monotonic()
+    with _in_flight_lock:
+        started = list(_in_flight.values())
+    oldest = now - min(started) if started else 0.0
+    return len(started), oldest
+
+
+# --- встроенные проверки ---
+
+def check_database():
+    connection = connections['default']
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # Проверка идет в потоке пула: не держим лишнее соединение
+        connection.close()
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    slow = latency_ms > _setting('READINESS_DB_SLOW_MS', 200)
+    return {'status': STATUS_DEGRADED if slow else STATUS_OK, 'latency_ms': latency_ms}
+
+
+def check_cache():
+    cache = caches['default']
+    started = time.perf_counter()
+    key = f'readiness:{threading.get_ident()}'
+    cache.set(key, 1, timeout=10)
+    ok = cache.get(key) == 1
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    return {'status': STATUS_OK if ok else STATUS_DEGRADED, 'latency_ms': latency_ms}
+
+
+def check_in_flight():
+    count, oldest = in_flight_snapshot()
+    if count >= _setting('READINESS_MAX_IN_FLIGHT', 50):
+        status = STATUS_FAIL
+    elif oldest >= _setting('READINESS_SLOW_REQUEST_SECONDS', 30):
+        status = STATUS_DEGRADED
+    else:
+        status = STATUS_OK
+    return {'status': status, 'requests': count, 'oldest_seconds': round(oldest, 1)}
+
+
+register_check('database', check_database, critical=True)
+register_check('cache', check_cache)
+register_check('in_flight', check_in_flight, critical=True)
+register_check('db_pool', check_db_pool)
+
+
+def _submit_checks():
+    """Запустить проверки; проверка, которая еще выполняется, не дублируется."""
+    global _executor, _executor_size
+    with _submit_lock:
+        if _executor is None or _executor_size < len(_checks):
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor_size = len(_checks)
+            _executor = ThreadPoolExecutor(max_workers=_executor_size, thread_name_prefix='readiness')
+        futures = {}
+        for name, (func, critical) in _checks.items():
+            future = _running.get(name)
+            if future is None or future.done():
+                future = _running[name] = _executor.submit(_run_check, func)
+            futures[name] = (future, critical)
+        return futures
+
+
+def _run_check(func):
+    try:
+        return func()
+    except Exception as e:
+        logger.warning(f"Проверка готовности упала: {e}")
+        return {'status': STATUS_FAIL, 'error': str(e)}
+
+
+def run_checks(timeout=None):
+    """
+    Выполнить все проверки в пределах бюджета.
+
+    Returns:
+        dict: {'status': ok|degraded|fail, 'duration_ms', 'checks': {имя: результат}}
+    """
+    if timeout is None:
+        timeout = _setting('READINESS_TIMEOUT', 1.0)
+    started = time.perf_counter()
+    futures = _submit_checks()
+    wait([future for future, _ in futures.values()], timeout=timeout)
+
+    results = {}
+    overall = STATUS_OK
+    for name, (future, critical) in futures.items():
+        if future.done():
+            result = dict(future.result())
+            if result.get('status') == STATUS_FAIL and not critical:
+                result['status'] = STATUS_DEGRADED
+        else:
+            result = {'status': STATUS_FAIL if critical else STATUS_DEGRADED, 'error': 'timeout'}
+        results[name] = result
+        if _SEVERITY[result['status']] > _SEVERITY[overall]:
+            overall = result['status']
+
+    return {
+        'status': overall,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'checks': results,
+    }
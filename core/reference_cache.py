@@ -0,0 +1,122 @@
+"""
+Кэш справочников производства.
+
+Сериализованные списки продуктов, номенклатуры, точек и тех. карт хранятся
+в кэше по ключу с номером версии производства. При записи Product,
+Ingredient, RecipeItem или Location сигнал увеличивает версию, и все
+старые ключи перестают использоваться (истекают по таймауту).
+
+Бэкенд задается через settings.REFERENCE_CACHE_ALIAS (см. CACHE_BACKEND).
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HIT_METRIC = 'reference_cache.hit'
+MISS_METRIC = 'reference_cache.miss'
+metrics.register(HIT_METRIC, MISS_METRIC)
+
+
+def _cache():
+    return caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 3600)
+
+
+def _version_key(production_id):
+    return f'reference:{production_id}:version'
+
+
+def _initial_version():
+    # Если ключ версии вытеснили из кэша, новая версия все равно будет
+    # больше всех прежних, и старые записи не прочитаются
+    return int(time.time() * 1000)
+
+
+def get_reference_version(production_id) -> int:
+    """Текущая версия справочников производства."""
+    cache = _cache()
+    key = _version_key(production_id)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_reference_version(production_id):
+    """Сбросить кэш справочников производства (увеличить версию)."""
+    if not production_id:
+        return
+    cache = _cache()
+    key = _version_key(production_id)
+    try:
+        if not cache.add(key, _initial_version(), timeout=None):
+            cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+    except Exception as e:
+        logger.warning(f"Не удалось сбросить кэш справочников производства {production_id}: {e}")
+
+
+def get_reference_data(production_id, name, builder):
+    """
+    Получить справочник из кэша или построить его.
+
+    Args:
+        production_id: id производства
+        name: имя справочника ('products', 'ingredients', ...)
+        builder: функция без аргументов, возвращающая данные (pickle-совместимые)
+    """
+    cache = _cache()
+    try:
+        key = f'reference:{production_id}:{name}:v{get_reference_version(production_id)}'
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Кэш справочников недоступен: {e}")
+        return builder()
+
+    if data is not None:
+        metrics.incr(HIT_METRIC)
+        return data
+
+    metrics.incr(MISS_METRIC)
+    data = builder()
+    try:
+        cache.set(key, data, timeout=_timeout())
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить справочник {name} в кэш: {e}")
+    return data
+
+
+class ReferenceCacheListMixin:
+    """
+    Mixin для ViewSet справочника: list() без параметров отдается из кэша.
+
+    Кэшируется только список пользователя, привязанного к производству;
+    запросы с фильтрами/поиском/?fields= идут мимо кэша.
+    """
+
+    reference_cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        production_id = getattr(user, 'production_id', None)
+        if user.is_superuser or not production_id or request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        def build():
+            return list(super(ReferenceCacheListMixin, self).list(request, *args, **kwargs).data)
+
+        return Response(get_reference_data(production_id, self.reference_cache_name, build))
@@ -0,0 +1,154 @@
+"""
+Потоковые renderers для больших выгрузок.
+
+Каждый renderer умеет:
+- render() - обычный (не потоковый) ответ DRF из списка словарей;
+- stream() - генератор байтовых кусков для StreamingHttpResponse.
+
+Строки склеиваются в куски по ~64 КБ, чтобы не отправлять по строке за раз.
+XLSX собирается openpyxl в режиме write_only (строки пишутся во временный
+файл, а не держатся в памяти) и отдается после записи книги. Excel не
+хранит часовой пояс: даты со временем пишутся в местном времени (TIME_ZONE).
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _dumps(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _buffered(parts, chunk_bytes=STREAM_CHUNK_BYTES):
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+class StreamingRenderer(BaseRenderer):
+    """Базовый класс потокового renderer."""
+
+    charset = 'utf-8'
+
+    def iter_parts(self, rows, columns):
+        raise NotImplementedError
+
+    def stream(self, rows, columns):
+        return _buffered(self.iter_parts(rows, columns))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            data = []
+        elif isinstance(data, dict):
+            data = [data]
+        columns = list(data[0].keys()) if data else []
+        return b''.join(self.stream(data, columns))
+
+
+class StreamingJSONRenderer(StreamingRenderer):
+    """JSON-массив, который формируется по одной строке."""
+
+    media_type = 'application/json'
+    format = 'json'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return _dumps(data).encode('utf-8')
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def iter_parts(self, rows, columns):
+        yield '['
+        separator = ''
+        for row in rows:
+            yield separator + _dumps(row)
+            separator = ','
+        yield ']'
+
+
+class JSONLinesRenderer(StreamingRenderer):
+    """JSON Lines: по одному объекту на строку."""
+
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+    def iter_parts(self, rows, columns):
+        for row in rows:
+            yield _dumps(row) + '\n'
+
+
+class CSVRenderer(StreamingRenderer):
+    """CSV с BOM, чтобы Excel корректно открывал кириллицу."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def iter_parts(self, rows, columns):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        writer.writerow(columns)
+        yield '\ufeff' + flush()
+        for row in rows:
+            writer.writerow(['' if row.get(column) is None else row[column] for column in columns])
+            yield flush()
+
+
+def _xlsx_value(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+class XLSXRenderer(StreamingRenderer):
+    """Книга Excel с одним листом (нужен openpyxl)."""
+
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+    def stream(self, rows, columns):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(list(columns))
+        for row in rows:
+            sheet.append([_xlsx_value(row.get(column)) for column in columns])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+EXPORT_RENDERERS = [StreamingJSONRenderer, JSONLinesRenderer, CSVRenderer]
+if openpyxl:
+    EXPORT_RENDERERS.append(XLSXRenderer)
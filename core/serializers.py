@@ -0,0 +1,90 @@
+"""
+Общие базовые классы serializers.
+
+Поддержка sparse fieldsets для GET-запросов:
+- ?fields=id,title - отдать только перечисленные поля;
+- ?include=recipe_items - из вложенных связей (Meta.expandable_fields)
+  отдать только перечисленные, ?include= (пусто) - ни одной.
+
+Без параметров serializer отдает все поля, как и раньше.
+"""
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _parse_list(value):
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+def _sparse_params(request):
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    params = request.query_params
+    fields = _parse_list(params.get('fields'))
+    include = _parse_list(params.get('include'))
+    return (fields or None), include
+
+
+def requested_expansions(request, expandable_fields) -> set:
+    """Какие вложенные связи из expandable_fields попадут в ответ."""
+    expandable = set(expandable_fields)
+    fields, include = _sparse_params(request)
+    if include is not None:
+        return expandable & include
+    if fields is not None:
+        return expandable & fields
+    return expandable
+
+
+class SparseFieldsetMixin:
+    """Mixin для serializer с поддержкой ?fields= и ?include=."""
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._is_root_serializer():
+            return fields
+
+        requested, _ = _sparse_params(request)
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        keep = (set(fields) if requested is None else set(fields) & requested) - expandable
+        keep |= requested_expansions(request, expandable)
+
+        for name in list(fields):
+            if name not in keep:
+                fields.pop(name)
+        return fields
+
+
+class SparseFieldsetModelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """ModelSerializer с поддержкой sparse fieldsets."""
+
+
+class SparsePrefetchMixin:
+    """
+    Mixin для ViewSet: prefetch только тех вложенных связей, которые будут отданы.
+
+    sparse_prefetches = {'<expandable field>': ('lookup', ...)}
+    """
+
+    sparse_prefetches = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(getattr(serializer_class, 'Meta', None), 'expandable_fields', ())
+        lookups = []
+        for name in requested_expansions(self.request, expandable):
+            lookups.extend(self.sparse_prefetches.get(name, ()))
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset
@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InFlightRequestsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,6 +62,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,14 +93,50 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
 DATABASE_URL = config('DATABASE_URL', default='')
+
+# Режим соединений с PostgreSQL (см. core/db_pool.py):
+#   persistent - постоянное соединение на поток воркера (DB_CONN_MAX_AGE сек);
+#   pool       - встроенный пул Django 5.1 на psycopg 3 (нужен psycopg[pool]),
+#                размер пула на процесс gunicorn - DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE;
+#   pgbouncer  - за PgBouncer в transaction mode: без server-side курсоров.
+DB_POOL_MODE = config('DB_POOL_MODE', default='persistent').lower()
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+# Проверять соединение перед использованием (после рестарта Postgres / обрыва по простою)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+# Сколько секунд запрос ждет свободное соединение пула
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10.0, cast=float)
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=int)
+DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=3600, cast=int)
+
+if DB_POOL_MODE not in ('persistent', 'pool', 'pgbouncer'):
+    raise RuntimeError(f'DB_POOL_MODE должен быть persistent, pool или pgbouncer: {DB_POOL_MODE}')
+
+
+def _database_settings(url):
+    database = dj_database_url.parse(
+        url,
+        # Пул сам держит соединения, постоянные соединения Django с ним несовместимы
+        conn_max_age=0 if DB_POOL_MODE == 'pool' else DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        # В transaction mode курсор не переживает транзакцию PgBouncer
+        disable_server_side_cursors=DB_POOL_MODE == 'pgbouncer',
+        ssl_require=IS_PRODUCTION,
+    )
+    if DB_POOL_MODE == 'pool':
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+        }
+    return database
+
+
 if DATABASE_URL:
-    DATABASES = {
-        'default': dj_database_url.parse(
-            DATABASE_URL,
-            conn_max_age=600,
-            ssl_require=IS_PRODUCTION,
-        )
-    }
+    DATABASES = {'default': _database_settings(DATABASE_URL)}
 else:
     # Локальный fallback, чтобы проект мог стартовать без Postgres env.
     DATABASES = {
@@ -107,6 +146,63 @@ else:
         }
     }
 
+# Реплика только для чтения (см. core/db_router.py): отчеты, выгрузки,
+# сводки и статистика читаются с нее, запись - всегда в default.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+# Сколько секунд после своего изменения пользователь читает с default
+REPLICA_READ_YOUR_WRITES_SECONDS = config('REPLICA_READ_YOUR_WRITES_SECONDS', default=10, cast=int)
+
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = _database_settings(REPLICA_DATABASE_URL)
+    # В тестах реплика - та же база, что default
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Cache
+# Один воркер - locmem; несколько воркеров gunicorn должны делить кэш
+# (file - на одной машине, db - через таблицу, нужна createcachetable).
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='file' if IS_PRODUCTION else 'locmem').lower()
+_cache_timeout = config('CACHE_TIMEOUT', default=3600, cast=int)
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+            'TIMEOUT': _cache_timeout,
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': config('CACHE_LOCATION', default='django_cache'),
+            'TIMEOUT': _cache_timeout,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'product-revision',
+            'TIMEOUT': _cache_timeout,
+        }
+    }
+
+# Кэш справочников производства (продукты, номенклатура, точки, тех. карты)
+REFERENCE_CACHE_ALIAS = config('REFERENCE_CACHE_ALIAS', default='default')
+REFERENCE_CACHE_TIMEOUT = config('REFERENCE_CACHE_TIMEOUT', default=_cache_timeout, cast=int)
+
+# Сессии читаются из общего кэша (запись идет и в БД). С locmem кэш у каждого
+# воркера свой, и выход в одном воркере не виден другим - там оставляем db.
+if CACHE_BACKEND != 'locmem':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Delta sync справочников (GET /api/sync/?since=)
+SYNC_DELETION_RETENTION_DAYS = config('SYNC_DELETION_RETENTION_DAYS', default=30, cast=int)
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=60, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -141,6 +237,35 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
+# Фоновые загрузки файлов в ревизию (см. revisions/services/import_jobs.py)
+IMPORT_JOB_DIR = config('IMPORT_JOB_DIR', default=str(Path(tempfile.gettempdir()) / 'product_revision_imports'))
+IMPORT_JOB_WORKERS = config('IMPORT_JOB_WORKERS', default=1, cast=int)
+IMPORT_JOB_STALE_SECONDS = config('IMPORT_JOB_STALE_SECONDS', default=600, cast=int)
+# Файлы больше этого размера upload-excel обрабатывает в фоне
+IMPORT_SYNC_MAX_BYTES = config('IMPORT_SYNC_MAX_BYTES', default=2 * 1024 * 1024, cast=int)
+IMPORT_QUEUE_MAX_DEPTH = config('IMPORT_QUEUE_MAX_DEPTH', default=20, cast=int)
+IMPORT_QUEUE_MAX_AGE_SECONDS = config('IMPORT_QUEUE_MAX_AGE_SECONDS', default=300, cast=int)
+
+# Загрузка продаж из МойКассир (см. sales/services/moykassir.py)
+MOYKASSIR_API_URL = config('MOYKASSIR_API_URL', default='')
+MOYKASSIR_API_TOKEN = config('MOYKASSIR_API_TOKEN', default='')
+MOYKASSIR_PAGE_SIZE = config('MOYKASSIR_PAGE_SIZE', default=500, cast=int)
+MOYKASSIR_TIMEOUT = config('MOYKASSIR_TIMEOUT', default=30, cast=int)
+
+# Архив ревизий (команда archive_revisions, см. revisions/services/archive.py):
+# завершенные ревизии старше стольких дней переносятся в RevisionArchive
+REVISION_ARCHIVE_AFTER_DAYS = config('REVISION_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+REVISION_ARCHIVE_CHUNK_SIZE = config('REVISION_ARCHIVE_CHUNK_SIZE', default=20, cast=int)
+
+# Readiness (GET /api/ready/, см. core/readiness.py)
+READINESS_TIMEOUT = config('READINESS_TIMEOUT', default=1.0, cast=float)
+READINESS_DB_SLOW_MS = config('READINESS_DB_SLOW_MS', default=200, cast=int)
+READINESS_MAX_IN_FLIGHT = config('READINESS_MAX_IN_FLIGHT', default=50, cast=int)
+READINESS_SLOW_REQUEST_SECONDS = config('READINESS_SLOW_REQUEST_SECONDS', default=30, cast=int)
+
+# Как часто (сек) проверять mtime frontend/build/index.html (см. core/spa.py)
+SPA_INDEX_CHECK_INTERVAL = config('SPA_INDEX_CHECK_INTERVAL', default=2.0, cast=float)
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 _frontend_static_dir = BASE_DIR / 'frontend' / 'build' / 'static'
@@ -157,6 +282,13 @@ STORAGES = {
 
 
 AUTH_USER_MODEL = 'users.User'
+# ModelBackend оставлен, чтобы не разлогинить сессии, созданные до CachedModelBackend
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Кэш пользователя сессии вместе с производством (см. users/backends.py)
+USER_CONTEXT_CACHE_TIMEOUT = config('USER_CONTEXT_CACHE_TIMEOUT', default=300, cast=int)
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOWED_ORIGINS = [
@@ -195,4 +327,13 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Token bucket в общем кэше, см. core/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'assistant_user': config('ASSISTANT_THROTTLE_USER', default='20/min'),
+        'assistant_ip': config('ASSISTANT_THROTTLE_IP', default='10/min'),
+        'assistant_production': config('ASSISTANT_THROTTLE_PRODUCTION', default='60/min'),
+    },
+    # Число доверенных прокси перед Django (Render/Nginx), для определения IP
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int) or None,
 }
+THROTTLE_CACHE_ALIAS = config('THROTTLE_CACHE_ALIAS', default='default')
@@ -0,0 +1,137 @@
+"""
+Отдача index.html React SPA из памяти.
+
+index.html читается один раз на воркер и хранится вместе с gzip- и
+brotli-версиями (brotli - если установлен пакет Brotli). mtime файла
+проверяется не чаще раза в SPA_INDEX_CHECK_INTERVAL секунд, так что
+навигация по SPA не обращается к диску. Ответ содержит ETag
+(304 при совпадении If-None-Match) и Cache-Control: no-cache - браузер
+всегда сверяется с сервером, т.к. index.html ссылается на новые бандлы
+после сборки.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+NOT_FOUND_MESSAGE = 'Frontend build not found. Build it with: cd frontend && npm ci && npm run build'
+CACHE_CONTROL = 'no-cache'
+
+# Порядок предпочтения кодировок
+_ENCODING_PREFERENCE = ('br', 'gzip')
+
+
+def _accepted_encodings(header):
+    """Кодировки из Accept-Encoding с q > 0."""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(token)
+    return accepted
+
+
+class _IndexSnapshot:
+    """Содержимое index.html во всех кодировках."""
+
+    def __init__(self, raw):
+        digest = hashlib.sha1(raw).hexdigest()[:20]
+        self.bodies = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(raw)
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+
+class SpaIndex:
+    """index.html в памяти воркера с перечитыванием при изменении mtime."""
+
+    def __init__(self, path, check_interval):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._mtime = None
+        self._checked_at = None
+
+    def get(self):
+        """Актуальный _IndexSnapshot или None, если файла нет."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self._snapshot
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except FileNotFoundError:
+                self._snapshot = self._mtime = None
+            else:
+                if mtime != self._mtime:
+                    self._snapshot = _IndexSnapshot(self.path.read_bytes())
+                    self._mtime = mtime
+            self._checked_at = now
+            return self._snapshot
+
+    def choose_encoding(self, snapshot, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in _ENCODING_PREFERENCE:
+            if encoding in snapshot.bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    def response(self, request):
+        snapshot = self.get()
+        if snapshot is None:
+            return HttpResponseNotFound(NOT_FOUND_MESSAGE)
+
+        encoding = self.choose_encoding(snapshot, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = snapshot.etags[encoding]
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+        client_etags = {
+            value[2:] if value.startswith('W/') else value
+            for value in parse_etags(if_none_match or '')
+        }
+        if etag in client_etags or '*' in client_etags:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(snapshot.bodies[encoding], content_type='text/html; charset=utf-8')
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = CACHE_CONTROL
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+spa_index = SpaIndex(
+    Path(settings.BASE_DIR) / 'frontend' / 'build' / 'index.html',
+    getattr(settings, 'SPA_INDEX_CHECK_INTERVAL', 2.0),
+)
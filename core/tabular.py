@@ -0,0 +1,181 @@
+"""
+Потоковое чтение табличных файлов (CSV/TSV/XLSX) для импортов.
+
+iter_table_rows выбирает чтение по расширению файла. .xlsx читается
+openpyxl в режиме read_only. iter_csv_rows читает файл построчно: кодировка (UTF-8 с BOM / UTF-8 /
+cp1251 - выгрузки 1С и касс) и разделитель (',', ';', табуляция, '|')
+определяются по первым SAMPLE_SIZE байтам, дальше файл не загружается
+в память целиком. Пустые ячейки отдаются как None, как в openpyxl.
+
+parse_decimal / parse_date понимают русские форматы: '1 234,5',
+'31.01.2026', max_field_value - верхняя граница числового поля модели
+(значение больше нее PostgreSQL отвергает с DataError). batched режет поток строк на пачки фиксированного размера
+для bulk_create.
+"""
+
+import codecs
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+SAMPLE_SIZE = 64 * 1024
+DELIMITERS = ',;\t|'
+CSV_SUFFIXES = ('.csv', '.tsv', '.txt')
+XLSX_SUFFIXES = ('.xlsx', '.xlsm')
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d.%m.%y', '%d/%m/%Y')
+# integer в PostgreSQL (PositiveIntegerField)
+MAX_INTEGER = 2147483647
+
+
+class TabularError(Exception):
+    """Файл не удалось прочитать как таблицу."""
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Кодировка по началу файла: utf-8-sig, utf-8 или cp1251."""
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    # Образец может оборваться посреди многобайтового символа
+    for cut in range(4):
+        try:
+            sample[:len(sample) - cut].decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError:
+            continue
+    return 'cp1251'
+
+
+def detect_delimiter(text_sample: str) -> str:
+    """Разделитель по образцу текста (по умолчанию ';' - так выгружает 1С)."""
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        first_line = text_sample.split('\n', 1)[0]
+        counts = {delimiter: first_line.count(delimiter) for delimiter in DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ';'
+
+
+def iter_csv_rows(file, encoding=None, delimiter=None):
+    """
+    Построчно читать CSV/TSV.
+
+    Args:
+        file: путь или бинарный файловый объект (UploadedFile)
+        encoding / delimiter: явно заданные значения вместо определения
+
+    Yields:
+        tuple значений ячеек (str без крайних пробелов или None)
+    """
+    owns_file = isinstance(file, (str, Path))
+    stream = open(file, 'rb') if owns_file else file
+    try:
+        stream.seek(0)
+        sample = stream.read(SAMPLE_SIZE)
+        stream.seek(0)
+        encoding = encoding or detect_encoding(sample)
+        if delimiter is None:
+            delimiter = detect_delimiter(sample.decode(encoding, errors='ignore'))
+        text = codecs.getreader(encoding)(stream, errors='replace')
+        try:
+            for row in csv.reader(text, delimiter=delimiter):
+                yield tuple((cell.strip() or None) for cell in row)
+        except csv.Error as e:
+            raise TabularError(f'Ошибка чтения CSV: {e}')
+    finally:
+        if owns_file:
+            stream.close()
+
+
+def iter_xlsx_rows(file):
+    """Построчно читать активный лист .xlsx (read_only, без загрузки книги в память)."""
+    if not openpyxl:
+        raise TabularError('Библиотека openpyxl не установлена')
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise TabularError(f'Ошибка при обработке файла: {e}')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def supported_suffixes():
+    return CSV_SUFFIXES + XLSX_SUFFIXES
+
+
+def iter_table_rows(file, name=None):
+    """
+    Построчно читать таблицу, формат - по расширению name (или пути file).
+
+    Raises:
+        TabularError: неподдерживаемый формат или файл не читается
+    """
+    suffix = Path(str(name if name is not None else file)).suffix.lower()
+    if suffix in CSV_SUFFIXES:
+        return iter_csv_rows(file)
+    if suffix in XLSX_SUFFIXES:
+        return iter_xlsx_rows(file)
+    raise TabularError(
+        f'Неподдерживаемый формат файла: {suffix or "?"} '
+        f'(поддерживаются {", ".join(supported_suffixes())})'
+    )
+
+
+def batched(iterable, size):
+    """Пачки по size элементов (последняя может быть меньше)."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_decimal(value):
+    """'1 234,5' / 1234.5 / Decimal -> Decimal. Ошибка - ValueError."""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    text = str(value).replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        result = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f'Некорректное число: {value}')
+    if not result.is_finite():
+        raise ValueError(f'Некорректное число: {value}')
+    return result
+
+
+def max_field_value(field):
+    """
+    Наибольшее значение числового поля модели: DecimalField(max_digits=10,
+    decimal_places=3) -> 9999999.999, целые поля -> MAX_INTEGER.
+    """
+    if field.get_internal_type() == 'DecimalField':
+        return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(1).scaleb(-field.decimal_places)
+    return MAX_INTEGER
+
+
+def parse_date(value):
+    """'31.01.2026' / '2026-01-31' / date / datetime -> date. Ошибка - ValueError."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Некорректная дата: {value}')
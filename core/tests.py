@@ -0,0 +1,214 @@
+import csv
+import gzip
+import io
+import json
+import os
+import runpy
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import readiness
+from .spa import SpaIndex, brotli
+from .tabular import detect_delimiter, detect_encoding, iter_csv_rows
+from .views import ready_view
+
+
+class SpaIndexTests(SimpleTestCase):
+    """index.html из памяти: ETag / 304, выбор сжатия, перечитывание по mtime."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'index.html'
+        self.path.write_bytes(b'<html>v1</html>')
+        self.index = SpaIndex(self.path, check_interval=0)
+        self.factory = RequestFactory()
+
+    def _get(self, **headers):
+        return self.index.response(self.factory.get('/revisions/1', headers=headers))
+
+    def test_etag_and_not_modified(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<html>v1</html>')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        etag = response['ETag']
+
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}'):
+            response = self._get(if_none_match=if_none_match)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self._get(if_none_match='"other"').status_code, 200)
+
+    def test_encoding_follows_accept_encoding(self):
+        response = self._get(accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'<html>v1</html>')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        identity = self._get()
+        self.assertNotEqual(response['ETag'], identity['ETag'])
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertFalse(self._get(accept_encoding='gzip;q=0, deflate').has_header('Content-Encoding'))
+
+    @skipIf(brotli is None, 'пакет Brotli не установлен')
+    def test_brotli_is_preferred(self):
+        for accept_encoding in ('gzip, br', '*'):
+            response = self._get(accept_encoding=accept_encoding)
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.content), b'<html>v1</html>')
+        self.assertEqual(self._get(accept_encoding='br;q=0, gzip')['Content-Encoding'], 'gzip')
+
+    def test_reloads_when_mtime_changes(self):
+        etag = self._get()['ETag']
+        stat = self.path.stat()
+
+        self.path.write_bytes(b'<html>v2</html>')
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<html>v2</html>')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_mtime_is_checked_once_per_interval(self):
+        index = SpaIndex(self.path, check_interval=3600)
+        snapshot = index.get()
+
+        self.path.unlink()
+
+        self.assertIs(index.get(), snapshot)
+        self.assertEqual(SpaIndex(self.path, check_interval=0).response(self.factory.get('/')).status_code, 404)
+
+
+@override_settings(READINESS_TIMEOUT=0.2)
+class ReadinessTests(SimpleTestCase):
+    """GET /api/ready/: итог проверок -> 200 / 503, зависшая проверка не тормозит остальные."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.started = []
+
+    def _ready(self, checks):
+        with mock.patch.dict(readiness._checks, checks, clear=True):
+            response = ready_view(RequestFactory().get('/api/ready/'))
+        return response.status_code, json.loads(response.content)
+
+    def _hang(self):
+        self.started.append(1)
+        self.release.wait(5)
+        return {'status': readiness.STATUS_OK}
+
+    @staticmethod
+    def _status(status):
+        return lambda: {'status': status}
+
+    @staticmethod
+    def _fail():
+        raise ConnectionError('нет соединения')
+
+    def test_status_mapping(self):
+        ok = (self._status(readiness.STATUS_OK), True)
+        cases = [
+            ({'a': ok}, 200, 'ok'),
+            ({'a': ok, 'b': (self._status(readiness.STATUS_DEGRADED), True)}, 200, 'degraded'),
+            # Упавшая некритичная проверка - degraded, критичная - fail
+            ({'a': ok, 'b': (self._fail, False)}, 200, 'degraded'),
+            ({'a': ok, 'b': (self._fail, True)}, 503, 'fail'),
+            ({'a': ok, 'b': (self._status(readiness.STATUS_FAIL), True)}, 503, 'fail'),
+        ]
+        with self.assertLogs('core.readiness', 'WARNING'):
+            for checks, status_code, status in cases:
+                code, data = self._ready(checks)
+                self.assertEqual((code, data['status']), (status_code, status))
+        self.assertEqual(data['checks']['a'], {'status': 'ok'})
+
+    def test_hung_check_times_out_without_blocking_others(self):
+        checks = {'hung_db': (self._hang, True)}
+        checks.update({f'check_{index}': (self._status(readiness.STATUS_OK), True) for index in range(5)})
+
+        for _ in range(3):
+            code, data = self._ready(checks)
+            self.assertEqual((code, data['checks']['hung_db']), (503, {'status': 'fail', 'error': 'timeout'}))
+            self.assertTrue(all(data['checks'][f'check_{index}']['status'] == 'ok' for index in range(5)))
+        # Зависшая проверка не запускалась повторно
+        self.assertEqual(len(self.started), 1)
+
+        self.release.set()
+        readiness._running['hung_db'].result(timeout=5)
+        self.assertEqual(self._ready(checks)[0], 200)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    """DB_POOL_MODE -> параметры DATABASES (settings.py выполняется заново с другим окружением)."""
+
+    DATABASE_URL = 'postgres://app:secret@db:5432/app'
+
+    def _settings(self, **env):
+        env = {'DATABASE_URL': self.DATABASE_URL, 'DB_CONN_MAX_AGE': '120', **env}
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(str(Path(settings.BASE_DIR) / 'core' / 'settings.py'))
+
+    def test_persistent_mode(self):
+        database = self._settings(DB_POOL_MODE='persistent')['DATABASES']['default']
+
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (120, True))
+        self.assertFalse(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('pool', database.get('OPTIONS', {}))
+
+    def test_pool_mode(self):
+        database = self._settings(DB_POOL_MODE='Pool', DB_POOL_MAX_SIZE='20')['DATABASES']['default']
+
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {
+            'min_size': 2, 'max_size': 20, 'timeout': 10.0, 'max_idle': 300, 'max_lifetime': 3600})
+
+    def test_pgbouncer_mode(self):
+        database = self._settings(DB_POOL_MODE='pgbouncer')['DATABASES']['default']
+
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('pool', database.get('OPTIONS', {}))
+
+    def test_invalid_mode_is_rejected(self):
+        with self.assertRaisesMessage(RuntimeError, 'DB_POOL_MODE'):
+            self._settings(DB_POOL_MODE='bouncer')
+
+
+class TabularDetectionTests(SimpleTestCase):
+    """Определение кодировки и разделителя выгрузок 1С и касс."""
+
+    ROWS = [('Номенклатура', 'Количество'), ('Мука пшеничная', '1,5'), ('Сахар', '2')]
+
+    def _csv(self, delimiter, encoding):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=delimiter).writerows(self.ROWS)
+        return buffer.getvalue().encode(encoding)
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding('Мука'.encode('utf-8-sig')), 'utf-8-sig')
+        self.assertEqual(detect_encoding('Мука'.encode('utf-8')), 'utf-8')
+        self.assertEqual(detect_encoding('Мука'.encode('cp1251')), 'cp1251')
+        self.assertEqual(detect_encoding(b'Product;Qty'), 'utf-8')
+        # Образец оборван посреди двухбайтового символа
+        self.assertEqual(detect_encoding('Мука'.encode('utf-8')[:-1]), 'utf-8')
+
+    def test_detect_delimiter(self):
+        for delimiter in (';', ',', '\t'):
+            with self.subTest(delimiter=delimiter):
+                sample = self._csv(delimiter, 'utf-8').decode()
+                self.assertEqual(detect_delimiter(sample), delimiter)
+        self.assertEqual(detect_delimiter('Номенклатура'), ';')
+
+    def test_iter_csv_rows(self):
+        for delimiter, encoding in ((';', 'cp1251'), ('\t', 'utf-8-sig'), (',', 'utf-8')):
+            with self.subTest(delimiter=delimiter, encoding=encoding):
+                rows = list(iter_csv_rows(io.BytesIO(self._csv(delimiter, encoding))))
+                self.assertEqual(rows, self.ROWS)
@@ -0,0 +1,189 @@
+"""
+Throttling на основе token bucket в общем кэше.
+
+Ведро на каждый ключ (пользователь / IP / производство) вмещает N запросов
+и пополняется со скоростью N за период, поэтому короткий всплеск
+допускается, а длительный поток ограничивается средней скоростью.
+Состояние хранится в кэше throttle (settings.THROTTLE_CACHE_ALIAS),
+при file/db-кэше оно общее для всех воркеров gunicorn.
+
+Один throttle проверяет сразу все ведра запроса (buckets) и списывает
+токен только если он есть в каждом: запрос, отклоненный по лимиту
+пользователя, не расходует общее ведро производства. На время
+проверки ведра блокируются через cache.add (атомарен в locmem, db,
+memcached и redis; в file-кэше - с точностью до гонки), поэтому
+параллельные воркеры не затирают списания друг друга.
+
+Скорости задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] по scope
+в формате DRF: '20/min', '100/hour'. Отказ дает 429 с заголовком
+Retry-After и увеличивает счетчики throttle.rejected и
+throttle.<scope>.rejected (см. /api/metrics/).
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+REJECTED_METRIC = 'throttle.rejected'
+metrics.register(REJECTED_METRIC)
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Блокировка ведра: сколько живет и сколько ждать ее освобождения
+LOCK_TIMEOUT = 2
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_SECONDS = 0.01
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60). None -> (None, None) - без ограничения."""
+    if rate is None:
+        return None, None
+    try:
+        num, period = rate.split('/')
+        return int(num), _PERIODS[period.strip()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Некорректная скорость throttle: {rate!r}')
+
+
+@contextmanager
+def _locked(cache, keys):
+    """
+    Заблокировать ведра (в порядке сортировки, чтобы не было взаимных
+    блокировок). Возвращает True, если удалось взять все блокировки.
+    """
+    acquired = []
+    try:
+        for key in sorted(keys):
+            lock_key = f'{key}:lock'
+            for _ in range(LOCK_ATTEMPTS):
+                if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+                    acquired.append(lock_key)
+                    break
+                time.sleep(LOCK_RETRY_SECONDS)
+            else:
+                break
+        yield len(acquired) == len(keys)
+    finally:
+        if acquired:
+            cache.delete_many(acquired)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Базовый класс: наследник задает buckets - ведра, из которых запрос
+    списывает токен.
+
+    buckets = (('<scope>', 'user' | 'ip' | 'production'), ...)
+    'user' - авторизованный пользователь, 'ip' - анонимный запрос по IP
+    (авторизованных ограничивают user/production), 'production' - все
+    аккаунты одного производства. Ведро, к которому запрос не относится,
+    пропускается.
+    """
+
+    buckets = ()
+
+    def __init__(self):
+        if not self.buckets:
+            raise ImproperlyConfigured(f'{type(self).__name__}: не заданы buckets')
+        self.rates = {
+            scope: parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+            for scope, _ in self.buckets
+        }
+        self.wait_seconds = None
+
+    @classmethod
+    def rejected_metrics(cls):
+        return [f'throttle.{scope}.rejected' for scope, _ in cls.buckets]
+
+    def get_bucket_ident(self, kind, request):
+        user = request.user
+        authenticated = bool(user and user.is_authenticated)
+        if kind == 'user':
+            return f'user:{user.pk}' if authenticated else None
+        if kind == 'ip':
+            return None if authenticated else f'ip:{self.get_ident(request)}'
+        if kind == 'production':
+            production_id = getattr(user, 'production_id', None)
+            return f'production:{production_id}' if production_id else None
+        raise ImproperlyConfigured(f'Неизвестный тип ведра throttle: {kind!r}')
+
+    def allow_request(self, request, view):
+        scopes = {}
+        for scope, kind in self.buckets:
+            if self.rates[scope][0] is None:
+                continue
+            ident = self.get_bucket_ident(kind, request)
+            if ident is not None:
+                scopes[f'throttle:{scope}:{ident}'] = scope
+        if not scopes:
+            return True
+
+        cache = caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+        try:
+            with _locked(cache, scopes) as locked:
+                if not locked:
+                    logger.warning("Не удалось заблокировать ведра throttle, запрос пропущен")
+                    return True
+                return self._take_tokens(cache, scopes)
+        except Exception as e:
+            # Кэш недоступен - не блокируем пользователей
+            logger.warning(f"Кэш throttle недоступен: {e}")
+            return True
+
+    def _take_tokens(self, cache, scopes):
+        """Списать токен из всех ведер или, если хоть в одном пусто, ни из одного."""
+        now = time.time()
+        stored = cache.get_many(list(scopes))
+        updated = {}
+        rejected = []
+        wait_seconds = 0
+        for key, scope in scopes.items():
+            capacity, period = self.rates[scope]
+            refill_per_second = capacity / period
+            tokens, updated_at = stored.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            if tokens >= 1:
+                updated[key] = (tokens - 1, now)
+            else:
+                rejected.append(scope)
+                wait_seconds = max(wait_seconds, (1 - tokens) / refill_per_second)
+
+        if rejected:
+            self.wait_seconds = wait_seconds
+            metrics.incr(REJECTED_METRIC)
+            for scope in rejected:
+                metrics.incr(f'throttle.{scope}.rejected')
+            return False
+
+        # Полное ведро можно не хранить дольше, чем оно наполняется
+        timeout = max(int(self.rates[scope][1]) for scope in scopes.values()) + 1
+        cache.set_many(updated, timeout=timeout)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AssistantThrottle(TokenBucketThrottle):
+    """Чат ассистента: IP для анонимных, пользователь и его производство."""
+
+    buckets = (
+        ('assistant_ip', 'ip'),
+        ('assistant_user', 'user'),
+        ('assistant_production', 'production'),
+    )
+
+
+ASSISTANT_THROTTLES = [AssistantThrottle]
+metrics.register(*AssistantThrottle.rejected_metrics())
@@ -11,13 +11,16 @@ from revisions.viewsets import (
     RevisionProductItemViewSet,
     RevisionIngredientItemViewSet,
     RevisionReportViewSet,
+    ImportJobViewSet,
 )
 from sales.viewsets import LocationViewSet, IncomingViewSet, IngredientInventoryViewSet
-from products.viewsets import ProductViewSet, IngredientViewSet, RecipeItemViewSet
+from products.viewsets import ProductViewSet, IngredientViewSet, RecipeItemViewSet, ImportAliasViewSet
 from users.views import login_view, logout_view, current_user, csrf_token, register_manager
 from users.viewsets import UserViewSet, ProductionViewSet, ProductionInviteViewSet
 from revisions.views import upload_excel_products
-from core.views import spa, assistant_chat
+from products.views import sync_reference_data
+from sales.views import daily_sales_view, ingest_sales_view
+from core.views import spa, assistant_chat, metrics_view, ready_view
 
 # Создать router для API
 router = DefaultRouter()
@@ -28,12 +31,14 @@ router.register(r'revision-ingredient-items',
                 RevisionIngredientItemViewSet, basename='revision-ingredient-item')
 router.register(r'revision-reports', RevisionReportViewSet,
                 basename='revision-report')
+router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
 router.register(r'locations', LocationViewSet, basename='location')
 router.register(r'incoming', IncomingViewSet, basename='incoming')
 router.register(r'ingredient-inventories', IngredientInventoryViewSet, basename='ingredient-inventory')
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'ingredients', IngredientViewSet, basename='ingredient')
 router.register(r'recipe-items', RecipeItemViewSet, basename='recipe-item')
+router.register(r'import-aliases', ImportAliasViewSet, basename='import-alias')
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'productions', ProductionViewSet, basename='production')
 router.register(r'production-invites', ProductionInviteViewSet, basename='production-invite')
@@ -45,6 +50,15 @@ urlpatterns = [
         lambda request: JsonResponse({'status': 'ok'}),
         name='health_check'
     ),
+    path('api/ready/', ready_view, name='readiness_check'),
+    # Раньше router: иначе путь совпадает с detail-маршрутом revision-product-items/{pk}/
+    path(
+        'api/revision-product-items/upload-excel/',
+        upload_excel_products,
+        name='upload_excel_products'
+    ),
+    path('api/sales/ingest/', ingest_sales_view, name='ingest_sales'),
+    path('api/sales/daily/', daily_sales_view, name='daily_sales'),
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),
     path('api/auth/login/', login_view, name='login'),
@@ -53,11 +67,8 @@ urlpatterns = [
     path('api/auth/csrf/', csrf_token, name='csrf_token'),
     path('api/auth/register/', register_manager, name='register_manager'),
     path('api/assistant/chat/', assistant_chat, name='assistant_chat'),
-    path(
-        'api/revision-product-items/upload-excel/',
-        upload_excel_products,
-        name='upload_excel_products'
-    ),
+    path('api/metrics/', metrics_view, name='metrics'),
+    path('api/sync/', sync_reference_data, name='sync_reference_data'),
     # React SPA entrypoint (must be last)
     re_path(r'^(?!api/|admin/).*$', spa),
 ]
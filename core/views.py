@@ -1,29 +1,27 @@
-from pathlib import Path
-
-from django.conf import settings
-from django.http import HttpResponse, HttpResponseNotFound
+from django.http import JsonResponse
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 
+from . import db_pool, metrics, readiness
 from .assistant_service import generate_assistant_reply
+from .db_router import read_from_replica, read_only_view
+from .spa import spa_index
+from .throttling import ASSISTANT_THROTTLES
 
 
 def spa(request):
-    index_path = Path(settings.BASE_DIR) / 'frontend' / 'build' / 'index.html'
-    if not index_path.exists():
-        return HttpResponseNotFound(
-            'Frontend build not found. Build it with: cd frontend && npm ci && npm run build'
-        )
-
-    return HttpResponse(index_path.read_text(encoding='utf-8'), content_type='text/html')
+    """React SPA entrypoint: index.html из памяти воркера (см. core/spa.py)."""
+    return spa_index.response(request)
 
 
+@read_only_view
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(ASSISTANT_THROTTLES)
 def assistant_chat(request):
-    """Чат-эндпоинт ассистента."""
+    """Чат-эндпоинт ассистента (ограничен по IP, пользователю и производству)."""
     if not isinstance(request.data, dict):
         return Response(
             {'error': 'Некорректное тело запроса'},
@@ -42,5 +40,33 @@ def assistant_chat(request):
         'history': request.data.get('history', []),
         'context': request.data.get('context', {}),
     }
-    reply = generate_assistant_reply(payload=payload, user=request.user)
+    # Ассистент только читает (статистика, ревизии): можно с реплики
+    with read_from_replica(request.user):
+        reply = generate_assistant_reply(payload=payload, user=request.user)
     return Response(reply)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """
+    Счетчики для мониторинга (кэш справочников и т.д.) и состояние
+    пула соединений с БД этого воркера (db_pool).
+
+    GET /api/metrics/
+    """
+    return Response({**metrics.snapshot(), 'db_pool': db_pool.pool_stats()})
+
+
+def ready_view(request):
+    """
+    Готовность воркера принимать трафик (БД, кэш, нагрузка, очередь).
+
+    GET /api/ready/ -> 200 ok|degraded, 503 fail
+    Без аутентификации и сессии: проверка не должна сама ходить в БД лишний раз.
+    """
+    result = readiness.run_checks()
+    status_code = 503 if result['status'] == readiness.STATUS_FAIL else 200
+    response = JsonResponse(result, status=status_code)
+    response['Cache-Control'] = 'no-store'
+    return response
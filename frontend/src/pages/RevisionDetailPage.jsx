@@ -15,10 +15,14 @@ import { Modal } from '../components/Modal';
 import { Input, Select, Label, FormGroup, Textarea } from '../components/Input';
 import { format } from 'date-fns';
 import { ru } from 'date-fns/locale';
-import { revisionItemsAPI, referenceAPI, incomingAPI } from '../services/api';
+import { revisionItemsAPI, referenceAPI, incomingAPI, importJobsAPI } from '../services/api';
 
 const warningBrown = '#8B5A2B';
 
+// Фоновая загрузка: опрос статуса каждые 2 с, не дольше 15 минут
+const IMPORT_JOB_POLL_INTERVAL_MS = 2000;
+const IMPORT_JOB_POLL_TIMEOUT_MS = 15 * 60 * 1000;
+
 const PageHeader = styled.div`
   display: flex;
   justify-content: space-between;
@@ -116,7 +120,7 @@ const Difference = styled.span`
 export const RevisionDetailPage = () => {
   const { id } = useParams();
   const navigate = useNavigate();
-  const { currentRevision, loading, fetchRevision, calculateRevision, submitRevision, approveRevision, rejectRevision, deleteRevision } = useRevisionStore();
+  const { currentRevision, loading, fetchRevision, fetchWorkspace, calculateRevision, submitRevision, approveRevision, rejectRevision, deleteRevision } = useRevisionStore();
   const { user } = useAuthStore();
   const [showRejectModal, setShowRejectModal] = useState(false);
   const [rejectReason, setRejectReason] = useState('');
@@ -139,10 +143,21 @@ export const RevisionDetailPage = () => {
 
   useEffect(() => {
     if (id) {
+      loadWorkspace();
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [id, fetchWorkspace]);
+
+  const loadWorkspace = async () => {
+    const references = await fetchWorkspace(id);
+    if (references) {
+      setProducts(references.products || []);
+      setIngredients(references.ingredients || []);
+    } else {
       fetchRevision(id);
       loadReferenceData();
     }
-  }, [id, fetchRevision]);
+  };
 
   useEffect(() => {
     if (currentRevision?.id) {
@@ -154,7 +169,7 @@ export const RevisionDetailPage = () => {
   const loadReferenceData = async () => {
     try {
       const [productsRes, ingredientsRes] = await Promise.all([
-        referenceAPI.getProducts(),
+        referenceAPI.getProducts({ fields: 'id,title' }),
         referenceAPI.getIngredients(),
       ]);
       setProducts(productsRes.data?.results || productsRes.data || []);
@@ -445,9 +460,36 @@ export const RevisionDetailPage = () => {
       formData.append('type', type);
 
       const response = await revisionItemsAPI.uploadExcel(formData);
-      
-      if (response.data.success) {
-        alert(`Успешно загружено ${response.data.count} записей`);
+
+      if (response.status === 202 && response.data.job) {
+        // Большой файл обрабатывается в фоне: ждем завершения задачи
+        let job = response.data.job;
+        const deadline = Date.now() + IMPORT_JOB_POLL_TIMEOUT_MS;
+        while ((job.status === 'pending' || job.status === 'running') && Date.now() < deadline) {
+          await new Promise((resolve) => setTimeout(resolve, IMPORT_JOB_POLL_INTERVAL_MS));
+          job = (await importJobsAPI.get(job.id)).data;
+        }
+        if (job.status === 'pending' || job.status === 'running') {
+          alert(
+            'Загрузка не завершилась за 15 минут. Обновите страницу позже или загрузите файл ' +
+              'повторно: зависшая загрузка будет запущена заново.'
+          );
+        } else if (job.status === 'completed') {
+          const errors = job.result?.errors || [];
+          alert(
+            `Успешно загружено ${job.result?.count ?? 0} записей` +
+              (errors.length ? `\nОшибки (${errors.length}):\n${errors.slice(0, 10).join('\n')}` : '')
+          );
+          fetchRevision(id);
+        } else {
+          alert('Ошибка при загрузке: ' + (job.error || 'Неизвестная ошибка'));
+        }
+      } else if (response.data.success) {
+        const errors = response.data.errors || [];
+        alert(
+          `Успешно загружено ${response.data.count} записей` +
+            (errors.length ? `\nОшибки (${errors.length}):\n${errors.slice(0, 10).join('\n')}` : '')
+        );
         fetchRevision(id);
       } else {
         alert('Ошибка при загрузке: ' + (response.data.error || 'Неизвестная ошибка'));
@@ -573,7 +615,7 @@ export const RevisionDetailPage = () => {
               <label style={{ cursor: 'pointer' }}>
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.csv,.tsv"
                   style={{ display: 'none' }}
                   onChange={(e) => handleExcelUpload(e, 'products')}
                 />
@@ -58,11 +58,13 @@ api.interceptors.response.use(
 export const revisionsAPI = {
   getAll: (params) => api.get('/revisions/', { params }),
   getById: (id) => api.get(`/revisions/${id}/`),
+  workspace: (id) => api.get(`/revisions/${id}/workspace/`),
   create: (data) => api.post('/revisions/', data),
   update: (id, data) => api.put(`/revisions/${id}/`, data),
   delete: (id) => api.delete(`/revisions/${id}/`),
   calculate: (id) => api.post(`/revisions/${id}/calculate/`),
   summary: (id) => api.get(`/revisions/${id}/summary/`),
+  summaries: (ids, params) => api.get('/revisions/summaries/', { params: { ids: ids.join(','), ...params } }),
   submit: (id) => api.post(`/revisions/${id}/submit/`),
   approve: (id) => api.post(`/revisions/${id}/approve/`),
   reject: (id, data) => api.post(`/revisions/${id}/reject/`, data),
@@ -72,6 +74,7 @@ export const revisionsAPI = {
 export const reportsAPI = {
   getAll: (params) => api.get('/revision-reports/', { params }),
   getById: (id) => api.get(`/revision-reports/${id}/`),
+  exportUrl: (params) => `${API_BASE_URL}/revision-reports/export/?${new URLSearchParams(params)}`,
 };
 
 // Revision Items API
@@ -84,6 +87,9 @@ export const revisionItemsAPI = {
   createIngredientItem: (data) => api.post('/revision-ingredient-items/', data),
   updateIngredientItem: (id, data) => api.put(`/revision-ingredient-items/${id}/`, data),
   deleteIngredientItem: (id) => api.delete(`/revision-ingredient-items/${id}/`),
+  bulkUpsert: (revisionId, data) => api.post(`/revisions/${revisionId}/items/bulk/`, data),
+  previewFillFromSales: (revisionId) => api.get(`/revisions/${revisionId}/fill-from-sales/`),
+  fillFromSales: (revisionId) => api.post(`/revisions/${revisionId}/fill-from-sales/`),
   uploadExcel: (formData) => api.post('/revision-product-items/upload-excel/', formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
@@ -91,6 +97,12 @@ export const revisionItemsAPI = {
   }),
 };
 
+// Фоновые загрузки файлов (большие выгрузки кассы)
+export const importJobsAPI = {
+  get: (id) => api.get(`/import-jobs/${id}/`),
+  getAll: (params) => api.get('/import-jobs/', { params }),
+};
+
 // Reference Data API (справочники)
 export const referenceAPI = {
   getLocations: (params) => api.get('/locations/', { params }).catch(() => ({ data: [] })),
@@ -98,6 +110,11 @@ export const referenceAPI = {
   getIngredients: (params) => api.get('/ingredients/', { params }).catch(() => ({ data: [] })),
 };
 
+// Delta sync справочников: передать token из предыдущего ответа
+export const syncAPI = {
+  changes: (since) => api.get('/sync/', { params: since ? { since } : {} }),
+};
+
 // Locations API
 export const locationsAPI = {
   getAll: (params) => api.get('/locations/', { params }),
@@ -138,6 +155,10 @@ export const recipeItemsAPI = {
   create: (data) => api.post('/recipe-items/', data),
   update: (id, data) => api.put(`/recipe-items/${id}/`, data),
   delete: (id) => api.delete(`/recipe-items/${id}/`),
+  import: (formData) => api.post('/recipe-items/import/', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
+  exportUrl: (params) => `${API_BASE_URL}/recipe-items/export/?${new URLSearchParams(params)}`,
 };
 
 // Incoming (поступления) API
@@ -147,6 +168,23 @@ export const incomingAPI = {
   create: (data) => api.post('/incoming/', data),
   update: (id, data) => api.put(`/incoming/${id}/`, data),
   delete: (id) => api.delete(`/incoming/${id}/`),
+  bulkCreate: (data) => api.post('/incoming/bulk/', data),
+  import: (formData) => api.post('/incoming/import/', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
+  exportUrl: (params) => `${API_BASE_URL}/incoming/export/?${new URLSearchParams(params)}`,
+};
+
+// Синонимы названий для импортов (unmatched из ответа импорта -> позиция справочника)
+export const importAliasesAPI = {
+  getAll: (params) => api.get('/import-aliases/', { params }),
+  create: (data) => api.post('/import-aliases/', data),
+  delete: (id) => api.delete(`/import-aliases/${id}/`),
+};
+
+// Продажи из кассы (сводка по дням)
+export const salesAPI = {
+  daily: (params) => api.get('/sales/daily/', { params }),
 };
 
 // Ingredient inventories (текущие остатки номенклатуры) API
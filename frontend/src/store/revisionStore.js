@@ -38,6 +38,25 @@ export const useRevisionStore = create((set, get) => ({
     }
   },
 
+  // Открыть ревизию одним запросом: ревизия, остатки, отчеты и справочники
+  fetchWorkspace: async (id) => {
+    set({ loading: true, error: null });
+    try {
+      const response = await revisionsAPI.workspace(id);
+      const { revision, product_items, ingredient_items, reports, references } = response.data;
+      set({
+        currentRevision: { ...revision, product_items, ingredient_items, reports },
+        reports,
+      });
+      return references;
+    } catch (error) {
+      set({ error: error.message });
+      return null;
+    } finally {
+      set({ loading: false });
+    }
+  },
+
   // Создать ревизию
   createRevision: async (data) => {
     set({ loading: true, error: null });
@@ -3,7 +3,7 @@ Admin интерфейс для приложения products.
 """
 
 from django.contrib import admin
-from .models import Ingredient, Product, Recipe, RecipeItem
+from .models import ImportAlias, Ingredient, Product, Recipe, RecipeItem
 
 
 class RecipeItemInline(admin.TabularInline):
@@ -91,3 +91,13 @@ class RecipeAdmin(admin.ModelAdmin):
     def recipe_count(self, obj):
         """Показать количество ингредиентов в рецепте."""
         return obj.recipe_items.count()
+
+
+@admin.register(ImportAlias)
+class ImportAliasAdmin(admin.ModelAdmin):
+    """Admin для синонимов названий из импортов."""
+
+    list_display = ('alias', 'kind', 'product', 'ingredient', 'production', 'created_at')
+    list_filter = ('kind', 'production')
+    search_fields = ('alias', 'product__title', 'ingredient__title')
+    autocomplete_fields = ('product', 'ingredient')
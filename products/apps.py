@@ -5,3 +5,6 @@ class ProductsConfig(AppConfig):
     name = 'products'
     verbose_name = 'Продукт'
     verbose_name_plural = 'Продукты'
+
+    def ready(self):
+        from . import signals  # noqa: F401
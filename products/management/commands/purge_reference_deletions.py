@@ -0,0 +1,21 @@
+"""
+Management команда для очистки журнала удалений справочников.
+
+Использование:
+    python manage.py purge_reference_deletions
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.sync import purge_reference_deletions
+
+
+class Command(BaseCommand):
+    help = 'Удаляет записи журнала удалений старше SYNC_DELETION_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = purge_reference_deletions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted} (срок хранения {settings.SYNC_DELETION_RETENTION_DAYS} дн.)'
+        ))
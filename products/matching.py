@@ -0,0 +1,92 @@
+"""
+Сопоставление названий из импортов (Excel/CSV, касса) со справочником.
+
+normalize_title приводит название к ключу сопоставления: регистр,
+ё -> е, пунктуация и повторные пробелы не учитываются, поэтому
+"Багет ", "багет" и "БАГЕТ." дают один ключ. Ключ хранится в
+индексированном поле normalized_title у Product и Ingredient.
+
+TitleMatcher загружается один раз на импорт (два запроса: справочник и
+синонимы ImportAlias) и дальше сопоставляет любое число строк без
+обращений к БД. Ненайденные названия собираются группами
+(unmatched_groups) - по одной на ключ, чтобы пользователь мог одним
+действием создать синоним.
+"""
+
+import re
+
+# Все, кроме букв и цифр (в т.ч. кириллицы), считается разделителем
+_PUNCTUATION = re.compile(r'[^\w]+|_')
+
+KIND_PRODUCT = 'product'
+KIND_INGREDIENT = 'ingredient'
+
+
+def normalize_title(value) -> str:
+    """Ключ сопоставления названия: 'Багет  франц.' -> 'багет франц'."""
+    if value is None:
+        return ''
+    text = str(value).casefold().replace('ё', 'е')
+    return ' '.join(_PUNCTUATION.sub(' ', text).split())
+
+
+class TitleMatcher:
+    """
+    Названия продуктов или ингредиентов производства -> id.
+
+    Args:
+        kind: 'product' или 'ingredient'
+        production_id: производство (None - весь справочник, для суперпользователя)
+    """
+
+    def __init__(self, kind, production_id=None):
+        from .models import ImportAlias, Ingredient, Product
+
+        model = Product if kind == KIND_PRODUCT else Ingredient
+        self.kind = kind
+        self.production_id = production_id
+        objects = model.objects.all()
+        aliases = ImportAlias.objects.filter(kind=kind)
+        if production_id:
+            objects = objects.filter(production_id=production_id)
+            aliases = aliases.filter(production_id=production_id)
+
+        self.ids = set()
+        self.titles = {}
+        for object_id, key in objects.order_by('id').values_list('id', 'normalized_title'):
+            self.ids.add(object_id)
+            self.titles.setdefault(key, object_id)
+        self.aliases = dict(aliases.values_list('alias', f'{kind}_id'))
+        self._unmatched = {}
+
+    def match(self, name):
+        """id по названию или None (ненайденное запоминается для unmatched_groups)."""
+        key = normalize_title(name)
+        if not key:
+            return None
+        object_id = self.titles.get(key) or self.aliases.get(key)
+        if object_id is None:
+            group = self._unmatched.setdefault(key, {'name': ' '.join(str(name).split()), 'count': 0})
+            group['count'] += 1
+        return object_id
+
+    def add(self, name, object_id):
+        """Добавить созданный объект, чтобы следующие строки его находили."""
+        self.ids.add(object_id)
+        key = normalize_title(name)
+        self.titles.setdefault(key, object_id)
+        self._unmatched.pop(key, None)
+
+    def unmatched_groups(self, limit=None) -> list:
+        """
+        Ненайденные названия, сгруппированные по ключу.
+
+        Returns:
+            list[dict]: alias (ключ для POST /api/import-aliases/), name
+                        (первое написание из файла), count, kind;
+                        по убыванию count
+        """
+        groups = sorted(self._unmatched.items(), key=lambda item: (-item[1]['count'], item[0]))
+        if limit is not None:
+            groups = groups[:limit]
+        return [{'alias': key, 'kind': self.kind, **group} for key, group in groups]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_add_production_fields'),
+        ('users', '0003_production_invites_and_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Новый рецепт',
+                'verbose_name_plural': 'Новые рецепты',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('products.product',),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='recipeitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления'),
+        ),
+        migrations.CreateModel(
+            name='ReferenceDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('product', 'Продукт'), ('ingredient', 'Ингредиент'), ('recipe_item', 'Строка тех. карты'), ('location', 'Точка производства')], max_length=20, verbose_name='Тип справочника')),
+                ('object_id', models.BigIntegerField(verbose_name='ID удаленной записи')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+                ('production', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reference_deletions', to='users.production', verbose_name='Производство')),
+            ],
+            options={
+                'verbose_name': 'Удаление из справочника',
+                'verbose_name_plural': 'Удаления из справочников',
+                'indexes': [models.Index(fields=['production', 'deleted_at'], name='products_re_product_6709c3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.matching import normalize_title
+
+
+def fill_normalized_titles(apps, schema_editor):
+    for model_name in ('Product', 'Ingredient'):
+        model = apps.get_model('products', model_name)
+        objects = list(model.objects.only('id', 'title'))
+        for obj in objects:
+            obj.normalized_title = normalize_title(obj.title)
+        model.objects.bulk_update(objects, ['normalized_title'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_reference_sync'),
+        ('users', '0003_production_invites_and_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Продукт'), ('ingredient', 'Ингредиент')], max_length=20, verbose_name='Тип')),
+                ('alias', models.CharField(max_length=255, verbose_name='Название в импорте (нормализованное)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Синоним для импорта',
+                'verbose_name_plural': 'Синонимы для импорта',
+            },
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_title',
+            field=models.CharField(default='', editable=False, help_text='Заполняется автоматически (products.matching.normalize_title)', max_length=100, verbose_name='Название для сопоставления'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='normalized_title',
+            field=models.CharField(default='', editable=False, help_text='Заполняется автоматически (products.matching.normalize_title)', max_length=100, verbose_name='Название для сопоставления'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['production', 'normalized_title'], name='products_in_product_f95224_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['production', 'normalized_title'], name='products_pr_product_43e2aa_idx'),
+        ),
+        migrations.AddField(
+            model_name='importalias',
+            name='ingredient',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='import_aliases', to='products.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.AddField(
+            model_name='importalias',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='import_aliases', to='products.product', verbose_name='Продукт'),
+        ),
+        migrations.AddField(
+            model_name='importalias',
+            name='production',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_aliases', to='users.production', verbose_name='Производство'),
+        ),
+        migrations.AddConstraint(
+            model_name='importalias',
+            constraint=models.UniqueConstraint(fields=('production', 'kind', 'alias'), name='unique_import_alias_per_production'),
+        ),
+        migrations.RunPython(fill_normalized_titles, migrations.RunPython.noop),
+    ]
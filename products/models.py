@@ -5,10 +5,13 @@
 - Product - продукт (могут производиться на разных точках)
 - Ingredient - ингредиент с единицей измерения
 - RecipeItem - рецепт (из каких ингредиентов состоит продукт)
+- ReferenceDeletion - журнал удалений справочников (для delta sync)
+- ImportAlias - синонимы названий из импортов
 """
 
 from django.db import models
 from users.models import Production
+from .matching import normalize_title
 
 
 CHOICES_UNIT = [
@@ -34,6 +37,13 @@ class Ingredient(models.Model):
         max_length=50,
         verbose_name='Название'
     )
+    normalized_title = models.CharField(
+        max_length=100,
+        editable=False,
+        default='',
+        verbose_name='Название для сопоставления',
+        help_text='Заполняется автоматически (products.matching.normalize_title)'
+    )
     unit = models.CharField(
         verbose_name='Единица измерения',
         choices=CHOICES_UNIT,
@@ -44,10 +54,25 @@ class Ingredient(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата обновления'
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            models.Index(fields=['production', 'normalized_title']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_title = normalize_title(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_title'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} ({self.get_unit_display()})"
@@ -68,6 +93,13 @@ class Product(models.Model):
         max_length=50,
         verbose_name='Название продукта'
     )
+    normalized_title = models.CharField(
+        max_length=100,
+        editable=False,
+        default='',
+        verbose_name='Название для сопоставления',
+        help_text='Заполняется автоматически (products.matching.normalize_title)'
+    )
     description = models.TextField(
         blank=True,
         verbose_name='Описание',
@@ -78,10 +110,25 @@ class Product(models.Model):
         verbose_name='Дата создания',
         null=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата обновления'
+    )
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
+        indexes = [
+            models.Index(fields=['production', 'normalized_title']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_title = normalize_title(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_title'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -116,6 +163,11 @@ class RecipeItem(models.Model):
         verbose_name='Дата создания',
         null=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата обновления'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -133,3 +185,117 @@ class Recipe(Product):
         proxy = True
         verbose_name = 'Новый рецепт'
         verbose_name_plural = 'Новые рецепты'
+
+
+REFERENCE_ENTITY_CHOICES = [
+    ('product', 'Продукт'),
+    ('ingredient', 'Ингредиент'),
+    ('recipe_item', 'Строка тех. карты'),
+    ('location', 'Точка производства'),
+]
+
+
+class ReferenceDeletion(models.Model):
+    """
+    Журнал удалений справочников производства.
+
+    Нужен для GET /api/sync/?since=, чтобы клиент мог удалить
+    у себя строки, которых больше нет на сервере.
+    """
+
+    production = models.ForeignKey(
+        Production,
+        on_delete=models.CASCADE,
+        related_name='reference_deletions',
+        verbose_name='Производство'
+    )
+    entity = models.CharField(
+        max_length=20,
+        choices=REFERENCE_ENTITY_CHOICES,
+        verbose_name='Тип справочника'
+    )
+    object_id = models.BigIntegerField(
+        verbose_name='ID удаленной записи'
+    )
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата удаления'
+    )
+
+    class Meta:
+        verbose_name = 'Удаление из справочника'
+        verbose_name_plural = 'Удаления из справочников'
+        indexes = [
+            models.Index(fields=['production', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entity_display()} #{self.object_id} ({self.deleted_at})"
+
+
+IMPORT_ALIAS_KIND_CHOICES = [
+    ('product', 'Продукт'),
+    ('ingredient', 'Ингредиент'),
+]
+
+
+class ImportAlias(models.Model):
+    """
+    Синоним названия из импорта: "Багет франц." -> продукт "Багет".
+
+    alias хранится в виде ключа normalize_title и используется
+    TitleMatcher наравне с названиями справочника.
+    """
+
+    production = models.ForeignKey(
+        Production,
+        on_delete=models.CASCADE,
+        related_name='import_aliases',
+        verbose_name='Производство'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=IMPORT_ALIAS_KIND_CHOICES,
+        verbose_name='Тип'
+    )
+    alias = models.CharField(
+        max_length=255,
+        verbose_name='Название в импорте (нормализованное)'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='import_aliases',
+        verbose_name='Продукт',
+        null=True,
+        blank=True
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='import_aliases',
+        verbose_name='Ингредиент',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'Синоним для импорта'
+        verbose_name_plural = 'Синонимы для импорта'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['production', 'kind', 'alias'],
+                name='unique_import_alias_per_production'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.alias = normalize_title(self.alias)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.product or self.ingredient}"
@@ -0,0 +1,258 @@
+"""
+Импорт технологических карт из файла (.xlsx / .csv / .tsv).
+
+Колонки: Продукт, Ингредиент, Норма (файл выгрузки
+GET /api/recipe-items/export/ подходит без изменений). Файл задает
+полный состав каждого продукта, который в нем есть: новые строки
+добавляются, изменившиеся нормы обновляются, ингредиенты, которых
+для продукта в файле нет, удаляются. Продукты, которых нет в файле,
+не меняются.
+
+Разница с текущими RecipeItem считается в памяти (один запрос на
+строки затронутых продуктов), запись - bulk_create с upsert и
+удаление одним запросом в одной транзакции. Сигналы на каждую строку
+не срабатывают: удаления пишутся в журнал ReferenceDeletion одной
+пачкой, кэш справочников сбрасывается один раз. Если в файле есть
+ошибки, ничего не сохраняется.
+"""
+
+import time
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.tabular import TabularError, batched, iter_table_rows, max_field_value, parse_decimal
+from .matching import KIND_INGREDIENT, KIND_PRODUCT, TitleMatcher
+from .models import RecipeItem, ReferenceDeletion
+from .signals import schedule_reference_bump
+
+HEADER_SEARCH_ROWS = 10
+MAX_DIAGNOSTICS = 500
+BATCH_SIZE = 1000
+# Норма больше колонки RecipeItem.quantity - ошибка строки, а не DataError при записи
+QUANTITY_MAX = max_field_value(RecipeItem._meta.get_field('quantity'))
+
+# Колонка -> слова в заголовке (норма проверяется первой:
+# "Количество ингредиента" - это норма, а не название)
+COLUMNS = {
+    'quantity': ('норма', 'количество', 'кол-во', 'quantity'),
+    'product': ('продукт', 'блюдо', 'изделие', 'product'),
+    'ingredient': ('ингредиент', 'номенклатура', 'сырье', 'ingredient'),
+}
+REQUIRED_COLUMNS = ('product', 'ingredient', 'quantity')
+
+
+class RecipeImportError(TabularError):
+    """Файл не удалось разобрать (нет колонок, не таблица и т.п.)."""
+
+
+def _find_headers(rows):
+    """Найти строку заголовков. Возвращает (номер строки, {колонка: индекс})."""
+    for row_idx, row in enumerate(rows, 1):
+        headers = {}
+        for col_idx, cell_value in enumerate(row):
+            if not cell_value:
+                continue
+            cell_str = str(cell_value).strip().lower()
+            for column, words in COLUMNS.items():
+                if column not in headers and any(word in cell_str for word in words):
+                    headers[column] = col_idx
+                    break
+        if all(column in headers for column in REQUIRED_COLUMNS):
+            return row_idx, headers
+        if row_idx >= HEADER_SEARCH_ROWS:
+            break
+    raise RecipeImportError('Не найдены необходимые колонки: Продукт, Ингредиент и Норма')
+
+
+def _cell(row, headers, column):
+    index = headers.get(column)
+    if index is None or index >= len(row):
+        return None
+    return row[index]
+
+
+def _read_cards(rows, headers, first_row_idx, products, ingredients, diagnostics, counters):
+    """
+    Разобрать строки файла в тех. карты.
+
+    Returns:
+        {product_id: {ingredient_id: норма}}
+    """
+    cards = {}
+    for row_idx, row in enumerate(rows, first_row_idx):
+        product_name = _cell(row, headers, 'product')
+        ingredient_name = _cell(row, headers, 'ingredient')
+        quantity = _cell(row, headers, 'quantity')
+        if not product_name and not ingredient_name and quantity in (None, ''):
+            continue
+        counters['processed'] += 1
+
+        def error(message):
+            diagnostics.append({'row': row_idx, 'product': str(product_name or ''),
+                                'ingredient': str(ingredient_name or ''), 'message': message})
+            counters['failed'] += 1
+
+        product_id = products.match(str(product_name)) if product_name else None
+        if product_id is None:
+            error('Продукт не найден в справочнике' if product_name else 'Не указан продукт')
+            continue
+        ingredient_id = ingredients.match(str(ingredient_name)) if ingredient_name else None
+        if ingredient_id is None:
+            error('Ингредиент не найден в справочнике' if ingredient_name else 'Не указан ингредиент')
+            continue
+
+        try:
+            quantity = parse_decimal(quantity)
+        except (TypeError, ValueError, ArithmeticError):
+            error(f'Некорректная норма: {quantity}')
+            continue
+        if quantity <= 0:
+            error('Норма должна быть больше нуля')
+            continue
+        if quantity > QUANTITY_MAX:
+            error(f'Норма больше допустимой ({QUANTITY_MAX})')
+            continue
+
+        card = cards.setdefault(product_id, {})
+        if ingredient_id in card:
+            error('Ингредиент повторяется в тех. карте продукта')
+            continue
+        card[ingredient_id] = quantity.quantize(Decimal('0.001'))
+    return cards
+
+
+def diff_recipe_items(cards) -> dict:
+    """
+    Сравнить тех. карты из файла с текущими RecipeItem.
+
+    Returns:
+        dict: create / update - списки RecipeItem (без pk),
+              delete - id удаляемых строк, unchanged - число строк без изменений,
+              changes - [{product, ingredient, action, old, new}]
+    """
+    existing = {}
+    for item_id, product_id, ingredient_id, quantity in RecipeItem.objects.filter(
+        product_id__in=cards.keys()
+    ).values_list('id', 'product_id', 'ingredient_id', 'quantity'):
+        existing[(product_id, ingredient_id)] = (item_id, quantity)
+
+    diff = {'create': [], 'update': [], 'delete': [], 'unchanged': 0, 'changes': []}
+    for product_id, card in cards.items():
+        for ingredient_id, quantity in card.items():
+            current = existing.get((product_id, ingredient_id))
+            if current is None:
+                action, old = 'create', None
+            elif current[1] != quantity:
+                action, old = 'update', current[1]
+            else:
+                diff['unchanged'] += 1
+                continue
+            diff[action].append(RecipeItem(
+                product_id=product_id, ingredient_id=ingredient_id, quantity=quantity))
+            diff['changes'].append({'product': product_id, 'ingredient': ingredient_id,
+                                    'action': action, 'old': old, 'new': quantity})
+    for (product_id, ingredient_id), (item_id, quantity) in existing.items():
+        if ingredient_id not in cards[product_id]:
+            diff['delete'].append(item_id)
+            diff['changes'].append({'product': product_id, 'ingredient': ingredient_id,
+                                    'action': 'delete', 'old': quantity, 'new': None})
+    return diff
+
+
+def apply_recipe_diff(production_id, diff):
+    """
+    Записать разницу одной транзакцией: upsert новых и измененных строк,
+    журнал удалений, удаление, один сброс кэша справочников.
+    """
+    now = timezone.now()
+    upserts = diff['create'] + diff['update']
+    for item in upserts:
+        item.updated_at = now
+    with transaction.atomic():
+        # upsert: параллельное редактирование тех. карты не роняет импорт
+        RecipeItem.objects.bulk_create(
+            upserts,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['product', 'ingredient'],
+            update_fields=['quantity', 'updated_at'],
+        )
+        for chunk in batched(diff['delete'], BATCH_SIZE):
+            ReferenceDeletion.objects.bulk_create([
+                ReferenceDeletion(production_id=production_id, entity='recipe_item', object_id=item_id)
+                for item_id in chunk
+            ])
+            deleted = RecipeItem.objects.filter(id__in=chunk)
+            # Журнал уже записан, сигнал удаления строки пропускает запись и сброс кэша
+            deleted._reference_deletions_recorded = True
+            deleted.delete()
+        if upserts or diff['delete']:
+            schedule_reference_bump(production_id)
+
+
+def import_recipe_items(rows, production_id, dry_run=False) -> dict:
+    """
+    Загрузить тех. карты производства из строк таблицы.
+
+    Args:
+        rows: итератор строк (кортежи значений ячеек), включая заголовок
+        production_id: производство, продукты и ингредиенты ищутся в нем
+        dry_run: только посчитать разницу, ничего не записывая
+
+    Returns:
+        dict: products, rows_processed, rows_failed, created, updated, deleted,
+              unchanged, changes, errors, diagnostics, unmatched, timings_ms.
+              При ошибках в строках ничего не сохраняется.
+
+    Raises:
+        TabularError: файл не удалось разобрать
+    """
+    started = time.perf_counter()
+    products = TitleMatcher(KIND_PRODUCT, production_id)
+    ingredients = TitleMatcher(KIND_INGREDIENT, production_id)
+    loaded_at = time.perf_counter()
+
+    diagnostics = []
+    counters = {'processed': 0, 'failed': 0}
+    rows = iter(rows)
+    try:
+        header_row_idx, headers = _find_headers(rows)
+        cards = _read_cards(rows, headers, header_row_idx + 1, products, ingredients,
+                            diagnostics, counters)
+    finally:
+        close = getattr(rows, 'close', None)
+        if close:
+            close()
+
+    diff = diff_recipe_items(cards)
+    saved = not counters['failed'] and not dry_run
+    if saved:
+        apply_recipe_diff(production_id, diff)
+    finished = time.perf_counter()
+
+    return {
+        'saved': saved,
+        'products': len(cards),
+        'rows_processed': counters['processed'],
+        'rows_failed': counters['failed'],
+        'created': len(diff['create']),
+        'updated': len(diff['update']),
+        'deleted': len(diff['delete']),
+        'unchanged': diff['unchanged'],
+        'changes': diff['changes'][:MAX_DIAGNOSTICS],
+        'errors': [f"Строка {item['row']}: {item['message']}" for item in diagnostics[:MAX_DIAGNOSTICS]],
+        'diagnostics': diagnostics[:MAX_DIAGNOSTICS],
+        'unmatched': products.unmatched_groups(MAX_DIAGNOSTICS) + ingredients.unmatched_groups(MAX_DIAGNOSTICS),
+        'timings_ms': {
+            'load_reference': round((loaded_at - started) * 1000, 1),
+            'import': round((finished - loaded_at) * 1000, 1),
+            'total': round((finished - started) * 1000, 1),
+        },
+    }
+
+
+def import_recipe_items_from_file(file, name=None, **kwargs) -> dict:
+    """Загрузить тех. карты из файла .xlsx / .csv / .tsv (см. import_recipe_items)."""
+    return import_recipe_items(iter_table_rows(file, name), **kwargs)
@@ -3,10 +3,12 @@ Serializers для приложения products.
 """
 
 from rest_framework import serializers
-from .models import Ingredient, Product, RecipeItem
+from core.serializers import SparseFieldsetModelSerializer
+from .matching import normalize_title
+from .models import ImportAlias, Ingredient, Product, RecipeItem
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsetModelSerializer):
     """Serializer для Ingredient."""
 
     unit_display = serializers.CharField(
@@ -38,7 +40,7 @@ class RecipeItemSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at',)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetModelSerializer):
     """Serializer для Product."""
 
     recipe_items = RecipeItemSerializer(many=True, read_only=True)
@@ -47,9 +49,10 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = ('id', 'title', 'description', 'recipe_items', 'created_at')
         read_only_fields = ('created_at',)
+        expandable_fields = ('recipe_items',)
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetModelSerializer):
     """Детальный serializer для Product с рецептом."""
 
     recipe_items = RecipeItemSerializer(many=True, read_only=True)
@@ -58,3 +61,33 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         model = Product
         fields = ('id', 'title', 'description', 'recipe_items', 'created_at')
         read_only_fields = ('created_at',)
+        expandable_fields = ('recipe_items',)
+
+
+class ImportAliasSerializer(serializers.ModelSerializer):
+    """Serializer для ImportAlias (синоним названия из импорта)."""
+
+    target_title = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportAlias
+        fields = ('id', 'kind', 'alias', 'product', 'ingredient', 'target_title', 'created_at')
+        read_only_fields = ('created_at',)
+
+    def get_target_title(self, obj):
+        target = obj.product if obj.kind == 'product' else obj.ingredient
+        return target.title if target else ''
+
+    def validate(self, attrs):
+        kind = attrs.get('kind', getattr(self.instance, 'kind', None))
+        target = attrs.get(kind) if kind else None
+        if target is None and self.instance is not None:
+            target = getattr(self.instance, kind)
+        if target is None:
+            raise serializers.ValidationError(
+                {kind or 'kind': 'Укажите продукт или ингредиент, к которому относится синоним'})
+        # Лишняя ссылка на объект другого типа не сохраняется
+        attrs['product' if kind == 'ingredient' else 'ingredient'] = None
+        if not normalize_title(attrs.get('alias', getattr(self.instance, 'alias', ''))):
+            raise serializers.ValidationError({'alias': 'Пустой синоним'})
+        return attrs
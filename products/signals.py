@@ -0,0 +1,77 @@
+"""
+Сигналы приложения products.
+
+Любая запись Product, Ingredient или RecipeItem сбрасывает кэш
+справочников производства (см. core.reference_cache), а удаление
+дополнительно пишется в журнал ReferenceDeletion для delta sync.
+"""
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.reference_cache import bump_reference_version
+from users.models import Production
+from .models import Ingredient, Product, RecipeItem, ReferenceDeletion
+
+
+def schedule_reference_bump(production_id):
+    """
+    Сбросить кэш справочников сразу и еще раз после коммита транзакции.
+
+    Повторный сброс нужен, чтобы параллельный запрос не закэшировал
+    под новой версией данные, прочитанные до коммита.
+    """
+    if production_id:
+        bump_reference_version(production_id)
+        transaction.on_commit(lambda: bump_reference_version(production_id))
+
+
+def record_deletion(production_id, entity, object_id, origin=None):
+    """Записать удаление в журнал (кроме удаления самого производства)."""
+    if not production_id:
+        return
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Production:
+        return
+    ReferenceDeletion.objects.create(
+        production_id=production_id, entity=entity, object_id=object_id)
+
+
+def _recipe_item_production_id(instance):
+    return (
+        Product.objects
+        .filter(id=instance.product_id)
+        .values_list('production_id', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Ingredient)
+def reference_item_saved(sender, instance, **kwargs):
+    schedule_reference_bump(instance.production_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Ingredient)
+def reference_item_deleted(sender, instance, origin=None, **kwargs):
+    entity = 'product' if sender is Product else 'ingredient'
+    record_deletion(instance.production_id, entity, instance.pk, origin)
+    schedule_reference_bump(instance.production_id)
+
+
+@receiver(post_save, sender=RecipeItem)
+def recipe_item_saved(sender, instance, **kwargs):
+    schedule_reference_bump(_recipe_item_production_id(instance))
+
+
+@receiver(post_delete, sender=RecipeItem)
+def recipe_item_deleted(sender, instance, origin=None, **kwargs):
+    # Импорт тех. карт пишет журнал пачкой и сбрасывает кэш сам (см. recipe_import)
+    if getattr(origin, '_reference_deletions_recorded', False):
+        return
+    production_id = _recipe_item_production_id(instance)
+    record_deletion(production_id, 'recipe_item', instance.pk, origin)
+    schedule_reference_bump(production_id)
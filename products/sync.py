@@ -0,0 +1,132 @@
+"""
+Delta sync справочников производства.
+
+Клиент хранит у себя копию продуктов, номенклатуры, точек и тех. карт
+и запрашивает только изменения: GET /api/sync/?since=<token>.
+
+token - время сервера в микросекундах от epoch на момент ответа.
+Изменения ищутся по updated_at >= since - SYNC_OVERLAP_SECONDS
+(перекрытие закрывает транзакции, закоммиченные позже, чем они
+записали updated_at), поэтому одна строка может прийти повторно:
+клиент применяет строки как upsert по id. Удаления берутся из журнала
+ReferenceDeletion, который чистится старше SYNC_DELETION_RETENTION_DAYS;
+если since старше этого срока, отдается полный снимок (full=True).
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from sales.models import Location
+from .models import Ingredient, Product, RecipeItem, ReferenceDeletion
+
+
+def _entity_querysets(production_id):
+    return {
+        'products': (
+            Product.objects.filter(production_id=production_id),
+            ('id', 'title', 'description', 'updated_at'),
+        ),
+        'ingredients': (
+            Ingredient.objects.filter(production_id=production_id),
+            ('id', 'title', 'unit', 'updated_at'),
+        ),
+        'locations': (
+            Location.objects.filter(production_id=production_id),
+            ('id', 'title', 'address', 'code', 'updated_at'),
+        ),
+        'recipe_items': (
+            RecipeItem.objects.filter(product__production_id=production_id),
+            ('id', 'product_id', 'ingredient_id', 'quantity', 'updated_at'),
+        ),
+    }
+
+
+# Ключ ответа -> значение ReferenceDeletion.entity
+DELETION_ENTITIES = {
+    'products': 'product',
+    'ingredients': 'ingredient',
+    'locations': 'location',
+    'recipe_items': 'recipe_item',
+}
+
+
+def make_sync_token(moment) -> int:
+    """datetime -> token (микросекунды от epoch)."""
+    return int(moment.timestamp() * 1_000_000)
+
+
+def parse_sync_token(value):
+    """token -> aware datetime или None, если token некорректный."""
+    try:
+        micros = int(value)
+    except (TypeError, ValueError):
+        return None
+    if micros <= 0:
+        return None
+    try:
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _retention_start(now):
+    return now - timedelta(days=settings.SYNC_DELETION_RETENTION_DAYS)
+
+
+def purge_reference_deletions(now=None) -> int:
+    """Удалить записи журнала старше срока хранения. Возвращает количество."""
+    now = now or timezone.now()
+    deleted, _ = ReferenceDeletion.objects.filter(deleted_at__lt=_retention_start(now)).delete()
+    return deleted
+
+
+def _serialize_rows(queryset, fields):
+    rows = []
+    for row in queryset.order_by('id').values(*fields):
+        if 'quantity' in row and row['quantity'] is not None:
+            row['quantity'] = str(row['quantity'])
+        rows.append(row)
+    return rows
+
+
+def build_sync_payload(production_id, since=None) -> dict:
+    """
+    Изменения справочников производства с момента since.
+
+    Args:
+        production_id: id производства
+        since: значение параметра ?since= (token предыдущего ответа) или None
+
+    Returns:
+        dict: {'token', 'full', 'products', 'ingredients', 'locations',
+               'recipe_items', 'deleted': {сущность: [id, ...]}}
+    """
+    now = timezone.now()
+    since_at = parse_sync_token(since) if since not in (None, '') else None
+    full = since_at is None or since_at < _retention_start(now) or since_at > now
+
+    payload = {'token': make_sync_token(now), 'full': full}
+    changed_after = None if full else since_at - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    for name, (queryset, fields) in _entity_querysets(production_id).items():
+        if changed_after is not None:
+            queryset = queryset.filter(updated_at__gte=changed_after)
+        payload[name] = _serialize_rows(queryset, fields)
+
+    deleted = {name: [] for name in DELETION_ENTITIES}
+    if changed_after is not None:
+        entity_names = {entity: name for name, entity in DELETION_ENTITIES.items()}
+        rows = (
+            ReferenceDeletion.objects
+            .filter(production_id=production_id, deleted_at__gte=changed_after)
+            .order_by('id')
+            .values_list('entity', 'object_id')
+        )
+        for entity, object_id in rows:
+            name = entity_names.get(entity)
+            if name is not None:
+                deleted[name].append(object_id)
+    payload['deleted'] = deleted
+    return payload
@@ -1,3 +1,191 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.reference_cache import HIT_METRIC, MISS_METRIC, get_reference_version
+from sales.models import Location
+from users.models import Production, User
+from .models import Ingredient, Product, RecipeItem, ReferenceDeletion
+from .sync import make_sync_token
+
+
+class RecipeImportTests(TestCase):
+    """Импорт тех. карт: разница с текущими нормами, dry_run, запись, границы нормы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.bread = Product.objects.create(production=production, title='Багет')
+        cls.loaf = Product.objects.create(production=production, title='Батон')
+        cls.flour = Ingredient.objects.create(production=production, title='Мука', unit='kg')
+        cls.salt = Ingredient.objects.create(production=production, title='Соль', unit='kg')
+        cls.water = Ingredient.objects.create(production=production, title='Вода', unit='l')
+        RecipeItem.objects.create(product=cls.bread, ingredient=cls.flour, quantity=Decimal('0.3'))
+        RecipeItem.objects.create(product=cls.bread, ingredient=cls.salt, quantity=Decimal('0.01'))
+        RecipeItem.objects.create(product=cls.loaf, ingredient=cls.flour, quantity=Decimal('0.4'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _import(self, content, **data):
+        return self.client.post('/api/recipe-items/import/', {
+            'file': SimpleUploadedFile('recipes.csv', content.encode()), **data})
+
+    def _recipes(self):
+        return sorted(RecipeItem.objects.values_list('product__title', 'ingredient__title', 'quantity'))
+
+    def test_dry_run_reports_diff_without_saving(self):
+        before = self._recipes()
+
+        response = self._import('Продукт;Ингредиент;Норма\nБагет;Мука;0,35\nБагет;Вода;0,2\n', dry_run='1')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['saved'])
+        self.assertEqual((data['created'], data['updated'], data['deleted'], data['unchanged']), (1, 1, 1, 0))
+        self.assertEqual(
+            sorted((change['ingredient'], change['action'], change['old'], change['new'])
+                   for change in data['changes']),
+            sorted([(self.flour.id, 'update', 0.3, 0.35),
+                    (self.water.id, 'create', None, 0.2),
+                    (self.salt.id, 'delete', 0.01, None)]),
+        )
+        self.assertEqual(self._recipes(), before)
+
+    def test_apply_replaces_cards_of_products_in_file(self):
+        response = self._import('Продукт;Ингредиент;Норма\nБагет;Мука;0,35\nБагет;Вода;0,2\n')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['saved'])
+        self.assertEqual(self._recipes(), [
+            ('Багет', 'Вода', Decimal('0.200')),
+            ('Багет', 'Мука', Decimal('0.350')),
+            ('Батон', 'Мука', Decimal('0.400')),
+        ])
+
+    def test_norm_over_column_limit_is_row_error(self):
+        before = self._recipes()
+
+        response = self._import('Продукт;Ингредиент;Норма\nБагет;Мука;0,35\nБагет;Соль;99999999\nБатон;Мука;1e30\n')
+
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data['rows_failed'], 2)
+        self.assertTrue(all('больше допустимой' in error for error in data['errors']))
+        self.assertEqual(self._recipes(), before)
+
+
+class ReferenceCacheTests(TestCase):
+    """Запись справочника увеличивает версию производства, кэш списка сбрасывается."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.other = Production.objects.create(name='Другая', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=cls.production)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saving_reference_bumps_version(self):
+        for create in (
+            lambda: Product.objects.create(production=self.production, title='Багет'),
+            lambda: Ingredient.objects.create(production=self.production, title='Мука', unit='kg'),
+            lambda: Location.objects.create(production=self.production, title='Цех', code='C1'),
+        ):
+            version = get_reference_version(self.production.id)
+            other_version = get_reference_version(self.other.id)
+
+            create()
+
+            self.assertGreater(get_reference_version(self.production.id), version)
+            self.assertEqual(get_reference_version(self.other.id), other_version)
+
+    def test_cached_list_is_invalidated(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        Product.objects.create(production=self.production, title='Багет')
+
+        def titles():
+            response = client.get('/api/products/')
+            self.assertEqual(response.status_code, 200)
+            return [item['title'] for item in response.json()]
+
+        self.assertEqual(titles(), ['Багет'])
+        self.assertEqual(titles(), ['Багет'])
+        counters = metrics.snapshot()
+        self.assertEqual((counters[MISS_METRIC], counters[HIT_METRIC]), (1, 1))
+
+        Product.objects.create(production=self.production, title='Батон')
+
+        self.assertEqual(sorted(titles()), ['Багет', 'Батон'])
+        self.assertEqual(metrics.snapshot()[MISS_METRIC], 2)
+
+
+class ReferenceSyncTests(TestCase):
+    """GET /api/sync/: изменения по updated_at, удаления из журнала и его очистка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=cls.production)
+        cls.bread = Product.objects.create(production=cls.production, title='Багет')
+        cls.loaf = Product.objects.create(production=cls.production, title='Батон')
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, since=None):
+        response = self.client.get('/api/sync/', {'since': since} if since is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_delta_returns_changes_and_deletions_since_token(self):
+        snapshot = self._sync()
+        self.assertTrue(snapshot['full'])
+        self.assertEqual([row['title'] for row in snapshot['products']], ['Багет', 'Батон'])
+
+        bun = Product.objects.create(production=self.production, title='Булочка')
+        loaf_id = self.loaf.id
+        self.loaf.delete()
+
+        delta = self._sync(snapshot['token'])
+        self.assertFalse(delta['full'])
+        self.assertEqual([row['id'] for row in delta['products']], [bun.id])
+        self.assertEqual(delta['deleted']['products'], [loaf_id])
+        self.assertGreater(delta['token'], snapshot['token'])
+
+    def test_token_older_than_retention_gives_full_snapshot(self):
+        since = make_sync_token(timezone.now() - timedelta(days=31))
+
+        payload = self._sync(since)
+
+        self.assertTrue(payload['full'])
+        self.assertEqual(len(payload['products']), 2)
+        self.assertTrue(self._sync('не число')['full'])
+
+    def test_purge_removes_only_expired_deletions(self):
+        bread_id, loaf_id = self.bread.id, self.loaf.id
+        self.bread.delete()
+        self.loaf.delete()
+        ReferenceDeletion.objects.filter(object_id=bread_id).update(
+            deleted_at=timezone.now() - timedelta(days=31))
+
+        call_command('purge_reference_deletions', stdout=io.StringIO())
 
-# Create your tests here.
+        self.assertEqual(list(ReferenceDeletion.objects.values_list('object_id', flat=True)), [loaf_id])
@@ -1,3 +1,30 @@
-from django.shortcuts import render
+"""
+Views для приложения products.
+"""
 
-# Create your views here.
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .sync import build_sync_payload
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_reference_data(request):
+    """
+    Изменения справочников производства с момента предыдущей синхронизации.
+
+    GET /api/sync/?since=<token>
+    Без since (или если since устарел) отдается полный снимок, full=true.
+    Клиент сохраняет token из ответа и передает его в следующий раз.
+    """
+    production_id = getattr(request.user, 'production_id', None)
+    if not production_id:
+        return Response(
+            {'error': 'Пользователь не привязан к производству'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(build_sync_payload(production_id, request.query_params.get('since')))
@@ -1,24 +1,35 @@
 """ViewSets для REST API приложения products."""
 
+from django.db import IntegrityError, transaction
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.exceptions import ValidationError
-from .models import Product, Ingredient, RecipeItem
-from .serializers import ProductSerializer, IngredientSerializer, RecipeItemSerializer
+from core.export import StreamingExportMixin
+from core.reference_cache import ReferenceCacheListMixin
+from core.serializers import SparsePrefetchMixin
+from core.tabular import TabularError
+from .models import CHOICES_UNIT, ImportAlias, Product, Ingredient, RecipeItem
+from .recipe_import import import_recipe_items_from_file
+from .serializers import ProductSerializer, IngredientSerializer, RecipeItemSerializer, ImportAliasSerializer
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReferenceCacheListMixin, SparsePrefetchMixin, viewsets.ModelViewSet):
     """ViewSet для продуктов."""
 
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    sparse_prefetches = {
+        'recipe_items': ('recipe_items__ingredient',),
+    }
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ('title', 'description')
     ordering_fields = ('title', 'created_at')
     ordering = ['title']
+    reference_cache_name = 'products'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -70,7 +81,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheListMixin, viewsets.ModelViewSet):
     """ViewSet для ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -80,6 +91,7 @@ class IngredientViewSet(viewsets.ModelViewSet):
     search_fields = ('title',)
     ordering_fields = ('title', 'created_at')
     ordering = ['title']
+    reference_cache_name = 'ingredients'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -131,16 +143,28 @@ class IngredientViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class RecipeItemViewSet(viewsets.ModelViewSet):
+class RecipeItemViewSet(ReferenceCacheListMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """ViewSet для технологических карт (строк рецепта)."""
 
-    queryset = RecipeItem.objects.all()
+    queryset = RecipeItem.objects.select_related('product', 'ingredient')
     serializer_class = RecipeItemSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ('product__title', 'ingredient__title')
     ordering_fields = ('created_at',)
     ordering = ['created_at']
+    reference_cache_name = 'recipe-items'
+    export_filename = 'recipe-items'
+    # Колонки совпадают с колонками импорта: выгрузку можно поправить и загрузить обратно
+    export_fields = (
+        ('product', 'product__title'),
+        ('ingredient', 'ingredient__title'),
+        ('quantity', 'quantity'),
+        ('unit', 'ingredient__unit', dict(CHOICES_UNIT).get),
+    )
+
+    def get_export_rows(self, queryset):
+        return super().get_export_rows(queryset.order_by('product__title', 'ingredient__title'))
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -212,3 +236,137 @@ class RecipeItemViewSet(viewsets.ModelViewSet):
         if denied:
             return denied
         return super().destroy(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_file(self, request):
+        """
+        Загрузить тех. карты из файла (.xlsx / .csv / .tsv).
+
+        POST /api/recipe-items/import/  (multipart: file, [dry_run], [production] - для суперпользователя)
+        Колонки: Продукт, Ингредиент, Норма. Для каждого продукта из файла
+        состав заменяется файлом (добавление / изменение нормы / удаление).
+        dry_run=1 - только показать изменения. При ошибках в строках
+        ничего не сохраняется (ответ 400 с errors).
+        """
+        denied = self._deny_staff(request)
+        if denied:
+            return denied
+        user = request.user
+        production_id = getattr(user, 'production_id', None)
+        if user.is_superuser and not production_id:
+            production_id = request.data.get('production') or None
+        if not production_id:
+            return Response(
+                {'error': 'Пользователь не привязан к производству'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if 'file' not in request.FILES:
+            return Response(
+                {'error': 'Файл не предоставлен'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file = request.FILES['file']
+        try:
+            result = import_recipe_items_from_file(
+                file,
+                name=file.name,
+                production_id=int(production_id),
+                dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'),
+            )
+        except (TabularError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if result['rows_failed']:
+            return Response(
+                {'error': 'Файл содержит ошибки, тех. карты не загружены', **result},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not result['saved']:
+            return Response(result)
+        return Response({
+            'message': (f"Тех. карты загружены: добавлено {result['created']}, "
+                        f"изменено {result['updated']}, удалено {result['deleted']}"),
+            **result,
+        })
+
+
+class ImportAliasViewSet(viewsets.ModelViewSet):
+    """
+    Синонимы названий для импортов.
+
+    Импорт возвращает ненайденные названия группами (unmatched: alias, kind,
+    name, count); POST /api/import-aliases/ {kind, alias, product|ingredient}
+    привязывает такое название к позиции справочника.
+    """
+
+    queryset = ImportAlias.objects.select_related('product', 'ingredient')
+    serializer_class = ImportAliasSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [SearchFilter, OrderingFilter]
+    search_fields = ('alias', 'product__title', 'ingredient__title')
+    ordering_fields = ('alias', 'created_at')
+    ordering = ['alias']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_superuser:
+            if getattr(user, 'production_id', None):
+                queryset = queryset.filter(production_id=user.production_id)
+            else:
+                return queryset.none()
+        kind = self.request.query_params.get('kind')
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        return queryset
+
+    def _deny_staff(self, request):
+        user = request.user
+        if hasattr(user, 'role') and user.role == 'staff':
+            return Response(
+                {'error': 'Недостаточно прав для изменения синонимов'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+
+    def perform_create(self, serializer):
+        kind = serializer.validated_data.get('kind', getattr(serializer.instance, 'kind', None))
+        target = serializer.validated_data.get(kind) or getattr(serializer.instance, kind, None)
+        user = self.request.user
+        if not user.is_superuser and target.production_id != getattr(user, 'production_id', None):
+            raise ValidationError('Позиция должна принадлежать вашему производству')
+        if not target.production_id:
+            raise ValidationError('Позиция не привязана к производству')
+        try:
+            with transaction.atomic():
+                serializer.save(production_id=target.production_id)
+        except IntegrityError:
+            raise ValidationError({'alias': 'Такой синоним уже есть'})
+
+    def perform_update(self, serializer):
+        self.perform_create(serializer)
+
+    def create(self, request, *args, **kwargs):
+        denied = self._deny_staff(request)
+        if denied:
+            return denied
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        denied = self._deny_staff(request)
+        if denied:
+            return denied
+        return super().update(request, *args, **kwargs)
+
+    def partial_update(self, request, *args, **kwargs):
+        denied = self._deny_staff(request)
+        if denied:
+            return denied
+        return super().partial_update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        denied = self._deny_staff(request)
+        if denied:
+            return denied
+        return super().destroy(request, *args, **kwargs)
@@ -4,7 +4,9 @@ Admin интерфейс для приложения revisions.
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Revision, RevisionProductItem, RevisionIngredientItem, RevisionReport
+from .models import (
+    Revision, RevisionProductItem, RevisionIngredientItem, RevisionReport, ImportJob, RevisionArchive,
+)
 from .services import RevisionCalculator
 
 
@@ -14,14 +16,14 @@ class RevisionAdmin(admin.ModelAdmin):
 
     list_display = ('id', 'location', 'revision_date',
                     'status_badge', 'author', 'created_at')
-    list_filter = ('status', 'location', 'revision_date')
+    list_filter = ('status', 'is_archived', 'location', 'revision_date')
     search_fields = ('location__title', 'author__username')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('is_archived', 'created_at', 'updated_at')
     date_hierarchy = 'revision_date'
 
     fieldsets = (
         ('Основная информация', {
-            'fields': ('location', 'revision_date', 'author', 'status')
+            'fields': ('location', 'revision_date', 'author', 'status', 'is_archived')
         }),
         ('Комментарии', {
             'fields': ('comments',),
@@ -183,3 +185,32 @@ class RevisionReportAdmin(admin.ModelAdmin):
             obj.get_status_display()
         )
     status_badge.short_description = 'Статус'
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """Admin для фоновых загрузок файлов."""
+
+    list_display = ('id', 'revision', 'file_name', 'status', 'rows_processed',
+                    'rows_failed', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('file_name', 'file_hash', 'revision__location__title')
+    readonly_fields = ('file_path', 'file_hash', 'file_size', 'rows_processed', 'rows_failed',
+                       'result', 'error', 'attempts', 'created_at', 'started_at',
+                       'heartbeat_at', 'finished_at')
+
+
+@admin.register(RevisionArchive)
+class RevisionArchiveAdmin(admin.ModelAdmin):
+    """Admin для архивов ревизий (только просмотр)."""
+
+    list_display = ('revision', 'rows_archived', 'archived_at')
+    search_fields = ('revision__location__title',)
+    readonly_fields = ('revision', 'product_items', 'ingredient_items', 'reports', 'summary',
+                       'rows_archived', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
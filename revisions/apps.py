@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class RevisionsConfig(AppConfig):
     name = 'revisions'
+
+    def ready(self):
+        from core import readiness
+        from .services.import_jobs import check_import_queue
+
+        readiness.register_check('import_queue', check_import_queue)
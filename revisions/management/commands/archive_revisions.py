@@ -0,0 +1,67 @@
+"""
+Management команда для архивации старых завершенных ревизий.
+
+Остатки и отчеты завершенных ревизий старше --older-than-days дней
+переносятся в RevisionArchive (один JSON-документ на ревизию) пачками
+по --chunk-size ревизий, каждая пачка - отдельная транзакция.
+Архивные ревизии остаются доступны в API только для чтения и служат
+начальными остатками для следующих ревизий.
+
+Использование:
+    python manage.py archive_revisions [--older-than-days N] [--chunk-size N] [--limit N] [--location ID]
+    python manage.py archive_revisions --dry-run
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from revisions.models import Revision
+from revisions.services.archive import archive_revisions
+
+
+class Command(BaseCommand):
+    help = 'Переносит строки старых завершенных ревизий в архив (RevisionArchive)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.REVISION_ARCHIVE_AFTER_DAYS,
+            help=f'Возраст ревизии в днях (по умолчанию: {settings.REVISION_ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.REVISION_ARCHIVE_CHUNK_SIZE,
+            help=f'Ревизий в одной транзакции (по умолчанию: {settings.REVISION_ARCHIVE_CHUNK_SIZE})',
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Не больше N ревизий за запуск')
+        parser.add_argument('--location', type=int, default=None, help='ID точки')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько ревизий будет архивировано',
+        )
+
+    def handle(self, *args, **options):
+        before_date = timezone.localdate() - timedelta(days=options['older_than_days'])
+
+        if options['dry_run']:
+            candidates = Revision.objects.filter(
+                status='completed', is_archived=False, revision_date__lt=before_date)
+            if options['location']:
+                candidates = candidates.filter(location_id=options['location'])
+            self.stdout.write(f'Ревизий до {before_date} к архивации: {candidates.count()}')
+            return
+
+        result = archive_revisions(
+            before_date,
+            chunk_size=max(1, options['chunk_size']),
+            limit=options['limit'],
+            location_id=options['location'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Архивировано ревизий: {result['revisions']}, строк перенесено: {result['rows']}"))
@@ -0,0 +1,72 @@
+"""
+Management команда для обработки очереди фоновых загрузок.
+
+Подбирает задачи, которые не дошли до пула потоков воркера
+(перезапуск/деплой), и задачи, зависшие в статусе running.
+
+С --loop N команда не завершается: каждые N секунд возвращает в
+очередь и выполняет только брошенные задачи (без прогресса дольше
+IMPORT_JOB_STALE_SECONDS), свежие задачи остаются пулу воркеров.
+Так ее запускает start.sh рядом с gunicorn.
+
+Использование:
+    python manage.py process_import_jobs [--limit N] [--no-requeue] [--loop N]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from revisions.services.import_jobs import process_pending_jobs, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые загрузки файлов из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Максимум задач за запуск (по умолчанию: все)',
+        )
+        parser.add_argument(
+            '--no-requeue',
+            action='store_true',
+            help='Не возвращать в очередь зависшие задачи',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=None,
+            metavar='SECONDS',
+            help='Повторять каждые SECONDS секунд, выполняя только брошенные задачи',
+        )
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            self._loop(options['loop'], options['limit'])
+            return
+
+        if not options['no_requeue']:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f'Возвращено в очередь зависших задач: {len(requeued)}')
+
+        processed = process_pending_jobs(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
+
+    def _loop(self, interval, limit):
+        while True:
+            try:
+                stale_ids = requeue_stale_jobs()
+                if stale_ids:
+                    processed = process_pending_jobs(limit=limit, job_ids=stale_ids)
+                    self.stdout.write(f'Выполнено брошенных задач: {processed}')
+            except Exception as e:
+                # БД недоступна и т.п.: следующая попытка через interval
+                self.stderr.write(f'Ошибка обработки очереди загрузок: {e}')
+            finally:
+                connections.close_all()
+            time.sleep(interval)
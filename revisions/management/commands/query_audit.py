@@ -0,0 +1,230 @@
+"""
+Management команда для проверки планов горячих запросов.
+
+Выполняет запросы расчета ревизии (RevisionCalculator) и списков API
+под EXPLAIN (на PostgreSQL - EXPLAIN ANALYZE) и отмечает полные
+проходы (Seq Scan / SCAN) по таблицам, в которых не меньше
+--large-table-rows строк.
+
+С --seed перед проверкой создаются синтетические данные (производство,
+точки, номенклатура, ревизии, поступления); все изменения откатываются
+после проверки.
+
+Использование:
+    python manage.py query_audit [--seed] [--seed-revisions N] [--seed-ingredients N]
+                                 [--seed-incomings N] [--large-table-rows N] [--fail-on-scan]
+"""
+
+import random
+import re
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from products.models import Ingredient, Product, RecipeItem
+from revisions.models import Revision, RevisionIngredientItem, RevisionProductItem, RevisionReport
+from sales.models import DailySalesRollup, Incoming, Location
+from users.models import Production
+
+User = get_user_model()
+
+# Полный проход по таблице: PostgreSQL / SQLite ("SCAN t USING INDEX" - проход по индексу)
+SCAN_PATTERNS = (
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?! USING)'),
+)
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN горячих запросов расчета ревизии и API, поиск полных проходов по большим таблицам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Создать синтетические данные на время проверки (откатываются)',
+        )
+        parser.add_argument(
+            '--seed-revisions',
+            type=int,
+            default=200,
+            help='Ревизий для --seed (по умолчанию: 200)',
+        )
+        parser.add_argument(
+            '--seed-ingredients',
+            type=int,
+            default=100,
+            help='Ингредиентов для --seed (по умолчанию: 100)',
+        )
+        parser.add_argument(
+            '--seed-incomings',
+            type=int,
+            default=50000,
+            help='Поступлений для --seed (по умолчанию: 50000)',
+        )
+        parser.add_argument(
+            '--large-table-rows',
+            type=int,
+            default=1000,
+            help='С какого числа строк таблица считается большой (по умолчанию: 1000)',
+        )
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдены полные проходы (для CI)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.stdout.write('Создание синтетических данных...')
+                self._seed(options)
+                self._analyze()
+            try:
+                flagged = self._audit(options['large_table_rows'])
+            finally:
+                if options['seed']:
+                    transaction.set_rollback(True)
+
+        if flagged:
+            message = f'Полные проходы по большим таблицам: {flagged}'
+            if options['fail_on_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('Полных проходов по большим таблицам нет'))
+
+    def _queries(self):
+        """Представительные запросы: (название, queryset)."""
+        revision = (
+            Revision.objects
+            .filter(status='completed', ingredient_items__isnull=False)
+            .order_by('-revision_date')
+            .first()
+        )
+        if revision is None:
+            raise CommandError('Нет завершенных ревизий с остатками: запустите с --seed')
+        ingredient_id = revision.ingredient_items.values_list('ingredient_id', flat=True).first()
+        location = revision.location
+        production_id = location.production_id
+        start_date = revision.revision_date - timedelta(days=30)
+
+        return [
+            ('calculator: предыдущая ревизия', Revision.objects.filter(
+                location=location, revision_date__lt=revision.revision_date, status='completed',
+            ).order_by('-revision_date')[:1]),
+            ('calculator: остаток из предыдущей ревизии', RevisionIngredientItem.objects.filter(
+                revision=revision, ingredient_id=ingredient_id)[:1]),
+            ('calculator: поступления за период', Incoming.objects.filter(
+                ingredient_id=ingredient_id, location=location,
+                date__gte=start_date, date__lte=revision.revision_date,
+            ).values('ingredient_id').annotate(total=Sum('quantity')).order_by()),
+            ('calculator: продажи ревизии', RevisionProductItem.objects.filter(
+                revision=revision).values('product_id').annotate(total=Sum('actual_quantity')).order_by()),
+            ('calculator: рецепты ингредиента', RecipeItem.objects.filter(
+                ingredient_id=ingredient_id, product__production_id=production_id)),
+            ('api: отчет ревизии по отклонению', RevisionReport.objects.filter(
+                revision=revision).order_by('-percentage')),
+            ('api: проблемы ревизии', RevisionReport.objects.filter(
+                revision=revision, status='critical')),
+            ('api: ревизии производства', Revision.objects.filter(
+                location__production_id=production_id).order_by('-revision_date', 'location')[:50]),
+            ('api: поступления точки', Incoming.objects.filter(
+                location=location, date__gte=start_date).order_by('-date')[:50]),
+            ('api: продажи по дням', DailySalesRollup.objects.filter(
+                location_id__in=[location.id], date__gte=start_date,
+                date__lte=revision.revision_date)),
+        ]
+
+    def _table_sizes(self):
+        sizes = {}
+        for model in apps.get_models():
+            sizes[model._meta.db_table] = model._default_manager.count()
+        return sizes
+
+    def _explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True)
+        return queryset.explain()
+
+    def _audit(self, large_table_rows):
+        queries = self._queries()
+        sizes = self._table_sizes()
+        flagged = []
+        for name, queryset in queries:
+            plan = self._explain(queryset)
+            scanned = {
+                table
+                for pattern in SCAN_PATTERNS
+                for table in pattern.findall(plan)
+                if sizes.get(table, 0) >= large_table_rows
+            }
+            style = self.style.WARNING if scanned else self.style.SUCCESS
+            self.stdout.write(style(f'\n== {name}'))
+            self.stdout.write(plan)
+            for table in sorted(scanned):
+                self.stdout.write(self.style.WARNING(
+                    f'   полный проход по {table} ({sizes[table]} строк)'))
+                flagged.append(f'{name}: {table}')
+        return flagged
+
+    def _analyze(self):
+        """Обновить статистику планировщика после вставки данных."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _seed(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        production = Production.objects.create(
+            name=f'query_audit {suffix}', city='-', legal_name='-')
+        author = User.objects.create(username=f'query_audit_{suffix}', production=production)
+        locations = Location.objects.bulk_create([
+            Location(production=production, title=f'Точка {i}', code=f'QA{suffix}{i}')
+            for i in range(5)
+        ])
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(production=production, title=f'Ингредиент {i}', unit='g')
+            for i in range(options['seed_ingredients'])
+        ])
+        products = Product.objects.bulk_create([
+            Product(production=production, title=f'Продукт {i}')
+            for i in range(max(10, options['seed_ingredients'] // 5))
+        ])
+        RecipeItem.objects.bulk_create([
+            RecipeItem(product=product, ingredient=ingredient, quantity=Decimal('10'))
+            for product in products
+            for ingredient in random.sample(ingredients, min(10, len(ingredients)))
+        ], batch_size=1000)
+
+        today = date.today()
+        revisions = Revision.objects.bulk_create([
+            Revision(location=locations[i % len(locations)], author=author,
+                     revision_date=today - timedelta(days=7 * (i // len(locations))),
+                     status='completed' if i % 4 else 'draft')
+            for i in range(options['seed_revisions'])
+        ], batch_size=1000)
+        for revision in revisions:
+            RevisionIngredientItem.objects.bulk_create([
+                RevisionIngredientItem(revision=revision, ingredient=ingredient,
+                                       actual_quantity=Decimal(random.randint(0, 1000)))
+                for ingredient in ingredients
+            ])
+            RevisionReport.objects.bulk_create([
+                RevisionReport(revision=revision, ingredient=ingredient,
+                               expected_quantity=Decimal('100'), actual_quantity=Decimal('90'),
+                               difference=Decimal('-10'), percentage=Decimal(random.randint(0, 50)),
+                               status=random.choice(['ok', 'warning', 'critical']))
+                for ingredient in ingredients
+            ])
+        Incoming.objects.bulk_create([
+            Incoming(location=random.choice(locations), ingredient=random.choice(ingredients),
+                     date=today - timedelta(days=random.randint(0, 365)),
+                     quantity=Decimal(random.randint(1, 100)))
+            for _ in range(options['seed_incomings'])
+        ], batch_size=1000)
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revisions', '0002_import_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='importjob',
+            name='unique_import_job_per_revision_file',
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='kind',
+            field=models.CharField(choices=[('product', 'Остатки продуктов'), ('ingredient', 'Остатки ингредиентов')], default='product', max_length=20, verbose_name='Что загружается'),
+        ),
+        migrations.AddConstraint(
+            model_name='importjob',
+            constraint=models.UniqueConstraint(fields=('revision', 'kind', 'file_hash'), name='unique_import_job_per_revision_kind_file'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revisions', '0003_import_job_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='create_missing',
+            field=models.BooleanField(default=False, verbose_name='Создавать недостающие продукты'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_title_matching'),
+        ('revisions', '0004_import_job_create_missing'),
+        ('sales', '0006_incoming_location_ingredient_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='revision',
+            index=models.Index(fields=['location', 'status', 'revision_date'], name='revisions_r_locatio_3f971b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revisionreport',
+            index=models.Index(fields=['revision', 'status'], name='revisions_r_revisio_adaf47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revisionreport',
+            index=models.Index(fields=['revision', '-percentage'], name='revisions_r_revisio_94a90a_idx'),
+        ),
+    ]
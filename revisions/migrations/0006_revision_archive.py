@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:20
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revisions', '0005_revision_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revision',
+            name='is_archived',
+            field=models.BooleanField(default=False, help_text='Строки и отчеты перенесены в RevisionArchive, ревизия только для чтения', verbose_name='В архиве'),
+        ),
+        migrations.CreateModel(
+            name='RevisionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_items', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Остатки продуктов')),
+                ('ingredient_items', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Остатки ингредиентов')),
+                ('reports', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Отчеты')),
+                ('summary', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Сводка по отчетам')),
+                ('rows_archived', models.PositiveIntegerField(default=0, verbose_name='Строк перенесено')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('revision', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='revisions.revision', verbose_name='Ревизия')),
+            ],
+            options={
+                'verbose_name': 'Архив ревизии',
+                'verbose_name_plural': 'Архивы ревизий',
+            },
+        ),
+    ]
@@ -6,8 +6,11 @@
 - RevisionProductItem - остаток продукта в ревизии (из Excel файла)
 - RevisionIngredientItem - остаток ингредиента в ревизии
 - RevisionReport - отчет с расчетом расходов и разиц
+- ImportJob - фоновая загрузка большого файла в ревизию
+- RevisionArchive - строки старой завершенной ревизии одним JSON-документом
 """
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
 from products.models import Product, Ingredient
@@ -22,6 +25,18 @@ REVISION_STATUS_CHOICES = [
     ('completed', 'Завершена'),
 ]
 
+IMPORT_JOB_STATUS_CHOICES = [
+    ('pending', 'В очереди'),
+    ('running', 'Выполняется'),
+    ('completed', 'Завершена'),
+    ('failed', 'Ошибка'),
+]
+
+IMPORT_JOB_KIND_CHOICES = [
+    ('product', 'Остатки продуктов'),
+    ('ingredient', 'Остатки ингредиентов'),
+]
+
 REPORT_STATUS_CHOICES = [
     ('ok', '✅ Норма (0-3%)'),
     ('warning', '⚠️ Внимание (3-10%)'),
@@ -66,6 +81,11 @@ class Revision(models.Model):
         blank=True,
         verbose_name='Комментарии',
     )
+    is_archived = models.BooleanField(
+        default=False,
+        verbose_name='В архиве',
+        help_text='Строки и отчеты перенесены в RevisionArchive, ревизия только для чтения',
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания',
@@ -83,6 +103,8 @@ class Revision(models.Model):
         indexes = [
             models.Index(fields=['location', 'revision_date']),
             models.Index(fields=['status']),
+            # Предыдущая завершенная ревизия точки (_get_previous_revision)
+            models.Index(fields=['location', 'status', 'revision_date']),
         ]
 
     def __str__(self):
@@ -243,6 +265,178 @@ class RevisionReport(models.Model):
         verbose_name_plural = 'Отчеты по ревизиям'
         ordering = ['-revision__revision_date']
         unique_together = ('revision', 'ingredient')
+        indexes = [
+            models.Index(fields=['revision', 'status']),
+            # Отчет ревизии по убыванию отклонения (сортировка по умолчанию в API)
+            models.Index(fields=['revision', '-percentage']),
+        ]
 
     def __str__(self):
         return f"{self.ingredient.title} - {self.status}"
+
+
+class ImportJob(models.Model):
+    """
+    Фоновая загрузка файла в ревизию.
+
+    Файл сохраняется во временное хранилище (settings.IMPORT_JOB_DIR)
+    и обрабатывается вне запроса. Повторная загрузка того же файла
+    (тот же sha256, тот же kind) в ту же ревизию возвращает существующую задачу.
+    """
+
+    revision = models.ForeignKey(
+        Revision,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        verbose_name='Ревизия'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='import_jobs',
+        verbose_name='Автор'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=IMPORT_JOB_KIND_CHOICES,
+        default='product',
+        verbose_name='Что загружается'
+    )
+    create_missing = models.BooleanField(
+        default=False,
+        verbose_name='Создавать недостающие продукты'
+    )
+    file_name = models.CharField(
+        max_length=255,
+        verbose_name='Имя файла'
+    )
+    file_path = models.CharField(
+        max_length=500,
+        verbose_name='Путь к временному файлу'
+    )
+    file_hash = models.CharField(
+        max_length=64,
+        verbose_name='SHA-256 файла'
+    )
+    file_size = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Размер файла (байт)'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=IMPORT_JOB_STATUS_CHOICES,
+        default='pending',
+        verbose_name='Статус'
+    )
+    rows_processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк'
+    )
+    rows_failed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Строк с ошибками'
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Количество запусков'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начало обработки'
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последний прогресс'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Окончание обработки'
+    )
+
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['revision', 'kind', 'file_hash'],
+                name='unique_import_job_per_revision_kind_file',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+
+class RevisionArchive(models.Model):
+    """
+    Архив завершенной ревизии.
+
+    Остатки продуктов, ингредиентов и отчеты ревизии хранятся одним
+    документом вместо сотен строк в RevisionProductItem /
+    RevisionIngredientItem / RevisionReport. Каждый раздел - колонки
+    ответа API и строки значений: {"fields": [...], "rows": [[...], ...]}
+    (см. revisions.services.archive).
+    """
+
+    revision = models.OneToOneField(
+        Revision,
+        on_delete=models.CASCADE,
+        related_name='archive',
+        verbose_name='Ревизия'
+    )
+    product_items = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Остатки продуктов'
+    )
+    ingredient_items = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Остатки ингредиентов'
+    )
+    reports = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Отчеты'
+    )
+    summary = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Сводка по отчетам'
+    )
+    rows_archived = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Строк перенесено'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата архивации'
+    )
+
+    class Meta:
+        verbose_name = 'Архив ревизии'
+        verbose_name_plural = 'Архивы ревизий'
+
+    def __str__(self):
+        return f"Архив ревизии {self.revision_id} ({self.rows_archived} строк)"
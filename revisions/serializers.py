@@ -3,12 +3,15 @@ Serializers для приложения revisions.
 """
 
 from datetime import timedelta
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from .models import Revision, RevisionProductItem, RevisionIngredientItem, RevisionReport
+from core.serializers import SparseFieldsetModelSerializer
+from core.tabular import MAX_INTEGER
+from .models import Revision, RevisionProductItem, RevisionIngredientItem, RevisionReport, ImportJob
  
 
-class RevisionSerializer(serializers.ModelSerializer):
+class RevisionSerializer(SparseFieldsetModelSerializer):
     """Serializer для Revision."""
 
     location_title = serializers.CharField(
@@ -21,9 +24,9 @@ class RevisionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Revision
         fields = ('id', 'location', 'location_title', 'author', 'author_username',
-                  'revision_date', 'status', 'status_display', 'comments',
+                  'revision_date', 'status', 'status_display', 'comments', 'is_archived',
                   'created_at', 'updated_at')
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('is_archived', 'created_at', 'updated_at')
 
     def validate_location(self, value):
         request = self.context.get('request')
@@ -53,6 +56,8 @@ class RevisionProductItemSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         revision = attrs.get('revision') or getattr(self.instance, 'revision', None)
+        if revision and revision.is_archived:
+            raise ValidationError('Ревизия в архиве и доступна только для чтения')
         product = attrs.get('product') or getattr(self.instance, 'product', None)
         if revision and product:
             if revision.location.production_id and product.production_id != revision.location.production_id:
@@ -76,6 +81,8 @@ class RevisionIngredientItemSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         revision = attrs.get('revision') or getattr(self.instance, 'revision', None)
+        if revision and revision.is_archived:
+            raise ValidationError('Ревизия в архиве и доступна только для чтения')
         ingredient = attrs.get('ingredient') or getattr(self.instance, 'ingredient', None)
         if revision and ingredient:
             if revision.location.production_id and ingredient.production_id != revision.location.production_id:
@@ -101,7 +108,7 @@ class RevisionReportSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'difference', 'percentage')
 
 
-class RevisionDetailSerializer(serializers.ModelSerializer):
+class RevisionDetailSerializer(SparseFieldsetModelSerializer):
     """Детальный serializer для Revision с элементами и отчетами."""
 
     location_title = serializers.CharField(
@@ -122,9 +129,20 @@ class RevisionDetailSerializer(serializers.ModelSerializer):
         fields = ('id', 'location', 'location_title', 'author', 'author_username',
                   'revision_date', 'status', 'status_display', 'comments',
                   'product_items', 'ingredient_items', 'reports',
-                  'previous_revision_date', 'period_start_date',
+                  'previous_revision_date', 'period_start_date', 'is_archived',
                   'created_at', 'updated_at')
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('is_archived', 'created_at', 'updated_at')
+        expandable_fields = ('product_items', 'ingredient_items', 'reports')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.is_archived:
+            # Строки архивной ревизии хранятся в RevisionArchive
+            from .services.archive import get_archived_section
+            for name in self.Meta.expandable_fields:
+                if name in data:
+                    data[name] = get_archived_section(instance, name)
+        return data
 
     def _get_previous_revision(self, obj):
         return Revision.objects.filter(
@@ -142,3 +160,43 @@ class RevisionDetailSerializer(serializers.ModelSerializer):
         if previous:
             return previous.revision_date + timedelta(days=1)
         return obj.revision_date.replace(day=1)
+
+
+class BulkProductItemRowSerializer(serializers.Serializer):
+    """Строка массовой записи остатков продуктов."""
+
+    product = serializers.IntegerField()
+    # max_value - граница колонки: больше PostgreSQL отвергает всю пачку
+    actual_quantity = serializers.IntegerField(min_value=0, max_value=MAX_INTEGER)
+    comments = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class BulkIngredientItemRowSerializer(serializers.Serializer):
+    """Строка массовой записи остатков ингредиентов."""
+
+    ingredient = serializers.IntegerField()
+    actual_quantity = serializers.DecimalField(max_digits=10, decimal_places=3)
+    comments = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Serializer для ImportJob (статус фоновой загрузки)."""
+
+    status_display = serializers.CharField(
+        source='get_status_display', read_only=True)
+    rows_per_second = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ('id', 'revision', 'kind', 'create_missing', 'file_name', 'file_size', 'status', 'status_display',
+                  'rows_processed', 'rows_failed', 'rows_per_second', 'result', 'error',
+                  'attempts', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
+
+    def get_rows_per_second(self, obj):
+        if not obj.started_at:
+            return None
+        elapsed = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(obj.rows_processed / elapsed, 1)
@@ -3,5 +3,6 @@
 """
 
 from .revision_calculator import RevisionCalculator
+from .revision_summary import build_revision_summaries, build_revision_summary
 
-__all__ = ['RevisionCalculator']
+__all__ = ['RevisionCalculator', 'build_revision_summaries', 'build_revision_summary']
@@ -0,0 +1,122 @@
+"""
+Архив старых завершенных ревизий (RevisionArchive).
+
+Остатки продуктов, ингредиентов и отчеты ревизии упаковываются в один
+документ и удаляются из основных таблиц, ревизия помечается is_archived
+и дальше доступна только для чтения. Раздел документа хранится
+колонками ответа API (те же serializers, что у живой ревизии):
+
+    {"fields": ["id", "ingredient", "actual_quantity", ...],
+     "rows": [[1, 5, "12.500", ...], ...]}
+
+Архивация идет пачками по chunk_size ревизий, каждая пачка - своя
+транзакция, поэтому прерванный запуск можно просто повторить.
+"""
+
+import json
+
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.fast_read import get_values_reader
+from revisions.models import (
+    Revision,
+    RevisionArchive,
+    RevisionIngredientItem,
+    RevisionProductItem,
+    RevisionReport,
+)
+from revisions.serializers import (
+    RevisionIngredientItemSerializer,
+    RevisionProductItemSerializer,
+    RevisionReportSerializer,
+)
+from .revision_summary import MAX_TOP_CRITICAL, build_revision_summary
+
+# Раздел архива -> (модель, serializer, сортировка как в API)
+ARCHIVE_SECTIONS = {
+    'product_items': (RevisionProductItem, RevisionProductItemSerializer, 'product__title'),
+    'ingredient_items': (RevisionIngredientItem, RevisionIngredientItemSerializer, 'ingredient__title'),
+    'reports': (RevisionReport, RevisionReportSerializer, '-percentage'),
+}
+
+
+def pack_rows(rows, fields) -> dict:
+    """Список dict -> {'fields', 'rows'}."""
+    return {'fields': list(fields), 'rows': [[row.get(field) for field in fields] for row in rows]}
+
+
+def unpack_rows(document) -> list:
+    """{'fields', 'rows'} -> список dict (в формате ответа API)."""
+    fields = (document or {}).get('fields', [])
+    return [dict(zip(fields, row)) for row in (document or {}).get('rows', [])]
+
+
+def get_archived_section(revision, name) -> list:
+    """Раздел архива ревизии (product_items / ingredient_items / reports) списком dict."""
+    archive = getattr(revision, 'archive', None)
+    return unpack_rows(getattr(archive, name, None)) if archive else []
+
+
+def get_archived_balances(revision) -> dict:
+    """Фактические остатки ингредиентов архивной ревизии: {ingredient_id: actual_quantity}."""
+    return {
+        row['ingredient']: row['actual_quantity']
+        for row in get_archived_section(revision, 'ingredient_items')
+    }
+
+
+def archive_revision(revision) -> int:
+    """
+    Перенести строки ревизии в архив. Вызывать внутри transaction.atomic().
+
+    Returns:
+        число перенесенных строк
+    """
+    documents = {}
+    rows_archived = 0
+    for name, (model, serializer_class, ordering) in ARCHIVE_SECTIONS.items():
+        reader = get_values_reader(serializer_class)
+        rows = reader.read(model.objects.filter(revision=revision).order_by(ordering))
+        documents[name] = pack_rows(rows, [column.name for column in reader.columns])
+        rows_archived += len(rows)
+
+    # Сводка - в том виде, в каком ее отдает API (Decimal -> число)
+    summary = json.loads(json.dumps(
+        build_revision_summary(revision.id, MAX_TOP_CRITICAL), cls=JSONEncoder))
+
+    RevisionArchive.objects.update_or_create(
+        revision=revision,
+        defaults={**documents, 'summary': summary, 'rows_archived': rows_archived},
+    )
+    for model, _, _ in ARCHIVE_SECTIONS.values():
+        model.objects.filter(revision=revision).delete()
+    Revision.objects.filter(id=revision.id).update(is_archived=True)
+    revision.is_archived = True
+    return rows_archived
+
+
+def archive_revisions(before_date, chunk_size=20, limit=None, location_id=None) -> dict:
+    """
+    Архивировать завершенные ревизии с revision_date раньше before_date.
+
+    Returns:
+        dict: revisions, rows
+    """
+    candidates = Revision.objects.filter(
+        status='completed', is_archived=False, revision_date__lt=before_date)
+    if location_id:
+        candidates = candidates.filter(location_id=location_id)
+    candidates = candidates.order_by('revision_date', 'id')
+
+    totals = {'revisions': 0, 'rows': 0}
+    while limit is None or totals['revisions'] < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - totals['revisions'])
+        with transaction.atomic():
+            chunk = list(candidates.select_for_update()[:size])
+            if not chunk:
+                break
+            for revision in chunk:
+                totals['rows'] += archive_revision(revision)
+        totals['revisions'] += len(chunk)
+    return totals
@@ -0,0 +1,276 @@
+"""
+Фоновые задачи загрузки файлов в ревизию.
+
+Загруженный файл пишется во временный каталог (settings.IMPORT_JOB_DIR)
+с подсчетом sha256, создается ImportJob, и после коммита транзакции
+задача отдается пулу потоков воркера. Прогресс (обработано строк,
+ошибок) пишется в ImportJob по ходу разбора, статус отдает
+GET /api/import-jobs/{id}/.
+
+Идемпотентность: тот же файл (sha256) в той же ревизии возвращает
+существующую задачу; сама запись остатков - upsert, поэтому повторный
+запуск упавшей или зависшей задачи дает тот же результат. Повторная
+загрузка файла, задача которого брошена умершим воркером (нет
+прогресса дольше IMPORT_JOB_STALE_SECONDS), запускает ее заново.
+Такие задачи без повторной загрузки подбирает команда
+process_import_jobs --loop, которую start.sh запускает рядом с gunicorn.
+"""
+
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from core import readiness
+from core.tabular import TabularError, iter_table_rows, supported_suffixes
+from revisions.models import ImportJob
+from .item_import import ITEM_IMPORTERS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class ImportJobError(Exception):
+    """Файл нельзя поставить в очередь (неподдерживаемый формат и т.п.)."""
+
+
+def _job_dir() -> Path:
+    path = Path(settings.IMPORT_JOB_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMPORT_JOB_WORKERS, thread_name_prefix='import-job')
+    return _executor
+
+
+def _store_upload(uploaded_file, suffix):
+    """Записать файл во временный каталог. Возвращает (путь, sha256, размер)."""
+    digest = hashlib.sha256()
+    path = _job_dir() / f'{uuid.uuid4().hex}{suffix}'
+    size = 0
+    with open(path, 'wb') as target:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            target.write(chunk)
+            size += len(chunk)
+    return str(path), digest.hexdigest(), size
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Не удалось удалить файл загрузки {path}: {e}")
+
+
+def enqueue_import_job(revision, uploaded_file, author=None, kind='product', create_missing=False):
+    """
+    Поставить загрузку файла в ревизию в очередь.
+
+    Args:
+        kind: 'product' или 'ingredient' (см. ITEM_IMPORTERS)
+        create_missing: создавать недостающие продукты (только для 'product')
+
+    Returns:
+        (ImportJob, created): created=False, если этот файл уже загружался
+        в ревизию (упавшая задача перезапускается)
+
+    Raises:
+        ImportJobError: неподдерживаемый формат файла
+    """
+    if kind not in ITEM_IMPORTERS:
+        raise ImportJobError(f'Неизвестный тип загрузки: {kind}')
+    suffix = Path(uploaded_file.name).suffix.lower()
+    if suffix not in supported_suffixes():
+        raise ImportJobError(
+            f'Неподдерживаемый формат файла: {suffix or "?"} '
+            f'(поддерживаются {", ".join(supported_suffixes())})'
+        )
+
+    path, file_hash, size = _store_upload(uploaded_file, suffix)
+    job = ImportJob.objects.filter(revision=revision, kind=kind, file_hash=file_hash).first()
+    created = job is None
+    if created:
+        try:
+            with transaction.atomic():
+                job = ImportJob.objects.create(
+                    revision=revision,
+                    kind=kind,
+                    create_missing=create_missing and kind == 'product',
+                    author=author,
+                    file_name=uploaded_file.name[:255],
+                    file_path=path,
+                    file_hash=file_hash,
+                    file_size=size,
+                )
+        except IntegrityError:
+            # Параллельная загрузка того же файла
+            job = ImportJob.objects.get(revision=revision, kind=kind, file_hash=file_hash)
+            created = False
+
+    if not created:
+        # Упавшая задача или брошенная умершим воркером запускается заново
+        restart = job.status == 'failed' or (
+            job.status in ('pending', 'running') and requeue_stale_jobs(job_ids=[job.id]))
+        if not restart:
+            _remove_file(path)
+            return job, False
+        old_path = job.file_path
+        job.file_path = path
+        job.status = 'pending'
+        job.error = ''
+        job.create_missing = create_missing and kind == 'product'
+        job.save(update_fields=['file_path', 'status', 'error', 'create_missing'])
+        if old_path != path:
+            _remove_file(old_path)
+
+    job_id = job.id
+    transaction.on_commit(lambda: submit_import_job(job_id))
+    return job, created
+
+
+def submit_import_job(job_id):
+    """Выполнить задачу в пуле потоков воркера."""
+    _get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    except Exception:
+        logger.exception(f"Задача загрузки {job_id} упала")
+    finally:
+        # У потока пула свои соединения с БД
+        connections.close_all()
+
+
+def _fail(job_id, message):
+    ImportJob.objects.filter(id=job_id).update(
+        status='failed', error=message, finished_at=timezone.now())
+
+
+def run_import_job(job_id):
+    """
+    Выполнить задачу, если она в очереди (другой исполнитель ее не взял).
+
+    Returns:
+        ImportJob после выполнения или None, если задача не в статусе pending
+    """
+    now = timezone.now()
+    claimed = ImportJob.objects.filter(id=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now, finished_at=None,
+        rows_processed=0, rows_failed=0, attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return None
+
+    job = ImportJob.objects.select_related('revision__location').get(id=job_id)
+    if job.revision.status != 'draft':
+        _fail(job_id, 'Можно загружать продукты только в ревизию со статусом "Черновик"')
+        return ImportJob.objects.get(id=job_id)
+
+    def progress(processed, failed):
+        ImportJob.objects.filter(id=job_id).update(
+            rows_processed=processed, rows_failed=failed, heartbeat_at=timezone.now())
+
+    try:
+        options = {'create_missing': job.create_missing} if job.kind == 'product' else {}
+        result = ITEM_IMPORTERS[job.kind](
+            job.revision, iter_table_rows(job.file_path), progress=progress, **options)
+    except (TabularError, FileNotFoundError) as e:
+        _fail(job_id, str(e))
+    except Exception as e:
+        logger.exception(f"Ошибка задачи загрузки {job_id}")
+        _fail(job_id, f'Ошибка при обработке файла: {e}')
+    else:
+        ImportJob.objects.filter(id=job_id).update(
+            status='completed',
+            result=result,
+            rows_processed=result['rows_processed'],
+            rows_failed=result['rows_failed'],
+            heartbeat_at=timezone.now(),
+            finished_at=timezone.now(),
+        )
+        _remove_file(job.file_path)
+    return ImportJob.objects.get(id=job_id)
+
+
+def requeue_stale_jobs(stale_after=None, job_ids=None) -> list:
+    """
+    Вернуть в очередь задачи, брошенные умершим воркером: running без
+    прогресса и pending, не взятые в работу, дольше stale_after.
+
+    Args:
+        job_ids: проверить только эти задачи (None - все)
+
+    Returns:
+        id задач, которые теперь в статусе pending и ждут исполнителя
+    """
+    if stale_after is None:
+        stale_after = timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    threshold = timezone.now() - stale_after
+    stale = ImportJob.objects.filter(
+        Q(status='running', heartbeat_at__lt=threshold)
+        | (Q(status='pending', created_at__lt=threshold)
+           & (Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=threshold)))
+    )
+    if job_ids is not None:
+        stale = stale.filter(id__in=job_ids)
+    stale_ids = list(stale.values_list('id', flat=True))
+    # Условие повторяется в update: задача могла ожить между запросами
+    stale.filter(id__in=stale_ids, status='running').update(status='pending')
+    return list(ImportJob.objects.filter(id__in=stale_ids, status='pending').values_list('id', flat=True))
+
+
+def process_pending_jobs(limit=None, job_ids=None) -> int:
+    """Синхронно выполнить задачи из очереди (или только job_ids). Возвращает число выполненных."""
+    pending = ImportJob.objects.filter(status='pending')
+    if job_ids is not None:
+        pending = pending.filter(id__in=job_ids)
+    job_ids = pending.order_by('created_at').values_list('id', flat=True)
+    if limit:
+        job_ids = job_ids[:limit]
+    return sum(1 for job_id in list(job_ids) if run_import_job(job_id) is not None)
+
+
+def queue_stats() -> dict:
+    """Глубина очереди и возраст самой старой задачи в очереди (секунды)."""
+    stats = ImportJob.objects.filter(status__in=('pending', 'running')).aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        running=Count('id', filter=Q(status='running')),
+        oldest_pending=Min('created_at', filter=Q(status='pending')),
+    )
+    oldest = stats.pop('oldest_pending')
+    stats['oldest_pending_seconds'] = (
+        round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0.0
+    )
+    return stats
+
+
+def check_import_queue():
+    """Проверка готовности: очередь загрузок не должна расти."""
+    try:
+        stats = queue_stats()
+    finally:
+        connections.close_all()
+    backlog = (
+        stats['pending'] > settings.IMPORT_QUEUE_MAX_DEPTH
+        or stats['oldest_pending_seconds'] > settings.IMPORT_QUEUE_MAX_AGE_SECONDS
+    )
+    return {'status': readiness.STATUS_DEGRADED if backlog else readiness.STATUS_OK, **stats}
@@ -0,0 +1,355 @@
+"""
+Импорт остатков ревизии из файла (Excel / CSV выгрузка кассы или склада).
+
+Файл читается построчно (core.tabular: .xlsx в режиме read_only, CSV/TSV
+с определением кодировки и разделителя), import_*_items принимают любой
+итератор строк. Продукты / номенклатура сопоставляются по
+нормализованному названию и синонимам (products.matching.TitleMatcher,
+справочник загружается один раз). Строки разбираются, сопоставляются
+и пишутся через upsert_*_items пачками по BATCH_SIZE, каждая пачка в
+своей транзакции: в памяти держится одна пачка, а не весь файл. Число
+SQL-запросов на пачку не зависит от ее размера.
+
+Ненайденные названия возвращаются сгруппированными (unmatched) для
+создания синонимов; при create_missing=True (по умолчанию для
+upload-excel, как раньше) недостающие продукты создаются. Название
+длиннее поля Product.title не обрезается, а дает ошибку строки:
+обрезанные названия с общим началом слились бы в один продукт.
+"""
+
+import time
+from decimal import Decimal
+
+from django.db import transaction
+
+from core.tabular import TabularError, batched, iter_table_rows, max_field_value, parse_decimal
+from products.matching import KIND_INGREDIENT, KIND_PRODUCT, TitleMatcher, normalize_title
+from products.models import Product
+from products.signals import schedule_reference_bump
+from revisions.models import RevisionIngredientItem, RevisionProductItem
+from .item_upsert import upsert_ingredient_items, upsert_product_items
+
+HEADER_SEARCH_ROWS = 10
+MAX_DIAGNOSTICS = 500
+PROGRESS_EVERY = 1000
+BATCH_SIZE = 1000
+PRODUCT_TITLE_MAX_LENGTH = Product._meta.get_field('title').max_length
+# Больше не помещается в колонку actual_quantity
+PRODUCT_QUANTITY_MAX = max_field_value(RevisionProductItem._meta.get_field('actual_quantity'))
+INGREDIENT_QUANTITY_MAX = max_field_value(RevisionIngredientItem._meta.get_field('actual_quantity'))
+
+TITLE_HEADERS = ('номенклатура', 'наименование', 'ингредиент')
+QUANTITY_HEADERS = ('количество', 'кол-во')
+
+
+class ItemImportError(TabularError):
+    """Файл не удалось разобрать (нет колонок, не таблица и т.п.)."""
+
+
+def _find_headers(rows):
+    """
+    Найти строку заголовков среди первых HEADER_SEARCH_ROWS строк.
+
+    Returns:
+        (номер строки заголовков, {'title': индекс, 'quantity': индекс})
+    """
+    for row_idx, row in enumerate(rows, 1):
+        headers = {}
+        for col_idx, cell_value in enumerate(row):
+            if cell_value:
+                cell_str = str(cell_value).strip().lower()
+                if 'title' not in headers and any(word in cell_str for word in TITLE_HEADERS):
+                    headers['title'] = col_idx
+                elif 'quantity' not in headers and any(word in cell_str for word in QUANTITY_HEADERS):
+                    headers['quantity'] = col_idx
+        if 'title' in headers and 'quantity' in headers:
+            return row_idx, headers
+        if row_idx >= HEADER_SEARCH_ROWS:
+            break
+    raise ItemImportError('Не найдены необходимые колонки: Номенклатура и Количество')
+
+
+def _product_quantity(value):
+    return int(parse_decimal(value))
+
+
+def _ingredient_quantity(value):
+    return parse_decimal(value).quantize(Decimal('0.001'))
+
+
+def _parse_rows(rows, headers, first_row_idx, parse_quantity, max_quantity, diagnostics, counters,
+                progress=None):
+    """
+    Разобрать строки данных.
+
+    Генератор (номер строки, исходное название, количество) по корректным
+    строкам; counters['processed'] / counters['failed'] обновляются по
+    ходу, progress(processed, failed) вызывается каждые PROGRESS_EVERY строк.
+    """
+    title_col, quantity_col = headers['title'], headers['quantity']
+    for row_idx, row in enumerate(rows, first_row_idx):
+        counters['processed'] += 1
+        if progress and counters['processed'] % PROGRESS_EVERY == 0:
+            progress(counters['processed'], counters['failed'])
+        name = row[title_col] if title_col < len(row) else None
+        quantity = row[quantity_col] if quantity_col < len(row) else None
+        if not name or not quantity:
+            continue
+
+        title = ' '.join(str(name).split())
+        try:
+            quantity = parse_quantity(quantity)
+        except (TypeError, ValueError, ArithmeticError):
+            diagnostics.append({'row': row_idx, 'title': title, 'status': 'error',
+                                'message': f'Некорректное количество: {quantity}'})
+            counters['failed'] += 1
+            continue
+        if quantity < 0:
+            diagnostics.append({'row': row_idx, 'title': title, 'status': 'error',
+                                'message': 'Количество не может быть отрицательным'})
+            counters['failed'] += 1
+            continue
+        if quantity > max_quantity:
+            diagnostics.append({'row': row_idx, 'title': title, 'status': 'error',
+                                'message': f'Количество больше допустимого ({max_quantity})'})
+            counters['failed'] += 1
+            continue
+        yield row_idx, title, quantity
+
+
+def _read(rows, parse_quantity, max_quantity, diagnostics, counters, progress):
+    rows = iter(rows)
+    try:
+        header_row_idx, headers = _find_headers(rows)
+        yield from _parse_rows(rows, headers, header_row_idx + 1, parse_quantity, max_quantity,
+                               diagnostics, counters, progress)
+    finally:
+        close = getattr(rows, 'close', None)
+        if close:
+            close()
+
+
+def _merge(batch, diagnostics) -> dict:
+    """
+    Returns:
+        dict {нормализованное название: (исходное название, количество,
+        номер строки)}; при повторе названия в пачке берется последняя строка
+    """
+    parsed = {}
+    for row_idx, title, quantity in batch:
+        key = normalize_title(title)
+        if key in parsed:
+            diagnostics.append({'row': row_idx, 'title': title, 'status': 'duplicate',
+                                'message': f'Повтор строки {parsed[key][2]}, используется последнее значение'})
+        parsed[key] = (title, quantity, row_idx)
+    return parsed
+
+
+def _match(matcher, parsed) -> tuple:
+    """
+    Returns:
+        ({ключ строки: id} для найденных названий, [ключи ненайденных])
+    """
+    ids = {}
+    missing = []
+    for key, (title, quantity, row_idx) in parsed.items():
+        object_id = matcher.match(title)
+        if object_id is None:
+            missing.append(key)
+        else:
+            ids[key] = object_id
+    return ids, missing
+
+
+def _dedupe(parsed, ids, seen, diagnostics) -> set:
+    """
+    Оставить в пачке по одной строке на позицию.
+
+    Разные написания могут указывать на одну позицию (название и синоним),
+    та же позиция может встретиться и в предыдущих пачках: как и для
+    повторов строк, используется последняя. seen - {id: (ключ, номер
+    строки)} по всему файлу, растет с размером справочника, а не файла.
+
+    Returns:
+        id, уже записанные предыдущими пачками
+    """
+    rewritten = set()
+    batch_keys = {}
+    for key in sorted(ids, key=lambda key: parsed[key][2]):
+        object_id = ids[key]
+        title, quantity, row_idx = parsed[key]
+        previous = seen.get(object_id)
+        if previous is not None:
+            previous_key, previous_row = previous
+            if object_id in batch_keys:
+                del ids[batch_keys[object_id]]
+            else:
+                rewritten.add(object_id)
+            if previous_key == key:
+                message = f'Повтор строки {previous_row}, используется последнее значение'
+            else:
+                message = f'Та же позиция, что в строке {previous_row}, используется последнее значение'
+            diagnostics.append({'row': row_idx, 'title': title, 'status': 'duplicate', 'message': message})
+        batch_keys[object_id] = key
+        seen[object_id] = (key, row_idx)
+    return rewritten
+
+
+def _report_missing(parsed, missing, message, diagnostics):
+    for key in missing:
+        diagnostics.append({'row': parsed[key][2], 'title': parsed[key][0], 'status': 'error',
+                            'message': message})
+
+
+def _write(upsert, revision, key_attr, parsed, ids, rewritten, totals):
+    result = upsert(revision, [
+        {key_attr: object_id, 'actual_quantity': parsed[key][1]}
+        for key, object_id in ids.items()
+    ])
+    totals['created'] += result['created']
+    # Позиция из предыдущей пачки уже посчитана там
+    totals['updated'] += result['updated'] - len(rewritten)
+
+
+def _import(revision, rows, kind, parse_quantity, max_quantity, upsert, key_attr, resolve_missing,
+            progress) -> dict:
+    """
+    Разбор, сопоставление и запись пачками по BATCH_SIZE строк.
+
+    Каждая пачка пишется в своей транзакции: прогресс и heartbeat фоновой
+    задачи (ImportJob) видны другим соединениям, а повторный запуск после
+    сбоя безопасен - upsert перезаписывает те же строки ревизии.
+
+    resolve_missing(parsed, missing, ids, matcher, diagnostics) вызывается
+    внутри транзакции пачки и возвращает число строк с ошибкой.
+    """
+    started = time.perf_counter()
+    diagnostics = []
+    counters = {'processed': 0, 'failed': 0}
+    totals = {'created': 0, 'updated': 0}
+    spent = {'parse': 0.0, 'match': 0.0, 'write': 0.0}
+    seen = {}
+
+    matcher = TitleMatcher(kind, revision.location.production_id)
+    mark = time.perf_counter()
+    spent['match'] += mark - started
+    for batch in batched(_read(rows, parse_quantity, max_quantity, diagnostics, counters, progress),
+                         BATCH_SIZE):
+        parsed_at = time.perf_counter()
+        spent['parse'] += parsed_at - mark
+        parsed = _merge(batch, diagnostics)
+        ids, missing = _match(matcher, parsed)
+        with transaction.atomic():
+            if missing:
+                counters['failed'] += resolve_missing(parsed, missing, ids, matcher, diagnostics)
+            rewritten = _dedupe(parsed, ids, seen, diagnostics)
+            matched_at = time.perf_counter()
+            spent['match'] += matched_at - parsed_at
+            _write(upsert, revision, key_attr, parsed, ids, rewritten, totals)
+        mark = time.perf_counter()
+        spent['write'] += mark - matched_at
+    finished = time.perf_counter()
+    spent['parse'] += finished - mark
+    spent['total'] = finished - started
+
+    # Ошибки и повторы важнее сообщений о созданных продуктах при обрезке списка
+    diagnostics.sort(key=lambda item: (item['status'] == 'created_product', item['row']))
+    errors = [item for item in diagnostics if item['status'] == 'error']
+    return {
+        'count': totals['created'] + totals['updated'],
+        'created': totals['created'],
+        'updated': totals['updated'],
+        'created_products': sum(item['status'] == 'created_product' for item in diagnostics),
+        'rows_processed': counters['processed'],
+        'rows_failed': counters['failed'],
+        'errors': [f"Строка {item['row']}: {item['message']}" for item in errors[:MAX_DIAGNOSTICS]],
+        'diagnostics': diagnostics[:MAX_DIAGNOSTICS],
+        'unmatched': matcher.unmatched_groups(MAX_DIAGNOSTICS),
+        'timings_ms': {name: round(seconds * 1000, 1) for name, seconds in spent.items()},
+    }
+
+
+def import_product_items(revision, rows, create_missing=False, progress=None) -> dict:
+    """
+    Загрузить остатки продуктов ревизии из строк таблицы.
+
+    Args:
+        revision: Объект Revision (черновик)
+        rows: итератор строк (кортежи значений ячеек), включая заголовок
+        create_missing: создавать продукты, которых нет в справочнике производства
+        progress: callback(processed, failed) для отчета о ходе разбора
+
+    Returns:
+        dict: count, created, updated, created_products, rows_processed,
+              rows_failed, errors (строки), diagnostics (по строкам),
+              unmatched (ненайденные названия по группам), timings_ms
+
+    Raises:
+        TabularError: файл не удалось разобрать
+    """
+    production_id = revision.location.production_id
+
+    def resolve_missing(parsed, missing, product_ids, matcher, diagnostics):
+        if not create_missing:
+            _report_missing(parsed, missing, 'Продукт не найден в справочнике', diagnostics)
+            return len(missing)
+
+        too_long = [key for key in missing if len(parsed[key][0]) > PRODUCT_TITLE_MAX_LENGTH]
+        _report_missing(parsed, too_long, f'Продукт не найден, а название длиннее '
+                                          f'{PRODUCT_TITLE_MAX_LENGTH} символов: создайте продукт '
+                                          f'или синоним вручную', diagnostics)
+        missing = [key for key in missing if len(parsed[key][0]) <= PRODUCT_TITLE_MAX_LENGTH]
+        if missing:
+            new_products = Product.objects.bulk_create([
+                Product(production_id=production_id, title=parsed[key][0], description='',
+                        normalized_title=normalize_title(parsed[key][0]))
+                for key in missing
+            ])
+            for key, product in zip(missing, new_products):
+                product_ids[key] = product.id
+                matcher.add(product.title, product.id)
+                diagnostics.append({'row': parsed[key][2], 'title': parsed[key][0],
+                                    'status': 'created_product',
+                                    'message': 'Продукт добавлен в справочник'})
+            schedule_reference_bump(production_id)
+        return len(too_long)
+
+    return _import(revision, rows, KIND_PRODUCT, _product_quantity, PRODUCT_QUANTITY_MAX,
+                   upsert_product_items, 'product_id', resolve_missing, progress)
+
+
+def import_ingredient_items(revision, rows, progress=None) -> dict:
+    """
+    Загрузить остатки ингредиентов ревизии из строк таблицы.
+
+    Номенклатура не создается автоматически (нужна единица измерения):
+    строки с неизвестным названием попадают в errors.
+
+    Returns:
+        dict: как import_product_items (created_products всегда 0)
+    """
+    def resolve_missing(parsed, missing, ingredient_ids, matcher, diagnostics):
+        _report_missing(parsed, missing, 'Ингредиент не найден в справочнике', diagnostics)
+        return len(missing)
+
+    return _import(revision, rows, KIND_INGREDIENT, _ingredient_quantity, INGREDIENT_QUANTITY_MAX,
+                   upsert_ingredient_items, 'ingredient_id', resolve_missing, progress)
+
+
+# Тип загрузки -> функция импорта строк
+ITEM_IMPORTERS = {
+    'product': import_product_items,
+    'ingredient': import_ingredient_items,
+}
+
+
+def import_items_from_file(revision, file, name=None, kind='product', progress=None, **options) -> dict:
+    """
+    Загрузить остатки ревизии из файла .xlsx / .csv / .tsv.
+
+    Args:
+        kind: 'product' или 'ingredient'
+        name: имя файла для определения формата (по умолчанию - путь file)
+        options: параметры функции импорта (create_missing для продуктов)
+    """
+    return ITEM_IMPORTERS[kind](revision, iter_table_rows(file, name), progress=progress, **options)
@@ -0,0 +1,68 @@
+"""
+Массовая запись остатков ревизии.
+
+Строки RevisionProductItem / RevisionIngredientItem записываются одним
+INSERT ... ON CONFLICT (revision, product|ingredient) DO UPDATE вместо
+update_or_create на каждую строку.
+"""
+
+from django.db import transaction
+
+from revisions.models import RevisionIngredientItem, RevisionProductItem
+
+
+def _upsert(model, revision, key_field: str, rows) -> dict:
+    """
+    Записать строки ревизии пачкой.
+
+    Args:
+        model: RevisionProductItem или RevisionIngredientItem
+        revision: Объект Revision
+        key_field: 'product' или 'ingredient'
+        rows: список dict вида {'<key_field>_id', 'actual_quantity', ['comments']}
+
+    Returns:
+        dict {'created': int, 'updated': int}
+    """
+    rows = list(rows)
+    if not rows:
+        return {'created': 0, 'updated': 0}
+
+    key_attr = f'{key_field}_id'
+    keys = {row[key_attr] for row in rows}
+    existing = set(
+        model.objects
+        .filter(revision=revision, **{f'{key_attr}__in': keys})
+        .values_list(key_attr, flat=True)
+    )
+
+    # Строки без comments не должны затирать уже сохраненный комментарий
+    with_comments = [row for row in rows if 'comments' in row]
+    without_comments = [row for row in rows if 'comments' not in row]
+
+    with transaction.atomic():
+        for group, update_fields in (
+            (with_comments, ['actual_quantity', 'comments']),
+            (without_comments, ['actual_quantity']),
+        ):
+            if not group:
+                continue
+            model.objects.bulk_create(
+                [model(revision=revision, **row) for row in group],
+                update_conflicts=True,
+                unique_fields=['revision', key_field],
+                update_fields=update_fields,
+            )
+
+    updated = len(keys & existing)
+    return {'created': len(keys) - updated, 'updated': updated}
+
+
+def upsert_product_items(revision, rows) -> dict:
+    """Записать остатки продуктов ревизии: rows = [{'product_id', 'actual_quantity', ...}]."""
+    return _upsert(RevisionProductItem, revision, 'product', rows)
+
+
+def upsert_ingredient_items(revision, rows) -> dict:
+    """Записать остатки ингредиентов ревизии: rows = [{'ingredient_id', 'actual_quantity', ...}]."""
+    return _upsert(RevisionIngredientItem, revision, 'ingredient', rows)
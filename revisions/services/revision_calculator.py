@@ -17,6 +17,7 @@ from django.db.models import Sum
 from products.models import Ingredient, RecipeItem
 from sales.models import Incoming, IngredientInventory
 from revisions.models import Revision, RevisionIngredientItem, RevisionProductItem, RevisionReport
+from .archive import get_archived_balances
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,7 @@ class RevisionCalculator:
         self.location = revision.location
         self.production_id = getattr(self.location, 'production_id', None)
         self.revision_date = revision.revision_date
+        self._archived_balances = None
         logger.info(
             f"Инициализирован калькулятор для ревизии {revision.id} ({self.location.title})")
 
@@ -128,6 +130,28 @@ class RevisionCalculator:
 
         return previous
 
+    def _get_previous_item(self, previous_revision: Revision, ingredient: Ingredient):
+        """
+        Строка остатка ингредиента в предыдущей ревизии или None.
+
+        Строки архивной ревизии читаются из RevisionArchive (один раз на расчет).
+        """
+        if not previous_revision.is_archived:
+            return RevisionIngredientItem.objects.filter(
+                revision=previous_revision,
+                ingredient=ingredient
+            ).first()
+
+        if self._archived_balances is None:
+            self._archived_balances = get_archived_balances(previous_revision)
+        if ingredient.id not in self._archived_balances:
+            return None
+        return RevisionIngredientItem(
+            revision=previous_revision,
+            ingredient=ingredient,
+            actual_quantity=self._archived_balances[ingredient.id]
+        )
+
     def _get_sales_data(self, previous_revision: Revision) -> dict:
         """
         Получить "продажи" (кол-во изделий) для расчета расхода ингредиентов.
@@ -173,7 +197,8 @@ class RevisionCalculator:
         """
         Получить начальный остаток ингредиента.
 
-        Если есть предыдущая ревизия, берем фактический остаток из RevisionIngredientItem.
+        Если есть предыдущая ревизия, берем фактический остаток из RevisionIngredientItem
+        (для архивной ревизии - из RevisionArchive).
         Если это первая ревизия, берем из IngredientInventory или 0.
 
         Args:
@@ -185,10 +210,7 @@ class RevisionCalculator:
         """
         if previous_revision:
             # Получить фактический остаток из предыдущей ревизии
-            previous_item = RevisionIngredientItem.objects.filter(
-                revision=previous_revision,
-                ingredient=ingredient
-            ).first()
+            previous_item = self._get_previous_item(previous_revision, ingredient)
 
             if previous_item:
                 qty = previous_item.actual_quantity
@@ -0,0 +1,107 @@
+"""
+Сводка по отчетам ревизий.
+
+Все счетчики и суммы считаются одним агрегирующим запросом
+(условные COUNT по статусам + SUM/AVG/MAX), список самых критичных
+ингредиентов - вторым запросом сразу для всех запрошенных ревизий.
+Лимит top_critical применяется в SQL: LIMIT для одной ревизии,
+ROW_NUMBER() по ревизии для нескольких.
+Для архивных ревизий (отчетов в таблице уже нет) отдается сводка,
+сохраненная при архивации.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Avg, Count, F, Max, Q, Sum, Window
+from django.db.models.functions import RowNumber
+
+from revisions.models import RevisionArchive, RevisionReport
+
+DEFAULT_TOP_CRITICAL = 5
+MAX_TOP_CRITICAL = 50
+
+
+def _empty_summary() -> dict:
+    return {
+        'total_ingredients': 0,
+        'ok_count': 0,
+        'warning_count': 0,
+        'critical_count': 0,
+        'total_difference': Decimal('0.000'),
+        'avg_percentage': 0,
+        'max_percentage': Decimal('0.00'),
+        'critical_ingredients': [],
+    }
+
+
+def build_revision_summaries(revision_ids, top_critical: int = DEFAULT_TOP_CRITICAL) -> dict:
+    """
+    Посчитать сводку для нескольких ревизий.
+
+    Args:
+        revision_ids: id ревизий (доступ должен быть проверен заранее)
+        top_critical: сколько критичных ингредиентов вернуть для каждой ревизии
+
+    Returns:
+        dict вида {revision_id: summary}
+    """
+    revision_ids = list(revision_ids)
+    summaries = {revision_id: _empty_summary() for revision_id in revision_ids}
+    if not revision_ids:
+        return summaries
+
+    rows = (
+        RevisionReport.objects
+        .filter(revision_id__in=revision_ids)
+        .order_by()
+        .values('revision_id')
+        .annotate(
+            total_ingredients=Count('id'),
+            ok_count=Count('id', filter=Q(status='ok')),
+            warning_count=Count('id', filter=Q(status='warning')),
+            critical_count=Count('id', filter=Q(status='critical')),
+            total_difference=Sum('difference'),
+            avg_percentage=Avg('percentage'),
+            max_percentage=Max('percentage'),
+        )
+    )
+    for row in rows:
+        summary = summaries[row.pop('revision_id')]
+        summary.update({key: value for key, value in row.items() if value is not None})
+
+    if top_critical > 0:
+        ordering = (F('percentage').desc(), F('ingredient__title').asc())
+        critical = (
+            RevisionReport.objects
+            .filter(revision_id__in=revision_ids, status='critical')
+            .order_by('revision_id', *ordering)
+            .values('revision_id', 'ingredient_id', 'ingredient__title',
+                    'difference', 'percentage')
+        )
+        if len(revision_ids) == 1:
+            critical = critical[:top_critical]
+        else:
+            critical = critical.annotate(
+                position=Window(RowNumber(), partition_by=F('revision_id'), order_by=ordering),
+            ).filter(position__lte=top_critical)
+        for row in critical:
+            summaries[row['revision_id']]['critical_ingredients'].append({
+                'ingredient': row['ingredient_id'],
+                'ingredient_title': row['ingredient__title'],
+                'difference': row['difference'],
+                'percentage': row['percentage'],
+            })
+
+    for revision_id, summary in RevisionArchive.objects.filter(
+        revision_id__in=revision_ids
+    ).values_list('revision_id', 'summary'):
+        summaries[revision_id] = {
+            **summary,
+            'critical_ingredients': summary.get('critical_ingredients', [])[:top_critical],
+        }
+    return summaries
+
+
+def build_revision_summary(revision_id, top_critical: int = DEFAULT_TOP_CRITICAL) -> dict:
+    """Сводка по одной ревизии."""
+    return build_revision_summaries([revision_id], top_critical)[revision_id]
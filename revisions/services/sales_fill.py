@@ -0,0 +1,124 @@
+"""
+Заполнение остатков продуктов ревизии из продаж кассы (Sales).
+
+Период ревизии - со дня после предыдущей завершенной ревизии точки
+по revision_date (для первой ревизии - с начала месяца, как в
+RevisionCalculator). Продажи за период суммируются одним запросом
+GROUP BY product по сводке продаж по дням (DailySalesRollup), запись -
+upsert_product_items.
+
+preview_sales_fill показывает, чем результат отличается от уже
+введенных вручную количеств, ничего не записывая. Сумма продаж больше
+колонки actual_quantity не записывается (ошибка по продукту, а не
+DataError на всю пачку).
+"""
+
+from datetime import date, timedelta
+
+from core.tabular import max_field_value
+from products.models import Product
+from revisions.models import Revision, RevisionProductItem
+from sales.services.rollup import period_sales
+from .item_upsert import upsert_product_items
+
+QUANTITY_MAX = max_field_value(RevisionProductItem._meta.get_field('actual_quantity'))
+
+
+def get_revision_period(revision):
+    """
+    Период ревизии: (первый день, последний день) включительно.
+
+    Returns:
+        (date, date, previous_revision или None)
+    """
+    previous = Revision.objects.filter(
+        location_id=revision.location_id,
+        revision_date__lt=revision.revision_date,
+        status='completed'
+    ).order_by('-revision_date').first()
+    if previous:
+        start_date = previous.revision_date + timedelta(days=1)
+    else:
+        start_date = date(revision.revision_date.year, revision.revision_date.month, 1)
+    return start_date, revision.revision_date, previous
+
+
+def preview_sales_fill(revision) -> dict:
+    """
+    Сравнить продажи за период с остатками продуктов ревизии.
+
+    Returns:
+        dict: period, previous_revision, items (по продуктам: sales_quantity,
+              current_quantity, difference, change = new|changed|same|not_in_sales|over_limit),
+              totals по видам изменений
+    """
+    start_date, end_date, previous = get_revision_period(revision)
+    sales = period_sales(revision.location_id, start_date, end_date)
+    current = {
+        row['product_id']: row
+        for row in RevisionProductItem.objects.filter(revision=revision).values(
+            'product_id', 'product__title', 'actual_quantity')
+    }
+    titles = dict(
+        Product.objects.filter(id__in=sales.keys() - current.keys()).values_list('id', 'title'))
+
+    items = []
+    for product_id in sales.keys() | current.keys():
+        sales_quantity = sales.get(product_id)
+        current_row = current.get(product_id)
+        current_quantity = current_row['actual_quantity'] if current_row else None
+        if sales_quantity is not None and sales_quantity > QUANTITY_MAX:
+            change = 'over_limit'
+        elif current_row is None:
+            change = 'new'
+        elif sales_quantity is None:
+            change = 'not_in_sales'
+        elif sales_quantity != current_quantity:
+            change = 'changed'
+        else:
+            change = 'same'
+        items.append({
+            'product': product_id,
+            'product_title': current_row['product__title'] if current_row else titles.get(product_id, ''),
+            'sales_quantity': sales_quantity,
+            'current_quantity': current_quantity,
+            'difference': (sales_quantity or 0) - (current_quantity or 0),
+            'change': change,
+        })
+    items.sort(key=lambda item: (item['change'] == 'same', item['product_title']))
+
+    totals = {change: 0 for change in ('new', 'changed', 'same', 'not_in_sales', 'over_limit')}
+    for item in items:
+        totals[item['change']] += 1
+    return {
+        'period': {'start': start_date.isoformat(), 'end': end_date.isoformat()},
+        'previous_revision': previous.id if previous else None,
+        'items': items,
+        'totals': totals,
+    }
+
+
+def fill_product_items_from_sales(revision) -> dict:
+    """
+    Записать продажи за период в остатки продуктов ревизии.
+
+    Количества продуктов из продаж перезаписываются; продукты, которых
+    нет в продажах, остаются как были. Продукты с продажами больше
+    QUANTITY_MAX пропускаются и попадают в errors.
+
+    Returns:
+        dict: period, created, updated, errors ([{product, message}])
+    """
+    start_date, end_date, _ = get_revision_period(revision)
+    sales = period_sales(revision.location_id, start_date, end_date)
+    rows = []
+    errors = []
+    for product_id, quantity in sales.items():
+        if quantity > QUANTITY_MAX:
+            errors.append({'product': product_id,
+                           'message': f'Продажи за период больше допустимого ({QUANTITY_MAX})'})
+            continue
+        rows.append({'product_id': product_id, 'actual_quantity': quantity})
+    result = upsert_product_items(revision, rows)
+    return {'period': {'start': start_date.isoformat(), 'end': end_date.isoformat()},
+            **result, 'errors': errors}
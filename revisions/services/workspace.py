@@ -0,0 +1,103 @@
+"""
+Данные для открытия ревизии одним запросом.
+
+Вместо отдельных запросов фронтенда за ревизией, точками, продуктами,
+номенклатурой, остатками и отчетами собирает все сразу фиксированным
+числом SQL-запросов (не зависит от количества строк). Справочники
+берутся из кэша справочников производства. Строки архивной ревизии
+читаются из RevisionArchive.
+"""
+
+from datetime import timedelta
+
+from core.fast_read import get_values_reader
+from core.reference_cache import get_reference_data
+from products.models import Ingredient, Product, CHOICES_UNIT
+from revisions.models import Revision, RevisionIngredientItem, RevisionProductItem, RevisionReport
+from revisions.serializers import (
+    RevisionSerializer,
+    RevisionProductItemSerializer,
+    RevisionIngredientItemSerializer,
+    RevisionReportSerializer,
+)
+from sales.models import Location
+from .archive import ARCHIVE_SECTIONS, get_archived_section
+
+
+def _reference_lists(production_id) -> dict:
+    locations = Location.objects.all()
+    products = Product.objects.all()
+    ingredients = Ingredient.objects.all()
+    if production_id:
+        locations = locations.filter(production_id=production_id)
+        products = products.filter(production_id=production_id)
+        ingredients = ingredients.filter(production_id=production_id)
+
+    unit_display = dict(CHOICES_UNIT)
+    return {
+        'locations': list(locations.order_by('title').values('id', 'title')),
+        'products': list(products.order_by('title').values('id', 'title')),
+        'ingredients': [
+            {**row, 'unit_display': unit_display.get(row['unit'], row['unit'])}
+            for row in ingredients.order_by('title').values('id', 'title', 'unit')
+        ],
+    }
+
+
+def _get_reference_lists(production_id) -> dict:
+    if not production_id:
+        return _reference_lists(production_id)
+    return get_reference_data(
+        production_id, 'workspace-references', lambda: _reference_lists(production_id))
+
+
+def build_revision_workspace(revision: Revision) -> dict:
+    """
+    Собрать ревизию, ее остатки, отчеты и компактные справочники производства.
+
+    Args:
+        revision: Объект Revision (location и author лучше загрузить через select_related)
+
+    Returns:
+        dict для ответа API
+    """
+    previous_date = (
+        Revision.objects
+        .filter(
+            location_id=revision.location_id,
+            revision_date__lt=revision.revision_date,
+            status='completed',
+        )
+        .order_by('-revision_date')
+        .values_list('revision_date', flat=True)
+        .first()
+    )
+    if previous_date:
+        period_start_date = previous_date + timedelta(days=1)
+    else:
+        period_start_date = revision.revision_date.replace(day=1)
+
+    revision_data = dict(RevisionSerializer(revision).data)
+    revision_data['previous_revision_date'] = previous_date
+    revision_data['period_start_date'] = period_start_date
+
+    if revision.is_archived:
+        sections = {name: get_archived_section(revision, name) for name in ARCHIVE_SECTIONS}
+    else:
+        sections = {
+            'product_items': get_values_reader(RevisionProductItemSerializer).read(
+                RevisionProductItem.objects.filter(revision=revision).order_by('product__title')
+            ),
+            'ingredient_items': get_values_reader(RevisionIngredientItemSerializer).read(
+                RevisionIngredientItem.objects.filter(revision=revision).order_by('ingredient__title')
+            ),
+            'reports': get_values_reader(RevisionReportSerializer).read(
+                RevisionReport.objects.filter(revision=revision).order_by('-percentage')
+            ),
+        }
+
+    return {
+        'revision': revision_data,
+        **sections,
+        'references': _get_reference_lists(revision.location.production_id),
+    }
@@ -1,3 +1,708 @@
+import copy
+import csv
+import io
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.export import iter_export_rows
+from core.db_router import PRIMARY_PINNED, REPLICA_ALIAS, REPLICA_REQUESTS
+from products.models import CHOICES_UNIT, Ingredient, Product
+from sales.models import DailySalesRollup, Incoming, Location
+from users.models import Production, User
+from .models import (
+    REPORT_STATUS_CHOICES, ImportJob, Revision, RevisionIngredientItem, RevisionProductItem, RevisionReport,
+)
+from .serializers import RevisionDetailSerializer, RevisionProductItemSerializer, RevisionReportSerializer
+from .services import RevisionCalculator, build_revision_summaries, build_revision_summary
+from .services import item_import
+from .services.archive import archive_revisions
+from .services.import_jobs import enqueue_import_job
+from .viewsets import RevisionReportViewSet
+
+
+class RevisionReportListTests(TestCase):
+    """Быстрый список отчетов должен совпадать с выводом serializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+        for index, (unit, status) in enumerate([('g', 'ok'), ('kg', 'warning'), ('l', 'critical')]):
+            ingredient = Ingredient.objects.create(
+                production=production, title=f'Ингредиент {index}', unit=unit)
+            RevisionReport.objects.create(
+                revision=cls.revision,
+                ingredient=ingredient,
+                expected_quantity=Decimal('10.5'),
+                actual_quantity=Decimal('8'),
+                difference=Decimal('-2.5'),
+                percentage=Decimal('23.81'),
+                status=status,
+            )
+
+    def test_list_matches_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/revision-reports/', {'revision': self.revision.id})
+
+        self.assertEqual(response.status_code, 200)
+        expected = RevisionReportSerializer(
+            RevisionReport.objects.filter(revision=self.revision), many=True).data
+        self.assertEqual(response.json(), [dict(item) for item in expected])
+
+
+class RevisionSummaryTests(TestCase):
+    """Сводка должна совпадать с подсчетом по самим отчетам, top критичных - по каждой ревизии."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        user = User.objects.create_user('manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        ingredients = [
+            Ingredient.objects.create(production=production, title=f'Ингредиент {index}', unit='kg')
+            for index in range(6)
+        ]
+        cls.revisions = []
+        for day, statuses in ((30, 'ccwocc'), (31, 'occcwc')):
+            revision = Revision.objects.create(
+                location=location, author=user, revision_date=date(2026, 1, day))
+            cls.revisions.append(revision)
+            for index, (ingredient, code) in enumerate(zip(ingredients, statuses)):
+                percentage = Decimal(day + index * 7 % 5)
+                RevisionReport.objects.create(
+                    revision=revision, ingredient=ingredient,
+                    expected_quantity=Decimal('10'), actual_quantity=Decimal('10') - index,
+                    difference=-Decimal(index), percentage=percentage,
+                    status={'o': 'ok', 'w': 'warning', 'c': 'critical'}[code],
+                )
+
+    def _expected(self, revision, top):
+        reports = list(RevisionReport.objects.filter(revision=revision).select_related('ingredient'))
+        critical = sorted((report for report in reports if report.status == 'critical'),
+                          key=lambda report: (-report.percentage, report.ingredient.title))
+        return {
+            'total_ingredients': len(reports),
+            'ok_count': sum(report.status == 'ok' for report in reports),
+            'warning_count': sum(report.status == 'warning' for report in reports),
+            'critical_count': len(critical),
+            'total_difference': sum(report.difference for report in reports),
+            'max_percentage': max(report.percentage for report in reports),
+            'critical_ingredients': [
+                {'ingredient': report.ingredient_id, 'ingredient_title': report.ingredient.title,
+                 'difference': report.difference, 'percentage': report.percentage}
+                for report in critical[:top]
+            ],
+        }
+
+    def test_summaries_match_reports(self):
+        # Счетчики, критичные с ROW_NUMBER() по ревизии, архивные сводки
+        with self.assertNumQueries(3):
+            summaries = build_revision_summaries([revision.id for revision in self.revisions], 2)
+
+        for revision in self.revisions:
+            summary = summaries[revision.id]
+            expected = self._expected(revision, 2)
+            self.assertEqual({key: summary[key] for key in expected}, expected)
+            self.assertEqual(len(summary['critical_ingredients']), 2)
+
+    def test_single_summary_matches_reports(self):
+        revision = self.revisions[1]
+        for top in (0, 1, 50):
+            summary = build_revision_summary(revision.id, top)
+            expected = self._expected(revision, top)
+            self.assertEqual({key: summary[key] for key in expected}, expected)
+
+
+class RevisionArchiveTests(TestCase):
+    """Архивная ревизия читается как раньше и дает начальные остатки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.ingredient = Ingredient.objects.create(production=production, title='Мука', unit='kg')
+        cls.old = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2024, 1, 31), status='completed')
+        RevisionIngredientItem.objects.create(
+            revision=cls.old, ingredient=cls.ingredient, actual_quantity=Decimal('12.5'))
+        RevisionCalculator(cls.old).calculate_all()
+        cls.current = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2024, 2, 29))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_archived_revision_is_readable_and_read_only(self):
+        before = self.client.get(f'/api/revisions/{self.old.id}/').json()
+
+        result = archive_revisions(date(2025, 1, 1), chunk_size=1)
+
+        self.assertEqual(result, {'revisions': 1, 'rows': 2})
+        self.assertFalse(RevisionIngredientItem.objects.filter(revision=self.old).exists())
+        after = self.client.get(f'/api/revisions/{self.old.id}/').json()
+        self.assertTrue(after['is_archived'])
+        for name in ('ingredient_items', 'reports'):
+            self.assertEqual(after[name], before[name])
+        response = self.client.patch(f'/api/revisions/{self.old.id}/', {'comments': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_archived_revision_reports_list_and_export(self):
+        params = {'revision': self.old.id}
+        before = self.client.get('/api/revision-reports/', params).json()
+        export_before = self.client.get('/api/revision-reports/export/', {**params, 'format': 'jsonl'})
+        export_before = b''.join(export_before.streaming_content)
+
+        archive_revisions(date(2025, 1, 1))
+
+        after = self.client.get('/api/revision-reports/', params)
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(len(before), 1)
+        self.assertEqual(after.json(), before)
+        export_after = self.client.get('/api/revision-reports/export/', {**params, 'format': 'jsonl'})
+        self.assertEqual(b''.join(export_after.streaming_content), export_before)
+        items = self.client.get('/api/revision-ingredient-items/', params).json()
+        self.assertEqual([item['actual_quantity'] for item in items], ['12.500'])
+
+    def test_archived_revision_gives_opening_balance(self):
+        archive_revisions(date(2025, 1, 1))
+
+        RevisionCalculator(self.current).calculate_all()
+
+        report = RevisionReport.objects.get(revision=self.current, ingredient=self.ingredient)
+        self.assertEqual(report.expected_quantity, Decimal('12.5'))
+
+
+class ImportJobRequeueTests(TestCase):
+    """Повторная загрузка файла перезапускает задачу, брошенную умершим воркером."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+
+    def _upload(self):
+        upload = SimpleUploadedFile('items.csv', 'Продукт;Количество\nБагет;3\n'.encode())
+        return enqueue_import_job(self.revision, upload, self.user)
+
+    def test_reupload_restarts_only_stale_job(self):
+        job, created = self._upload()
+        self.assertTrue(created)
+        ImportJob.objects.filter(id=job.id).update(status='running', heartbeat_at=timezone.now())
+
+        job, created = self._upload()
+        self.assertFalse(created)
+        self.assertEqual(job.status, 'running')
+
+        ImportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        job, created = self._upload()
+        self.assertFalse(created)
+        self.assertEqual(job.status, 'pending')
+
+
+class ProductUploadTests(TestCase):
+    """upload-excel по умолчанию создает недостающие продукты, длинные названия не обрезаются."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+
+    def test_creates_missing_products_and_rejects_long_titles(self):
+        long_title = 'Торт ' + 'очень вкусный ' * 5
+        content = f'Номенклатура;Количество\nБагет;3\n{long_title}1;2\n{long_title}2;4\n'
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/api/revision-product-items/upload-excel/', {
+            'file': SimpleUploadedFile('items.csv', content.encode()),
+            'revision': self.revision.id,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['created_products'], data['rows_failed']), (1, 1, 2))
+        self.assertEqual(list(Product.objects.values_list('title', flat=True)), ['Багет'])
+
+    def test_quantity_over_column_limit_is_row_error(self):
+        content = 'Номенклатура;Количество\nБагет;3\nБатон;3000000000\n'
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/api/revision-product-items/upload-excel/', {
+            'file': SimpleUploadedFile('items.csv', content.encode()),
+            'revision': self.revision.id,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['rows_failed']), (1, 1))
+        self.assertIn('больше допустимого', data['errors'][0])
+
+    def test_rows_are_written_batch_by_batch(self):
+        croissant = Product.objects.create(production=self.revision.location.production, title='Круассан')
+        RevisionProductItem.objects.create(revision=self.revision, product=croissant, actual_quantity=9)
+        rows = [('Номенклатура', 'Количество'),
+                ('Багет', '3'), ('Круассан', '1'),
+                ('багет.', '5'), ('Батон', '1'),
+                ('Круассан', '4'), ('Багет', '7'),
+                ('Батон', '2')]
+
+        with mock.patch.object(item_import, 'BATCH_SIZE', 2):
+            result = item_import.import_product_items(self.revision, rows, create_missing=True)
+
+        # Повторы из предыдущих пачек перезаписываются и не считаются дважды
+        self.assertEqual((result['created'], result['updated'], result['created_products']), (2, 1, 2))
+        self.assertEqual([item['row'] for item in result['diagnostics'] if item['status'] == 'duplicate'],
+                         [4, 6, 7, 8])
+        self.assertEqual(
+            sorted(RevisionProductItem.objects.values_list('product__title', 'actual_quantity')),
+            [('Багет', 7), ('Батон', 2), ('Круассан', 4)],
+        )
+
+
+@skipIf(REPLICA_ALIAS in settings.DATABASES, 'реплика задана через REPLICA_DATABASE_URL')
+class ReplicaRoutingTests(TestCase):
+    """
+    Чтение с реплики: вторая база SQLite в памяти вместо реплики,
+    отставание реплики - другой процент отклонения в ее копии отчета.
+    """
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        replica = copy.deepcopy(settings.DATABASES['default'])
+        replica['TEST'].update(NAME=None, MIRROR=None)
+        settings.DATABASES[REPLICA_ALIAS] = replica
+        cls.addClassCleanup(cls._remove_replica)
+        cls.replica_name = connections[REPLICA_ALIAS].creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        super().setUpClass()
+
+    @classmethod
+    def _remove_replica(cls):
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del settings.DATABASES[REPLICA_ALIAS]
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.other = User.objects.create_user(
+            'manager2', password='pass', role='manager', production=production)
+        cls.location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.ingredient = Ingredient.objects.create(production=production, title='Мука', unit='kg')
+        cls.revision = Revision.objects.create(
+            location=cls.location, author=cls.user, revision_date=date(2026, 1, 31))
+        report = RevisionReport.objects.create(
+            revision=cls.revision, ingredient=cls.ingredient, expected_quantity=Decimal('10'),
+            actual_quantity=Decimal('6'), difference=Decimal('-4'), percentage=Decimal('40'),
+            status='critical')
+        for obj in (production, cls.user, cls.other, cls.location, cls.ingredient, cls.revision, report):
+            obj.save(using=REPLICA_ALIAS)
+        RevisionReport.objects.using(REPLICA_ALIAS).filter(id=report.id).update(percentage=Decimal('10'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _percentage(self, client=None):
+        response = (client or self.client).get('/api/revision-reports/', {'revision': self.revision.id})
+        self.assertEqual(response.status_code, 200)
+        return Decimal(response.json()[0]['percentage'])
+
+    def test_reports_and_export_read_from_replica(self):
+        self.assertEqual(self._percentage(), Decimal('10'))
+
+        response = self.client.get('/api/revision-reports/export/', {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([Decimal(row['percentage']) for row in rows], [Decimal('10')])
+
+    def test_user_reads_own_writes_from_primary(self):
+        response = self.client.post('/api/incoming/', {
+            'ingredient': self.ingredient.id, 'location': self.location.id,
+            'date': '2026-01-15', 'quantity': '5'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Incoming.objects.using('default').exists())
+        self.assertFalse(Incoming.objects.using(REPLICA_ALIAS).exists())
+        self.assertEqual(self._percentage(), Decimal('40'))
+        other = APIClient()
+        other.force_authenticate(self.other)
+        self.assertEqual(self._percentage(other), Decimal('10'))
+
+    def test_assistant_chat_does_not_pin_user_to_primary(self):
+        for _ in range(2):
+            response = self.client.post('/api/assistant/chat/', {'message': 'статистика'}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        counters = metrics.snapshot()
+        self.assertEqual((counters[REPLICA_REQUESTS], counters[PRIMARY_PINNED]), (2, 0))
+        self.assertEqual(self._percentage(), Decimal('10'))
+
+
+class BulkItemsTests(TestCase):
+    """POST items/bulk/: ошибки по строкам, остальные строки записываются."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        other = Production.objects.create(name='Другая', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+        cls.bread = Product.objects.create(production=production, title='Багет')
+        cls.loaf = Product.objects.create(production=production, title='Батон')
+        cls.foreign = Product.objects.create(production=other, title='Багет')
+        cls.flour = Ingredient.objects.create(production=production, title='Мука', unit='kg')
+        RevisionProductItem.objects.create(
+            revision=cls.revision, product=cls.bread, actual_quantity=1, comments='витрина')
+
+    def test_row_errors_are_reported_and_valid_rows_saved(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(f'/api/revisions/{self.revision.id}/items/bulk/', {
+            'products': [
+                {'product': self.bread.id, 'actual_quantity': 5},
+                {'product': self.loaf.id, 'actual_quantity': 2147483648},
+                {'product': self.bread.id, 'actual_quantity': 7},
+                {'product': self.foreign.id, 'actual_quantity': 1},
+            ],
+            'ingredients': [{'ingredient': self.flour.id, 'actual_quantity': '1.250'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertEqual((data['products']['created'], data['products']['updated']), (0, 1))
+        self.assertEqual(sorted(error['index'] for error in data['products']['errors']), [1, 2, 3])
+        self.assertIn('actual_quantity', data['products']['errors'][0]['errors'])
+        self.assertEqual((data['ingredients']['created'], data['ingredients']['errors']), (1, []))
+        self.assertEqual(
+            list(RevisionProductItem.objects.values_list('product_id', 'actual_quantity', 'comments')),
+            [(self.bread.id, 5, 'витрина')],
+        )
+        self.assertEqual(
+            RevisionIngredientItem.objects.get(revision=self.revision).actual_quantity, Decimal('1.25'))
+
+
+class FillFromSalesTests(TestCase):
+    """fill-from-sales: период ревизии, предпросмотр изменений, запись только в черновик."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.previous = Revision.objects.create(
+            location=cls.location, author=cls.user, revision_date=date(2026, 1, 10), status='completed')
+        # Незавершенная ревизия не сдвигает начало периода
+        Revision.objects.create(location=cls.location, author=cls.user, revision_date=date(2026, 1, 20))
+        cls.revision = Revision.objects.create(
+            location=cls.location, author=cls.user, revision_date=date(2026, 1, 31))
+        products = {title: Product.objects.create(production=production, title=title)
+                    for title in ('Багет', 'Батон', 'Булочка', 'Круассан', 'Торт')}
+        cls.products = products
+        for day, title, quantity in [
+            (date(2026, 1, 10), 'Багет', 100),
+            (date(2026, 1, 11), 'Багет', 3),
+            (date(2026, 1, 31), 'Багет', 2),
+            (date(2026, 2, 1), 'Багет', 50),
+            (date(2026, 1, 20), 'Батон', 4),
+            (date(2026, 1, 15), 'Круассан', 6),
+            (date(2026, 1, 15), 'Торт', 2000000000),
+            (date(2026, 1, 16), 'Торт', 2000000000),
+        ]:
+            DailySalesRollup.objects.create(
+                location=cls.location, product=products[title], date=day, quantity=quantity)
+        for title, quantity in (('Батон', 4), ('Булочка', 1), ('Круассан', 1)):
+            RevisionProductItem.objects.create(
+                revision=cls.revision, product=products[title], actual_quantity=quantity)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _url(self, revision):
+        return f'/api/revisions/{revision.id}/fill-from-sales/'
+
+    def test_preview_classifies_changes_within_period(self):
+        data = self.client.get(self._url(self.revision)).json()
+
+        self.assertEqual(data['period'], {'start': '2026-01-11', 'end': '2026-01-31'})
+        self.assertEqual(data['previous_revision'], self.previous.id)
+        self.assertEqual(
+            {item['product_title']: (item['change'], item['sales_quantity']) for item in data['items']},
+            {'Багет': ('new', 5), 'Батон': ('same', 4), 'Булочка': ('not_in_sales', None),
+             'Круассан': ('changed', 6), 'Торт': ('over_limit', 4000000000)},
+        )
+        self.assertEqual(data['totals'], {'new': 1, 'changed': 1, 'same': 1, 'not_in_sales': 1, 'over_limit': 1})
+
+    def test_first_revision_period_starts_at_month_start(self):
+        location = Location.objects.create(
+            production=self.location.production, title='Магазин', code='S1')
+        revision = Revision.objects.create(location=location, author=self.user, revision_date=date(2026, 3, 15))
+
+        data = self.client.get(self._url(revision)).json()
+
+        self.assertEqual(data['period'], {'start': '2026-03-01', 'end': '2026-03-15'})
+        self.assertIsNone(data['previous_revision'])
+
+    def test_fill_writes_draft_and_skips_over_limit(self):
+        response = self.client.post(self._url(self.revision))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertEqual((data['created'], data['updated']), (1, 2))
+        self.assertEqual([error['product'] for error in data['errors']], [self.products['Торт'].id])
+        self.assertEqual(
+            dict(RevisionProductItem.objects.filter(revision=self.revision)
+                 .values_list('product__title', 'actual_quantity')),
+            {'Багет': 5, 'Батон': 4, 'Булочка': 1, 'Круассан': 6},
+        )
+
+    def test_fill_is_rejected_for_completed_revision(self):
+        response = self.client.post(self._url(self.previous))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RevisionProductItem.objects.filter(revision=self.previous).exists())
+
+
+class ReportExportTests(TestCase):
+    """Выгрузка отчетов в CSV и XLSX: колонки и значения по export_fields."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+        for title, unit, percentage, status in (('Мука', 'kg', '5', 'warning'), ('Молоко', 'l', '40', 'critical')):
+            RevisionReport.objects.create(
+                revision=cls.revision,
+                ingredient=Ingredient.objects.create(production=production, title=title, unit=unit),
+                expected_quantity=Decimal('10'), actual_quantity=Decimal('6.5'),
+                difference=Decimal('-3.5'), percentage=Decimal(percentage), status=status)
+        cls.columns = [spec[0] for spec in RevisionReportViewSet.export_fields]
+
+    def _export(self, export_format):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/revision-reports/export/', {'revision': self.revision.id, 'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="revision-reports.{export_format}"')
+        return b''.join(response.streaming_content)
+
+    def test_iter_export_rows_applies_export_fields(self):
+        rows = list(iter_export_rows(
+            RevisionReport.objects.order_by('percentage'),
+            (('ingredient_title', 'ingredient__title'), ('unit', 'ingredient__unit'),
+             ('unit_display', 'ingredient__unit', dict(CHOICES_UNIT).get)),
+        ))
+
+        self.assertEqual(rows, [
+            {'ingredient_title': 'Мука', 'unit': 'kg', 'unit_display': 'Килограммы'},
+            {'ingredient_title': 'Молоко', 'unit': 'l', 'unit_display': 'Литры'},
+        ])
+
+    def test_csv_export(self):
+        content = self._export('csv').decode('utf-8')
+
+        self.assertTrue(content.startswith('\ufeff'))
+        header, *rows = csv.reader(io.StringIO(content[1:]))
+        self.assertEqual(header, self.columns)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([row['ingredient_title'] for row in rows], ['Молоко', 'Мука'])
+        self.assertEqual(
+            {key: rows[0][key] for key in ('location_title', 'unit_display', 'actual_quantity', 'status_display')},
+            {'location_title': 'Цех', 'unit_display': 'Литры', 'actual_quantity': '6.500',
+             'status_display': dict(REPORT_STATUS_CHOICES)['critical']},
+        )
+
+    @skipIf(openpyxl is None, 'openpyxl не установлен')
+    def test_xlsx_export(self):
+        workbook = openpyxl.load_workbook(io.BytesIO(self._export('xlsx')), read_only=True)
+
+        header, *rows = workbook.active.iter_rows(values_only=True)
+        self.assertEqual(list(header), self.columns)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([row['ingredient_title'] for row in rows], ['Молоко', 'Мука'])
+        self.assertEqual((rows[1]['unit_display'], rows[1]['percentage']), ('Килограммы', 5))
+        self.assertEqual(rows[0]['revision_date'].date(), date(2026, 1, 31))
+        created_at = RevisionReport.objects.get(ingredient__title='Молоко').created_at
+        self.assertAlmostEqual(rows[0]['created_at'], timezone.make_naive(created_at), delta=timedelta(seconds=1))
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= и ?include= в карточке ревизии."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        cls.revision = Revision.objects.create(
+            location=location, author=cls.user, revision_date=date(2026, 1, 31))
+        RevisionReport.objects.create(
+            revision=cls.revision,
+            ingredient=Ingredient.objects.create(production=production, title='Мука', unit='kg'),
+            expected_quantity=Decimal('10'), actual_quantity=Decimal('8'), difference=Decimal('-2'),
+            percentage=Decimal('20'), status='critical')
+
+    def _get(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f'/api/revisions/{self.revision.id}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_without_params_returns_all_fields(self):
+        data = self._get()
+
+        self.assertEqual(set(data), set(RevisionDetailSerializer.Meta.fields))
+
+    def test_fields_ignores_unknown_names(self):
+        self.assertEqual(set(self._get(fields='id,status,no_such_field')), {'id', 'status'})
+        self.assertEqual(set(self._get(fields='')), set(RevisionDetailSerializer.Meta.fields))
+
+    def test_include_selects_nested_relations(self):
+        expandable = set(RevisionDetailSerializer.Meta.expandable_fields)
+        scalar = set(RevisionDetailSerializer.Meta.fields) - expandable
+
+        data = self._get(include='reports')
+        self.assertEqual(set(data), scalar | {'reports'})
+        # Вложенные строки отдаются целиком
+        self.assertEqual(set(data['reports'][0]), set(RevisionReportSerializer.Meta.fields))
+
+        self.assertEqual(set(self._get(include='')), scalar)
+        self.assertEqual(set(self._get(fields='id,reports')), {'id', 'reports'})
+
+
+class RevisionWorkspaceTests(TestCase):
+    """GET workspace/: состав ответа и фиксированное число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.location = Location.objects.create(production=production, title='Цех', code='C1')
+        Revision.objects.create(
+            location=cls.location, author=cls.user, revision_date=date(2026, 1, 10), status='completed')
+        cls.revision = Revision.objects.create(
+            location=cls.location, author=cls.user, revision_date=date(2026, 1, 31))
+        cls.production = production
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_rows(self, count):
+        start = Product.objects.count()
+        for index in range(start, start + count):
+            product = Product.objects.create(production=self.production, title=f'Продукт {index}')
+            ingredient = Ingredient.objects.create(production=self.production, title=f'Ингредиент {index}', unit='kg')
+            RevisionProductItem.objects.create(revision=self.revision, product=product, actual_quantity=index)
+            RevisionIngredientItem.objects.create(
+                revision=self.revision, ingredient=ingredient, actual_quantity=Decimal(index))
+            RevisionReport.objects.create(
+                revision=self.revision, ingredient=ingredient, expected_quantity=Decimal('10'),
+                actual_quantity=Decimal(index), difference=Decimal(index - 10),
+                percentage=Decimal('1'), status='ok')
+
+    def _workspace(self):
+        response = self.client.get(f'/api/revisions/{self.revision.id}/workspace/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_payload_shape(self):
+        self._add_rows(2)
+
+        data = self._workspace()
+
+        self.assertEqual(set(data), {'revision', 'product_items', 'ingredient_items', 'reports', 'references'})
+        self.assertEqual(data['revision']['id'], self.revision.id)
+        self.assertEqual(
+            (data['revision']['previous_revision_date'], data['revision']['period_start_date']),
+            ('2026-01-10', '2026-01-11'))
+        self.assertEqual(
+            data['product_items'],
+            [dict(item) for item in RevisionProductItemSerializer(
+                RevisionProductItem.objects.order_by('product__title'), many=True).data])
+        self.assertEqual(len(data['ingredient_items']), 2)
+        self.assertEqual(set(data['reports'][0]), set(RevisionReportSerializer.Meta.fields))
+        self.assertEqual(set(data['references']), {'locations', 'products', 'ingredients'})
+        self.assertEqual(data['references']['locations'], [{'id': self.location.id, 'title': 'Цех'}])
+        self.assertEqual(data['references']['ingredients'][0]['unit_display'], 'Килограммы')
+
+    def test_query_count_does_not_depend_on_rows(self):
+        for count in (2, 20):
+            self._add_rows(count)
+            # ревизия, предыдущая дата, три секции, три справочника
+            with self.assertNumQueries(8):
+                self._workspace()
+            # справочники из кэша
+            with self.assertNumQueries(5):
+                self._workspace()
+
+
+class QueryAuditCommandTests(TestCase):
+    """query_audit --seed на SQLite: проходит и откатывает синтетические данные."""
+
+    def test_seed_audit_rolls_back(self):
+        out = io.StringIO()
+
+        call_command('query_audit', '--seed', '--seed-revisions', '2', '--seed-ingredients', '5',
+                     '--seed-incomings', '20', stdout=out)
 
-# Create your tests here.
+        output = out.getvalue()
+        self.assertIn('== calculator: предыдущая ревизия', output)
+        self.assertIn('Полных проходов по большим таблицам нет', output)
+        for model in (Production, User, Location, Product, Revision, RevisionReport, Incoming):
+            self.assertFalse(model.objects.exists(), model.__name__)
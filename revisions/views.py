@@ -6,25 +6,36 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Revision, RevisionProductItem
-from products.models import Product
-from django.db import transaction
-
-try:
-    import openpyxl
-except ImportError:
-    openpyxl = None
+from django.conf import settings
+from core.tabular import TabularError
+from .services.item_import import ITEM_IMPORTERS, import_items_from_file
+from .viewsets import (
+    enqueue_import_response,
+    get_create_missing,
+    get_import_kind,
+    get_importable_revision,
+)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_excel_products(request):
     """
-    Загрузить продукты из Excel файла.
-    
+    Загрузить остатки ревизии из Excel (.xlsx) или CSV/TSV файла.
+
+    type: product (по умолчанию) или ingredient.
+    create_missing (по умолчанию 1): создать продукты, которых нет в
+    справочнике; create_missing=0 - вернуть их в unmatched для создания
+    синонимов.
     Ожидаемые колонки:
-    - Номенклатура (название продукта)
-    - Количество (количество в штуках)
+    - Номенклатура (название продукта / ингредиента)
+    - Количество (в штуках для продуктов, дробное для ингредиентов)
+
+    Ответ: count, created, updated, created_products, errors,
+    diagnostics (по строкам), unmatched, timings_ms.
+
+    Файлы больше IMPORT_SYNC_MAX_BYTES (или с async=1) ставятся в очередь:
+    ответ 202 с задачей, статус - GET /api/import-jobs/{id}/.
     """
     if 'file' not in request.FILES:
         return Response(
@@ -41,9 +52,8 @@ def upload_excel_products(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        revision = Revision.objects.get(id=revision_id)
-    except Revision.DoesNotExist:
+    revision = get_importable_revision(request.user, revision_id)
+    if revision is None:
         return Response(
             {'error': 'Ревизия не найдена'},
             status=status.HTTP_404_NOT_FOUND
@@ -55,73 +65,24 @@ def upload_excel_products(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    if not openpyxl:
+    kind = get_import_kind(request)
+    if kind not in ITEM_IMPORTERS:
         return Response(
-            {'error': 'Библиотека openpyxl не установлена'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': f'Неизвестный тип загрузки: {kind}'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        workbook = openpyxl.load_workbook(file)
-        sheet = workbook.active
-
-        # Найти заголовки
-        headers = {}
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=1, max_row=10, values_only=True), 1):
-            for col_idx, cell_value in enumerate(row, 1):
-                if cell_value:
-                    cell_str = str(cell_value).strip().lower()
-                    if 'номенклатура' in cell_str or 'наименование' in cell_str:
-                        headers['product'] = col_idx
-                    elif 'количество' in cell_str:
-                        headers['quantity'] = col_idx
-
-        if 'product' not in headers or 'quantity' not in headers:
-            return Response(
-                {'error': 'Не найдены необходимые колонки: Номенклатура и Количество'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    run_async = str(request.data.get('async', '')).lower() in ('1', 'true')
+    if run_async or file.size > settings.IMPORT_SYNC_MAX_BYTES:
+        return enqueue_import_response(request, revision)
 
-        # Обработать данные
-        count = 0
-        errors = []
-
-        with transaction.atomic():
-            for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), 2):
-                product_name = row[headers['product'] - 1] if headers['product'] <= len(row) else None
-                quantity = row[headers['quantity'] - 1] if headers['quantity'] <= len(row) else None
-
-                if not product_name or not quantity:
-                    continue
-
-                try:
-                    product_name = str(product_name).strip()
-                    quantity = int(float(quantity))
-
-                    # Найти или создать продукт
-                    product, created = Product.objects.get_or_create(
-                        title=product_name,
-                        defaults={'description': ''}
-                    )
-
-                    # Создать или обновить элемент ревизии
-                    RevisionProductItem.objects.update_or_create(
-                        revision=revision,
-                        product=product,
-                        defaults={'actual_quantity': quantity}
-                    )
-                    count += 1
-                except Exception as e:
-                    errors.append(f'Строка {row_idx}: {str(e)}')
-
-        return Response({
-            'success': True,
-            'count': count,
-            'errors': errors[:10] if errors else []
-        })
-
-    except Exception as e:
+    try:
+        options = {'create_missing': get_create_missing(request)} if kind == 'product' else {}
+        result = import_items_from_file(revision, file, name=file.name, kind=kind, **options)
+    except TabularError as e:
         return Response(
-            {'error': f'Ошибка при обработке файла: {str(e)}'},
+            {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    return Response({'success': True, **result})
@@ -3,12 +3,27 @@ ViewSets для REST API приложения revisions.
 """
 
 import logging
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Revision, RevisionProductItem, RevisionIngredientItem, RevisionReport
+from core.db_router import ReplicaReadMixin
+from core.export import StreamingExportMixin
+from core.fast_read import ValuesListMixin
+from core.serializers import SparsePrefetchMixin
+from .models import (
+    Revision,
+    RevisionProductItem,
+    RevisionIngredientItem,
+    RevisionReport,
+    ImportJob,
+    REPORT_STATUS_CHOICES,
+)
 
 logger = logging.getLogger(__name__)
 from .serializers import (
@@ -17,24 +32,43 @@ from .serializers import (
     RevisionProductItemSerializer,
     RevisionIngredientItemSerializer,
     RevisionReportSerializer,
+    BulkProductItemRowSerializer,
+    BulkIngredientItemRowSerializer,
+    ImportJobSerializer,
 )
-from .services import RevisionCalculator
+from .services import RevisionCalculator, build_revision_summaries, build_revision_summary
+from .services.revision_summary import DEFAULT_TOP_CRITICAL, MAX_TOP_CRITICAL
+from .services.item_upsert import upsert_product_items, upsert_ingredient_items
+from .services.workspace import build_revision_workspace
+from .services.sales_fill import fill_product_items_from_sales, preview_sales_fill
+from .services.import_jobs import ImportJobError, enqueue_import_job
+from .services.archive import get_archived_section
+from products.models import Product, Ingredient, CHOICES_UNIT
 
 
-class RevisionViewSet(viewsets.ModelViewSet):
+class RevisionViewSet(ReplicaReadMixin, SparsePrefetchMixin, viewsets.ModelViewSet):
     """ViewSet для управления ревизиями."""
 
     queryset = Revision.objects.all()
     serializer_class = RevisionSerializer
+    sparse_prefetches = {
+        'product_items': ('product_items__product',),
+        'ingredient_items': ('ingredient_items__ingredient',),
+        'reports': ('reports__ingredient',),
+    }
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ('location__title', 'author__username')
     ordering_fields = ('revision_date', 'created_at', 'status')
     ordering = ['-revision_date']
+    # retrieve переводит ревизию в processing, workspace - экран редактирования
+    replica_actions = ('list', 'summary', 'summaries')
+    MAX_SUMMARY_IDS = 200
+    MAX_BULK_ROWS = 2000
 
     def get_queryset(self):
         """Ограничить доступ по ролям и применить фильтрацию."""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('location', 'author')
         user = self.request.user
 
         # Фильтр по производству
@@ -69,8 +103,11 @@ class RevisionViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         """Получить ревизию и автоматически изменить статус при просмотре."""
         instance = self.get_object()
-        user = request.user
-        
+        self._mark_processing_on_view(instance, request.user)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def _mark_processing_on_view(self, instance, user):
         # Автоматически изменить статус с "submitted" на "processing" 
         # при просмотре admin, manager, accounting
         if (hasattr(user, 'role') and 
@@ -78,9 +115,19 @@ class RevisionViewSet(viewsets.ModelViewSet):
             instance.status == 'submitted'):
             instance.status = 'processing'
             instance.save(update_fields=['status'])
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def workspace(self, request, pk=None):
+        """
+        Все данные для открытия ревизии одним запросом.
+
+        GET /api/revisions/{id}/workspace/
+        Ревизия, остатки продуктов и ингредиентов, отчеты и компактные
+        справочники производства (точки, продукты, номенклатура).
+        """
+        instance = self.get_object()
+        self._mark_processing_on_view(instance, request.user)
+        return Response(build_revision_workspace(instance))
 
     def get_serializer_class(self):
         """Использовать детальный serializer для retrieve."""
@@ -92,6 +139,20 @@ class RevisionViewSet(viewsets.ModelViewSet):
         """Установить текущего пользователя как автора."""
         serializer.save(author=self.request.user)
 
+    def _deny_archived(self, revision):
+        if revision.is_archived:
+            return Response(
+                {'error': 'Ревизия в архиве и доступна только для чтения'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+
+    def update(self, request, *args, **kwargs):
+        denied = self._deny_archived(self.get_object())
+        if denied:
+            return denied
+        return super().update(request, *args, **kwargs)
+
     def destroy(self, request, *args, **kwargs):
         """Удалить ревизию (запрещено для staff)."""
         user = request.user
@@ -100,6 +161,9 @@ class RevisionViewSet(viewsets.ModelViewSet):
                 {'error': 'Недостаточно прав для удаления ревизии'},
                 status=status.HTTP_403_FORBIDDEN
             )
+        denied = self._deny_archived(self.get_object())
+        if denied:
+            return denied
         return super().destroy(request, *args, **kwargs)
 
     @action(detail=True, methods=['post'])
@@ -111,6 +175,9 @@ class RevisionViewSet(viewsets.ModelViewSet):
         """
         revision = self.get_object()
         user = request.user
+        denied = self._deny_archived(revision)
+        if denied:
+            return denied
 
         # Сотрудник не рассчитывает ревизии — только отправляет на обработку
         if hasattr(user, 'role') and user.role == 'staff':
@@ -171,27 +238,168 @@ class RevisionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def _get_top_critical(self, request):
+        try:
+            top = int(request.query_params.get('top', DEFAULT_TOP_CRITICAL))
+        except (TypeError, ValueError):
+            top = DEFAULT_TOP_CRITICAL
+        return max(0, min(top, MAX_TOP_CRITICAL))
+
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """
         Получить сводку по ревизии.
 
-        GET /api/revisions/{id}/summary/
+        GET /api/revisions/{id}/summary/?top=5
         """
         revision = self.get_object()
+        return Response(build_revision_summary(revision.id, self._get_top_critical(request)))
+
+    @action(detail=False, methods=['get'])
+    def summaries(self, request):
+        """
+        Получить сводки сразу по нескольким ревизиям (для бейджей в списке).
+
+        GET /api/revisions/summaries/?ids=1,2,3&top=0
+        """
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            ids = {int(value) for value in raw_ids.split(',') if value.strip()}
+        except ValueError:
+            return Response(
+                {'error': 'Параметр ids должен содержать id ревизий через запятую'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > self.MAX_SUMMARY_IDS:
+            return Response(
+                {'error': f'Можно запросить не более {self.MAX_SUMMARY_IDS} ревизий за раз'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        visible_ids = self.get_queryset().filter(id__in=ids).values_list('id', flat=True)
+        summaries = build_revision_summaries(visible_ids, self._get_top_critical(request))
+        return Response({str(revision_id): summary for revision_id, summary in summaries.items()})
+
+    def _validate_bulk_rows(self, rows, row_serializer_class, key_field, model, production_id):
+        """
+        Провалидировать строки массовой записи.
+
+        Принадлежность производству проверяется одним запросом на все строки.
 
-        reports = RevisionReport.objects.filter(revision=revision)
+        Returns:
+            (valid_rows, errors)
+        """
+        validated = []
+        errors = []
+        for index, row in enumerate(rows):
+            serializer = row_serializer_class(data=row)
+            if serializer.is_valid():
+                validated.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        ids = {data[key_field] for _, data in validated}
+        allowed = model.objects.filter(id__in=ids)
+        if production_id:
+            allowed = allowed.filter(production_id=production_id)
+        allowed_ids = set(allowed.values_list('id', flat=True))
+
+        valid_rows = []
+        seen = set()
+        for index, data in validated:
+            object_id = data[key_field]
+            if object_id not in allowed_ids:
+                errors.append({
+                    'index': index,
+                    'errors': {key_field: ['Объект не найден или относится к другому производству']},
+                })
+                continue
+            if object_id in seen:
+                errors.append({
+                    'index': index,
+                    'errors': {key_field: ['Позиция указана в запросе повторно']},
+                })
+                continue
+            seen.add(object_id)
+            row = {f'{key_field}_id': object_id, 'actual_quantity': data['actual_quantity']}
+            if 'comments' in data:
+                row['comments'] = data['comments']
+            valid_rows.append(row)
+
+        errors.sort(key=lambda error: error['index'])
+        return valid_rows, errors
+
+    @action(detail=True, methods=['post'], url_path='items/bulk')
+    def bulk_items(self, request, pk=None):
+        """
+        Массово создать/обновить остатки продуктов и ингредиентов ревизии.
 
-        summary = {
-            'total_ingredients': reports.count(),
-            'ok_count': reports.filter(status='ok').count(),
-            'warning_count': reports.filter(status='warning').count(),
-            'critical_count': reports.filter(status='critical').count(),
-            'total_difference': sum(r.difference for r in reports),
-            'avg_percentage': sum(r.percentage for r in reports) / reports.count() if reports.count() > 0 else 0,
+        POST /api/revisions/{id}/items/bulk/
+        Body: {
+            "products": [{"product": 1, "actual_quantity": 10, "comments": "..."}],
+            "ingredients": [{"ingredient": 2, "actual_quantity": "1.250"}]
         }
+        """
+        revision = self.get_object()
+        denied = self._deny_archived(revision)
+        if denied:
+            return denied
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Некорректное тело запроса'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return Response(summary)
+        products = request.data.get('products') or []
+        ingredients = request.data.get('ingredients') or []
+        if not isinstance(products, list) or not isinstance(ingredients, list):
+            return Response(
+                {'error': 'Поля "products" и "ingredients" должны быть списками'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(products) + len(ingredients) > self.MAX_BULK_ROWS:
+            return Response(
+                {'error': f'Можно передать не более {self.MAX_BULK_ROWS} строк за раз'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        production_id = revision.location.production_id
+        product_rows, product_errors = self._validate_bulk_rows(
+            products, BulkProductItemRowSerializer, 'product', Product, production_id)
+        ingredient_rows, ingredient_errors = self._validate_bulk_rows(
+            ingredients, BulkIngredientItemRowSerializer, 'ingredient', Ingredient, production_id)
+
+        with transaction.atomic():
+            products_result = upsert_product_items(revision, product_rows)
+            ingredients_result = upsert_ingredient_items(revision, ingredient_rows)
+
+        return Response({
+            'success': not (product_errors or ingredient_errors),
+            'products': {**products_result, 'errors': product_errors},
+            'ingredients': {**ingredients_result, 'errors': ingredient_errors},
+        })
+
+    @action(detail=True, methods=['get', 'post'], url_path='fill-from-sales')
+    def fill_from_sales(self, request, pk=None):
+        """
+        Заполнить остатки продуктов ревизии из продаж кассы за период ревизии.
+
+        GET  /api/revisions/{id}/fill-from-sales/ - предпросмотр: отличия от
+             введенных вручную количеств, ничего не записывается
+        POST /api/revisions/{id}/fill-from-sales/ - записать (только черновик)
+        """
+        revision = self.get_object()
+        if request.method == 'GET':
+            return Response(preview_sales_fill(revision))
+
+        if revision.status != 'draft':
+            return Response(
+                {'error': 'Заполнять можно только ревизию со статусом "Черновик"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with transaction.atomic():
+            result = fill_product_items_from_sales(revision)
+        return Response({'success': not result['errors'], **result})
 
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
@@ -319,7 +527,54 @@ class RevisionViewSet(viewsets.ModelViewSet):
         })
 
 
-class RevisionProductItemViewSet(viewsets.ModelViewSet):
+def get_archived_revision(user, revision_id):
+    """Архивная ревизия, доступная пользователю, или None."""
+    try:
+        revision_id = int(revision_id)
+    except (TypeError, ValueError):
+        return None
+    queryset = Revision.objects.select_related('location', 'archive').filter(
+        id=revision_id, is_archived=True)
+    if not user.is_superuser:
+        queryset = queryset.filter(location__production_id=getattr(user, 'production_id', None))
+    if getattr(user, 'role', None) == 'staff':
+        queryset = queryset.filter(author=user)
+    return queryset.first()
+
+
+class ArchivedSectionMixin:
+    """
+    Mixin для ViewSet строк ревизии: list по ?revision=<id архивной
+    ревизии> отдается из RevisionArchive (в основной таблице строк уже
+    нет) в том же формате. Из параметров учитываются archive_filters,
+    порядок - как в API при архивации.
+    """
+
+    archive_section = None
+    archive_filters = ()
+
+    def get_archived_revision(self):
+        revision_id = self.request.query_params.get('revision')
+        if not revision_id:
+            return None
+        return get_archived_revision(self.request.user, revision_id)
+
+    def get_archived_rows(self, revision):
+        rows = get_archived_section(revision, self.archive_section)
+        for name in self.archive_filters:
+            value = self.request.query_params.get(name)
+            if value:
+                rows = [row for row in rows if str(row.get(name)) == value]
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        revision = self.get_archived_revision()
+        if revision is not None:
+            return Response(self.get_archived_rows(revision))
+        return super().list(request, *args, **kwargs)
+
+
+class RevisionProductItemViewSet(ArchivedSectionMixin, viewsets.ModelViewSet):
     """ViewSet для элементов ревизии (продукты)."""
 
     queryset = RevisionProductItem.objects.all()
@@ -327,6 +582,8 @@ class RevisionProductItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filterset_fields = ('revision', 'product')
     search_fields = ('product__title',)
+    archive_section = 'product_items'
+    archive_filters = ('product',)
 
     def get_queryset(self):
         """Ограничить доступ по ролям."""
@@ -346,7 +603,7 @@ class RevisionProductItemViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class RevisionIngredientItemViewSet(viewsets.ModelViewSet):
+class RevisionIngredientItemViewSet(ArchivedSectionMixin, viewsets.ModelViewSet):
     """ViewSet для элементов ревизии (ингредиенты)."""
 
     queryset = RevisionIngredientItem.objects.all()
@@ -354,6 +611,8 @@ class RevisionIngredientItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filterset_fields = ('revision', 'ingredient')
     search_fields = ('ingredient__title',)
+    archive_section = 'ingredient_items'
+    archive_filters = ('ingredient',)
 
     def get_queryset(self):
         """Ограничить доступ по ролям."""
@@ -373,7 +632,8 @@ class RevisionIngredientItemViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class RevisionReportViewSet(viewsets.ReadOnlyModelViewSet):
+class RevisionReportViewSet(ReplicaReadMixin, ArchivedSectionMixin, ValuesListMixin, StreamingExportMixin,
+                            viewsets.ReadOnlyModelViewSet):
     """ViewSet для отчетов по ревизии (только чтение)."""
 
     queryset = RevisionReport.objects.all()
@@ -383,6 +643,44 @@ class RevisionReportViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('ingredient__title',)
     ordering_fields = ('percentage', 'status')
     ordering = ['-percentage']
+    export_filename = 'revision-reports'
+    archive_section = 'reports'
+    archive_filters = ('ingredient', 'status')
+    export_fields = (
+        ('id', 'id'),
+        ('revision', 'revision_id'),
+        ('revision_date', 'revision__revision_date'),
+        ('location_title', 'revision__location__title'),
+        ('ingredient', 'ingredient_id'),
+        ('ingredient_title', 'ingredient__title'),
+        ('unit_display', 'ingredient__unit', dict(CHOICES_UNIT).get),
+        ('expected_quantity', 'expected_quantity'),
+        ('actual_quantity', 'actual_quantity'),
+        ('difference', 'difference'),
+        ('percentage', 'percentage'),
+        ('status', 'status'),
+        ('status_display', 'status', dict(REPORT_STATUS_CHOICES).get),
+        ('created_at', 'created_at'),
+    )
+    ARCHIVE_DECIMAL_FIELDS = ('expected_quantity', 'actual_quantity', 'difference', 'percentage')
+
+    def get_export_rows(self, queryset):
+        revision = self.get_archived_revision()
+        if revision is None:
+            return super().get_export_rows(queryset)
+        return self._archived_export_rows(revision)
+
+    def _archived_export_rows(self, revision):
+        """Строки выгрузки архивной ревизии (в архиве числа и даты хранятся строками)."""
+        for row in self.get_archived_rows(revision):
+            row.update(revision_date=revision.revision_date, location_title=revision.location.title)
+            for name in self.ARCHIVE_DECIMAL_FIELDS:
+                if row.get(name) is not None:
+                    row[name] = Decimal(row[name])
+            if row.get('created_at'):
+                # Как у живой ревизии: значение из БД в UTC
+                row['created_at'] = parse_datetime(row['created_at']).astimezone(dt_timezone.utc)
+            yield {spec[0]: row.get(spec[0]) for spec in self.export_fields}
 
     def get_queryset(self):
         """Ограничить доступ по ролям."""
@@ -398,5 +696,114 @@ class RevisionReportViewSet(viewsets.ReadOnlyModelViewSet):
         # Сотрудник видит только свои ревизии
         if hasattr(user, 'role') and user.role == 'staff':
             queryset = queryset.filter(revision__author=user)
+
+        params = self.request.query_params
+
+        revision = params.get('revision')
+        if revision:
+            queryset = queryset.filter(revision_id=revision)
+
+        ingredient = params.get('ingredient')
+        if ingredient:
+            queryset = queryset.filter(ingredient_id=ingredient)
+
+        status_filter = params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
         
         return queryset
+
+
+def get_importable_revision(user, revision_id):
+    """Ревизия-черновик (не архивная), доступная пользователю для загрузки, или None."""
+    try:
+        revision_id = int(revision_id)
+    except (TypeError, ValueError):
+        return None
+    queryset = Revision.objects.select_related('location').filter(id=revision_id, is_archived=False)
+    if not user.is_superuser:
+        queryset = queryset.filter(location__production_id=getattr(user, 'production_id', None))
+    if getattr(user, 'role', None) == 'staff':
+        queryset = queryset.filter(author=user)
+    return queryset.first()
+
+
+def get_import_kind(request):
+    """Тип загрузки из поля type/kind: product (по умолчанию) или ingredient."""
+    return request.data.get('kind') or request.data.get('type') or 'product'
+
+
+def get_create_missing(request):
+    """
+    Создавать продукты, не найденные в справочнике (по умолчанию да, как
+    до появления синонимов). create_missing=0 - вернуть их в unmatched.
+    """
+    return str(request.data.get('create_missing', '1')).lower() in ('1', 'true', 'yes')
+
+
+def enqueue_import_response(request, revision):
+    """Поставить файл из request.FILES['file'] в очередь, ответ 202 со статусом задачи."""
+    try:
+        job, created = enqueue_import_job(
+            revision, request.FILES['file'], request.user, kind=get_import_kind(request),
+            create_missing=get_create_missing(request))
+    except ImportJobError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    data = ImportJobSerializer(job).data
+    return Response(
+        {'success': True, 'created': created, 'job': data},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Фоновые загрузки файлов в ревизию.
+
+    POST /api/import-jobs/  (multipart: file, revision, [kind=product|ingredient], [create_missing]) -> 202
+    GET  /api/import-jobs/{id}/ - статус и прогресс
+    """
+
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        """Ограничить доступ по ролям."""
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        if not user.is_superuser:
+            if getattr(user, 'production_id', None):
+                queryset = queryset.filter(revision__location__production_id=user.production_id)
+            else:
+                return queryset.none()
+
+        # Сотрудник видит только свои загрузки
+        if hasattr(user, 'role') and user.role == 'staff':
+            queryset = queryset.filter(author=user)
+
+        revision = self.request.query_params.get('revision')
+        if revision:
+            queryset = queryset.filter(revision_id=revision)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        if 'file' not in request.FILES:
+            return Response(
+                {'error': 'Файл не предоставлен'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        revision = get_importable_revision(request.user, request.data.get('revision'))
+        if revision is None:
+            return Response(
+                {'error': 'Ревизия не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if revision.status != 'draft':
+            return Response(
+                {'error': 'Можно загружать продукты только в ревизию со статусом "Черновик"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return enqueue_import_response(request, revision)
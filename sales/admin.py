@@ -4,7 +4,7 @@ Admin интерфейс для приложения sales.
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Location, Sales, Incoming, Inventory, IngredientInventory
+from .models import Location, Sales, SalesSyncCheckpoint, DailySalesRollup, Incoming, Inventory, IngredientInventory
 
 
 @admin.register(Location)
@@ -34,7 +34,7 @@ class SalesAdmin(admin.ModelAdmin):
     list_display = ('id', 'product', 'location',
                     'date', 'quantity', 'created_at')
     list_filter = ('location', 'date', 'product')
-    search_fields = ('product__title', 'location__title')
+    search_fields = ('product__title', 'location__title', 'moykassir_id')
     readonly_fields = ('created_at',)
     date_hierarchy = 'date'
 
@@ -53,6 +53,30 @@ class SalesAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(SalesSyncCheckpoint)
+class SalesSyncCheckpointAdmin(admin.ModelAdmin):
+    """Admin для состояния синхронизации продаж."""
+
+    list_display = ('source', 'cursor', 'rows_synced', 'last_synced_at', 'updated_at')
+    readonly_fields = ('rows_synced', 'last_synced_at', 'last_error', 'updated_at')
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    """Admin для сводки продаж по дням (только просмотр)."""
+
+    list_display = ('date', 'location', 'product', 'quantity', 'updated_at')
+    list_filter = ('location', 'date')
+    search_fields = ('product__title',)
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Incoming)
 class IncomingAdmin(admin.ModelAdmin):
     """Admin для поступлений ингредиентов."""
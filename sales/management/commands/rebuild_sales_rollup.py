@@ -0,0 +1,37 @@
+"""
+Management команда для полного пересчета сводки продаж по дням.
+
+Использование:
+    python manage.py rebuild_sales_rollup
+    python manage.py rebuild_sales_rollup --location 3 --date-from 2026-01-01 --date-to 2026-01-31
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.services.rollup import rebuild_daily_rollup
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        raise CommandError(f'Некорректная дата: {value} (ожидается ГГГГ-ММ-ДД)')
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводку продаж по дням (DailySalesRollup) из Sales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', type=int, default=None, help='ID точки')
+        parser.add_argument('--date-from', type=str, default=None, help='Начало периода (ГГГГ-ММ-ДД)')
+        parser.add_argument('--date-to', type=str, default=None, help='Конец периода (ГГГГ-ММ-ДД)')
+
+    def handle(self, *args, **options):
+        written = rebuild_daily_rollup(
+            location_id=options['location'],
+            date_from=_parse_date(options['date_from']),
+            date_to=_parse_date(options['date_to']),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Записано строк сводки: {written}'))
@@ -0,0 +1,61 @@
+"""
+Management команда для загрузки продаж из МойКассир.
+
+Использование:
+    python manage.py sync_moykassir
+    python manage.py sync_moykassir --max-pages 10
+    python manage.py sync_moykassir --reset
+    python manage.py sync_moykassir --file export.json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sales.services.moykassir import MoyKassirError, ingest_sales, sync_moykassir
+
+
+class Command(BaseCommand):
+    help = 'Загружает продажи из МойКассир в Sales (с места последней синхронизации)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=None,
+            help='Загрузить не больше указанного числа страниц'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Начать с первой страницы (сбросить сохраненный курсор)'
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            default=None,
+            help='Загрузить выгрузку из JSON файла ({"items": [...]} или список) вместо API'
+        )
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                payload = json.load(f)
+            items = payload.get('items', []) if isinstance(payload, dict) else payload
+            with transaction.atomic():
+                result = ingest_sales(items)
+            result['pages'] = 1
+        else:
+            try:
+                result = sync_moykassir(max_pages=options['max_pages'], reset=options['reset'])
+            except MoyKassirError as e:
+                raise CommandError(str(e))
+
+        for error in result['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"  строка {error['index']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Страниц: {result['pages']}, получено строк: {result['received']}, "
+            f"новых: {result['created']}, обновлено: {result['updated']}, "
+            f"пропущено: {result['skipped']}"
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+def blank_moykassir_id_to_null(apps, schema_editor):
+    # Пустая строка из ручного ввода иначе нарушит уникальность
+    Sales = apps.get_model('sales', 'Sales')
+    Sales.objects.filter(moykassir_id='').update(moykassir_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_reference_sync'),
+        ('sales', '0003_location_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesSyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True, verbose_name='Источник')),
+                ('cursor', models.CharField(blank=True, max_length=255, verbose_name='Курсор')),
+                ('rows_synced', models.PositiveBigIntegerField(default=0, verbose_name='Загружено строк всего')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя успешная загрузка')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Синхронизация продаж',
+                'verbose_name_plural': 'Синхронизация продаж',
+            },
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='moykassir_id',
+            field=models.CharField(blank=True, help_text='Ключ идемпотентной загрузки: уникален в пределах точки', max_length=100, null=True, verbose_name='ID из МойКассир'),
+        ),
+        migrations.RunPython(blank_moykassir_id_to_null, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sales',
+            constraint=models.UniqueConstraint(fields=('location', 'moykassir_id'), name='unique_sales_moykassir_id_per_location'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_rollup(apps, schema_editor):
+    Sales = apps.get_model('sales', 'Sales')
+    DailySalesRollup = apps.get_model('sales', 'DailySalesRollup')
+    totals = (
+        Sales.objects.values('location_id', 'product_id', 'date')
+        .annotate(total=models.Sum('quantity')).order_by()
+    )
+    DailySalesRollup.objects.bulk_create(
+        (DailySalesRollup(location_id=row['location_id'], product_id=row['product_id'],
+                          date=row['date'], quantity=row['total'])
+         for row in totals.iterator() if row['total']),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_reference_sync'),
+        ('sales', '0004_sales_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='День')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Продано за день (штук)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='sales.location', verbose_name='Точка производства')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Продажи за день',
+                'verbose_name_plural': 'Продажи по дням',
+                'indexes': [models.Index(fields=['product', 'date'], name='sales_daily_product_fcd81f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('location', 'date', 'product'), name='unique_daily_sales_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+    ]
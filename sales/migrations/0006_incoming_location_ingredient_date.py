@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_title_matching'),
+        ('sales', '0005_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incoming',
+            index=models.Index(fields=['location', 'ingredient', 'date'], name='sales_incom_locatio_80c0cf_idx'),
+        ),
+    ]
@@ -4,6 +4,8 @@
 Содержит:
 - Location - точка производства (пекарня, цех и т.д.)
 - Sales - продажи из МойКассир
+- SalesSyncCheckpoint - курсор последней загрузки продаж из кассы
+- DailySalesRollup - продажи по дням (точка, продукт, день)
 - Incoming - поступления ингредиентов/готовых продуктов
 - Inventory - текущие остатки по продуктам на точке
 """
@@ -43,6 +45,11 @@ class Location(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата обновления'
+    )
 
     class Meta:
         verbose_name = 'Точка производства'
@@ -77,6 +84,7 @@ class Sales(models.Model):
     moykassir_id = models.CharField(
         max_length=100,
         verbose_name='ID из МойКассир',
+        help_text='Ключ идемпотентной загрузки: уникален в пределах точки',
         blank=True,
         null=True
     )
@@ -97,11 +105,118 @@ class Sales(models.Model):
             models.Index(fields=['location', 'date']),
             models.Index(fields=['product', 'date']),
         ]
+        constraints = [
+            # NULL (ручной ввод) не участвует в уникальности
+            models.UniqueConstraint(
+                fields=['location', 'moykassir_id'],
+                name='unique_sales_moykassir_id_per_location'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Пустое значение из формы хранится как NULL (не участвует в уникальности)
+        if not self.moykassir_id:
+            self.moykassir_id = None
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.product.title} - {self.quantity}  ({self.date})"
 
 
+class SalesSyncCheckpoint(models.Model):
+    """
+    Состояние загрузки продаж из кассы (см. sales/services/moykassir.py).
+
+    cursor - курсор последней полностью загруженной страницы; сохраняется
+    в той же транзакции, что и строки страницы, поэтому прерванная
+    синхронизация продолжается с места остановки без дублей.
+    """
+
+    source = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Источник'
+    )
+    cursor = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Курсор'
+    )
+    rows_synced = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Загружено строк всего'
+    )
+    last_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя успешная загрузка'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Синхронизация продаж'
+        verbose_name_plural = 'Синхронизация продаж'
+
+    def __str__(self):
+        return f"{self.source}: {self.cursor or '-'}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Сводка продаж за день по точке и продукту.
+
+    Поддерживается инкрементально (sales/services/rollup.py): загрузка
+    из кассы и сигналы Sales пересчитывают затронутые (точка, день).
+    Полный пересчет - команда rebuild_sales_rollup.
+    """
+
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Точка производства'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Продукт'
+    )
+    date = models.DateField(
+        verbose_name='День'
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name='Продано за день (штук)'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Продажи за день'
+        verbose_name_plural = 'Продажи по дням'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['location', 'date', 'product'],
+                name='unique_daily_sales_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.location_id}/{self.product_id} {self.date}: {self.quantity}"
+
+
 class Incoming(models.Model):
     """
     Поступления ингредиентов на точку производства.
@@ -142,6 +257,10 @@ class Incoming(models.Model):
         verbose_name = 'Поступление'
         verbose_name_plural = 'Поступления'
         ordering = ['-date']
+        indexes = [
+            # Поступления ингредиента на точку за период (расчет ревизии)
+            models.Index(fields=['location', 'ingredient', 'date']),
+        ]
 
     def __str__(self):
         return (f"{self.ingredient.title}"
@@ -2,11 +2,14 @@
 Serializers для приложения sales.
 """
 
+from decimal import Decimal
+
 from rest_framework import serializers
+from core.serializers import SparseFieldsetModelSerializer
 from .models import Location, Sales, Incoming, Inventory, IngredientInventory
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(SparseFieldsetModelSerializer):
     """Serializer для Location."""
 
     class Meta:
@@ -47,6 +50,16 @@ class IncomingSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at',)
 
 
+class BulkIncomingRowSerializer(serializers.Serializer):
+    """Строка массовой записи поступлений (строка накладной)."""
+
+    ingredient = serializers.IntegerField()
+    location = serializers.IntegerField(required=False)
+    date = serializers.DateField(required=False)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=3, min_value=Decimal('0.001'))
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
 class InventorySerializer(serializers.ModelSerializer):
     """Serializer для Inventory."""
 
@@ -0,0 +1,3 @@
+"""
+Сервисы приложения sales.
+"""
@@ -0,0 +1,287 @@
+"""
+Импорт поступлений (Incoming) из файла: накладная поставщика или выгрузка склада.
+
+create_incomings - то же для строк JSON (POST /api/incoming/bulk/).
+
+Конвейер на генераторах: строки файла (core.tabular) -> разбор и
+проверка (_iter_incomings) -> пачки по BATCH_SIZE -> bulk_create.
+В памяти одновременно только одна пачка. Номенклатура и точки
+производства загружаются заранее двумя запросами, дальше число
+запросов зависит только от числа пачек. Все пачки пишутся в одной
+транзакции: файл либо загружается целиком (без строк с ошибками),
+либо не загружается совсем.
+"""
+
+import time
+from decimal import Decimal
+
+from django.db import transaction
+
+from core.tabular import (
+    TabularError, batched, iter_table_rows, max_field_value, parse_date, parse_decimal,
+)
+from products.matching import KIND_INGREDIENT, TitleMatcher, normalize_title
+from sales.models import Incoming, Location
+
+HEADER_SEARCH_ROWS = 10
+MAX_DIAGNOSTICS = 500
+BATCH_SIZE = 1000
+# Больше не помещается в колонку Incoming.quantity
+QUANTITY_MAX = max_field_value(Incoming._meta.get_field('quantity'))
+
+# Колонка -> слова в заголовке
+COLUMNS = {
+    'ingredient': ('ингредиент', 'номенклатура', 'наименование'),
+    'quantity': ('количество', 'кол-во'),
+    'date': ('дата',),
+    'location': ('точка', 'склад', 'локация'),
+    'comment': ('комментарий', 'примечание'),
+}
+REQUIRED_COLUMNS = ('ingredient', 'quantity')
+
+
+class IncomingImportError(TabularError):
+    """Файл не удалось разобрать (нет колонок, не таблица и т.п.)."""
+
+
+def _find_headers(rows):
+    """Найти строку заголовков. Возвращает (номер строки, {колонка: индекс})."""
+    for row_idx, row in enumerate(rows, 1):
+        headers = {}
+        for col_idx, cell_value in enumerate(row):
+            if not cell_value:
+                continue
+            cell_str = str(cell_value).strip().lower()
+            for column, words in COLUMNS.items():
+                if column not in headers and any(word in cell_str for word in words):
+                    headers[column] = col_idx
+                    break
+        if all(column in headers for column in REQUIRED_COLUMNS):
+            return row_idx, headers
+        if row_idx >= HEADER_SEARCH_ROWS:
+            break
+    raise IncomingImportError('Не найдены необходимые колонки: Номенклатура и Количество')
+
+
+class IncomingResolver:
+    """
+    Справочники производства для проверки поступлений: номенклатура по
+    id / названию / синониму (TitleMatcher) и точки по id / названию / коду.
+    Загружаются при создании, дальше строки проверяются без запросов.
+    """
+
+    def __init__(self, production_id=None):
+        self.ingredients = TitleMatcher(KIND_INGREDIENT, production_id)
+        locations = Location.objects.all()
+        if production_id:
+            locations = locations.filter(production_id=production_id)
+
+        self.location_ids = set()
+        self.location_keys = {}
+        for location_id, title, code in locations.values_list('id', 'title', 'code'):
+            self.location_ids.add(location_id)
+            self.location_keys.setdefault(normalize_title(code), location_id)
+            self.location_keys.setdefault(normalize_title(title), location_id)
+
+    def ingredient(self, value):
+        if isinstance(value, int):
+            return value if value in self.ingredients.ids else None
+        return self.ingredients.match(value)
+
+    def location(self, value):
+        if isinstance(value, int):
+            return value if value in self.location_ids else None
+        return self.location_keys.get(normalize_title(value))
+
+
+def _cell(row, headers, column):
+    index = headers.get(column)
+    if index is None or index >= len(row):
+        return None
+    return row[index]
+
+
+def _iter_incomings(rows, headers, first_row_idx, resolver, defaults, diagnostics, counters):
+    """Разобрать строки данных, отдавая Incoming (без сохранения)."""
+    for row_idx, row in enumerate(rows, first_row_idx):
+        name = _cell(row, headers, 'ingredient')
+        quantity = _cell(row, headers, 'quantity')
+        if not name and not quantity:
+            continue
+        counters['processed'] += 1
+
+        def error(message):
+            diagnostics.append({'row': row_idx, 'title': str(name or ''), 'status': 'error',
+                                'message': message})
+            counters['failed'] += 1
+
+        ingredient_id = resolver.ingredient(str(name)) if name else None
+        if ingredient_id is None:
+            error('Ингредиент не найден в справочнике' if name else 'Не указан ингредиент')
+            continue
+
+        try:
+            quantity = parse_decimal(quantity)
+        except (TypeError, ValueError):
+            error(f'Некорректное количество: {quantity}')
+            continue
+        if quantity <= 0:
+            error('Количество должно быть больше нуля')
+            continue
+        if quantity > QUANTITY_MAX:
+            error(f'Количество больше допустимого ({QUANTITY_MAX})')
+            continue
+        quantity = quantity.quantize(Decimal('0.001'))
+
+        location_value = _cell(row, headers, 'location')
+        if location_value:
+            location_id = resolver.location(str(location_value))
+            if location_id is None:
+                error(f'Точка не найдена: {location_value}')
+                continue
+        else:
+            location_id = defaults.get('location_id')
+            if location_id is None:
+                error('Не указана точка')
+                continue
+
+        date_value = _cell(row, headers, 'date')
+        if date_value:
+            try:
+                incoming_date = parse_date(date_value)
+            except ValueError:
+                error(f'Некорректная дата: {date_value}')
+                continue
+        else:
+            incoming_date = defaults.get('date')
+            if incoming_date is None:
+                error('Не указана дата')
+                continue
+
+        yield Incoming(
+            ingredient_id=ingredient_id,
+            location_id=location_id,
+            date=incoming_date,
+            quantity=quantity,
+            comment=str(_cell(row, headers, 'comment') or defaults.get('comment') or ''),
+        )
+
+
+def import_incomings(rows, production_id=None, location_id=None, date=None, comment='') -> dict:
+    """
+    Загрузить поступления из строк таблицы.
+
+    Args:
+        rows: итератор строк (кортежи значений ячеек), включая заголовок
+        production_id: производство пользователя (None - без ограничения)
+        location_id / date / comment: значения для строк без своих колонок
+
+    Returns:
+        dict: created, rows_processed, rows_failed, errors, diagnostics,
+              unmatched (ненайденная номенклатура по группам), timings_ms.
+              При ошибках в строках ничего не сохраняется.
+
+    Raises:
+        TabularError: файл не удалось разобрать
+    """
+    started = time.perf_counter()
+    resolver = IncomingResolver(production_id)
+    if location_id is not None and int(location_id) not in resolver.location_ids:
+        raise IncomingImportError('Точка не найдена')
+    defaults = {
+        'location_id': int(location_id) if location_id is not None else None,
+        'date': parse_date(date) if date else None,
+        'comment': comment,
+    }
+    loaded_at = time.perf_counter()
+
+    diagnostics = []
+    counters = {'processed': 0, 'failed': 0}
+    created = 0
+    rows = iter(rows)
+    try:
+        header_row_idx, headers = _find_headers(rows)
+        incomings = _iter_incomings(rows, headers, header_row_idx + 1, resolver, defaults,
+                                    diagnostics, counters)
+        with transaction.atomic():
+            for batch in batched(incomings, BATCH_SIZE):
+                created += len(Incoming.objects.bulk_create(batch))
+            if counters['failed']:
+                transaction.set_rollback(True)
+                created = 0
+    finally:
+        close = getattr(rows, 'close', None)
+        if close:
+            close()
+    finished = time.perf_counter()
+
+    return {
+        'created': created,
+        'rows_processed': counters['processed'],
+        'rows_failed': counters['failed'],
+        'errors': [f"Строка {item['row']}: {item['message']}" for item in diagnostics[:MAX_DIAGNOSTICS]],
+        'diagnostics': diagnostics[:MAX_DIAGNOSTICS],
+        'unmatched': resolver.ingredients.unmatched_groups(MAX_DIAGNOSTICS),
+        'timings_ms': {
+            'load_reference': round((loaded_at - started) * 1000, 1),
+            'import': round((finished - loaded_at) * 1000, 1),
+            'total': round((finished - started) * 1000, 1),
+        },
+    }
+
+
+def create_incomings(rows, production_id=None, defaults=None, save=True) -> dict:
+    """
+    Массово создать поступления из провалидированных строк
+    (BulkIncomingRowSerializer.validated_data).
+
+    Номенклатура и точки проверяются двумя запросами на все строки,
+    запись - bulk_create в одной транзакции. Если хотя бы одна строка
+    не прошла проверку, ничего не сохраняется.
+
+    Args:
+        rows: список (индекс, validated_data)
+        production_id: производство пользователя (None - без ограничения)
+        defaults: location / date / comment для строк без своих значений
+        save: False - только проверить (в запросе уже есть ошибки разбора)
+
+    Returns:
+        dict: created (список Incoming), errors [{'index', 'errors'}]
+    """
+    defaults = defaults or {}
+    resolver = IncomingResolver(production_id)
+    incomings = []
+    errors = []
+    for index, data in rows:
+        row_errors = {}
+        if resolver.ingredient(data['ingredient']) is None:
+            row_errors['ingredient'] = ['Ингредиент не найден или относится к другому производству']
+        location_id = data.get('location', defaults.get('location'))
+        if location_id is None:
+            row_errors['location'] = ['Не указана точка']
+        elif resolver.location(location_id) is None:
+            row_errors['location'] = ['Точка не найдена или относится к другому производству']
+        incoming_date = data.get('date', defaults.get('date'))
+        if incoming_date is None:
+            row_errors['date'] = ['Не указана дата']
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+            continue
+        incomings.append(Incoming(
+            ingredient_id=data['ingredient'],
+            location_id=location_id,
+            date=incoming_date,
+            quantity=data['quantity'],
+            comment=data.get('comment') or defaults.get('comment') or '',
+        ))
+
+    if errors or not save:
+        return {'created': [], 'errors': errors}
+    with transaction.atomic():
+        created = Incoming.objects.bulk_create(incomings, batch_size=BATCH_SIZE)
+    return {'created': created, 'errors': []}
+
+
+def import_incomings_from_file(file, name=None, **kwargs) -> dict:
+    """Загрузить поступления из файла .xlsx / .csv / .tsv (см. import_incomings)."""
+    return import_incomings(iter_table_rows(file, name), **kwargs)
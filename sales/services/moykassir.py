@@ -0,0 +1,283 @@
+"""
+Загрузка продаж из кассы (МойКассир) в Sales.
+
+Два входа:
+- sync_moykassir() забирает выгрузку постранично по HTTP (команда
+  sync_moykassir), курсор последней загруженной страницы хранится в
+  SalesSyncCheckpoint;
+- ingest_sales() принимает уже полученные строки (POST /api/sales/ingest/).
+
+Формат строки выгрузки:
+    {"id": "чек-строка", "location_code": "L1", "product": "Багет",
+     "date": "2026-01-31" | "31.01.2026" | "2026-01-31T10:15:00", "quantity": 3}
+Страница API: {"items": [...], "next_cursor": "..." | null}.
+
+Точки сопоставляются по Location.code, продукты - по названию в
+производстве точки; справочники загружаются в память один раз на
+загрузку. Запись - upsert по (location, moykassir_id) через bulk_create
+пачками по BATCH_SIZE, поэтому повторная загрузка той же страницы
+не создает дублей. После записи пересчитывается сводка по дням
+(DailySalesRollup) для затронутых точек и дней.
+"""
+
+import logging
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.tabular import batched, max_field_value, parse_date, parse_decimal
+from products.matching import KIND_PRODUCT, TitleMatcher
+from sales.models import Location, Sales, SalesSyncCheckpoint
+from .rollup import refresh_daily_rollup
+
+logger = logging.getLogger(__name__)
+
+SOURCE = 'moykassir'
+BATCH_SIZE = 1000
+MAX_ERRORS = 200
+# Больше не помещается в колонку Sales.quantity
+QUANTITY_MAX = max_field_value(Sales._meta.get_field('quantity'))
+
+
+class MoyKassirError(Exception):
+    """Ошибка обращения к API кассы."""
+
+
+class MoyKassirClient:
+    """
+    Постраничный клиент выгрузки продаж.
+
+    GET {base_url}/sales?limit=<page_size>[&cursor=<cursor>]
+    Authorization: Bearer <token>
+    """
+
+    def __init__(self, base_url=None, token=None, page_size=None, timeout=None, session=None):
+        self.base_url = (base_url or settings.MOYKASSIR_API_URL).rstrip('/')
+        self.token = token if token is not None else settings.MOYKASSIR_API_TOKEN
+        self.page_size = page_size or settings.MOYKASSIR_PAGE_SIZE
+        self.timeout = timeout or settings.MOYKASSIR_TIMEOUT
+        self.session = session or requests.Session()
+        if not self.base_url:
+            raise MoyKassirError('Не задан MOYKASSIR_API_URL')
+
+    def fetch_page(self, cursor=''):
+        """Returns: (items, next_cursor или None)."""
+        params = {'limit': self.page_size}
+        if cursor:
+            params['cursor'] = cursor
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
+        try:
+            response = self.session.get(
+                f'{self.base_url}/sales', params=params, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise MoyKassirError(f'Ошибка запроса к МойКассир: {e}')
+        items = payload.get('items')
+        if not isinstance(items, list):
+            raise MoyKassirError('Некорректный ответ МойКассир: нет списка items')
+        return items, payload.get('next_cursor') or None
+
+
+class SalesResolver:
+    """
+    Точки по коду и продукты по названию / синониму. Точки загружаются
+    одним запросом, справочник продуктов (TitleMatcher) - при первой
+    строке каждого производства.
+    """
+
+    def __init__(self, production_id=None):
+        locations = Location.objects.all()
+        if production_id:
+            locations = locations.filter(production_id=production_id)
+        self.locations = {
+            code.strip().casefold(): (location_id, location_production_id)
+            for location_id, code, location_production_id
+            in locations.values_list('id', 'code', 'production_id')
+        }
+        self.matchers = {}
+
+    def location(self, code):
+        return self.locations.get(str(code).strip().casefold())
+
+    def product(self, production_id, title):
+        if production_id not in self.matchers:
+            self.matchers[production_id] = TitleMatcher(KIND_PRODUCT, production_id)
+        return self.matchers[production_id].match(title)
+
+    def unmatched_groups(self, limit=None) -> list:
+        groups = []
+        for production_id, matcher in self.matchers.items():
+            groups.extend({'production': production_id, **group} for group in matcher.unmatched_groups())
+        groups.sort(key=lambda group: -group['count'])
+        return groups[:limit] if limit is not None else groups
+
+
+def _parse_record(record, resolver):
+    """Строка выгрузки -> Sales (без сохранения). Ошибка - ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError('Строка должна быть объектом')
+    moykassir_id = str(record.get('id') or '').strip()
+    if not moykassir_id:
+        raise ValueError('Нет id')
+    if len(moykassir_id) > 100:
+        raise ValueError('Слишком длинный id')
+
+    location = resolver.location(record.get('location_code') or '')
+    if location is None:
+        raise ValueError(f"Точка не найдена: {record.get('location_code')}")
+    location_id, production_id = location
+
+    title = record.get('product')
+    product_id = resolver.product(production_id, title) if title else None
+    if product_id is None:
+        raise ValueError(f'Продукт не найден: {title}')
+
+    value = record.get('date')
+    if isinstance(value, str):
+        # Дата и время чека: '2026-01-31T10:15:00' / '31.01.2026 10:15'
+        value = value.replace('T', ' ').split(' ', 1)[0]
+    sale_date = parse_date(value) if value else None
+    if sale_date is None:
+        raise ValueError('Нет даты')
+
+    try:
+        quantity = parse_decimal(record.get('quantity'))
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError(f"Некорректное количество: {record.get('quantity')}")
+    if quantity != quantity.to_integral_value():
+        # Дробное количество не округляется молча: продажи в штуках
+        raise ValueError(f"Количество должно быть целым: {record.get('quantity')}")
+    if quantity < 0:
+        raise ValueError('Количество не может быть отрицательным')
+    if quantity > QUANTITY_MAX:
+        raise ValueError(f'Количество больше допустимого ({QUANTITY_MAX})')
+    quantity = int(quantity)
+
+    return Sales(product_id=product_id, location_id=location_id, date=sale_date,
+                 quantity=quantity, moykassir_id=moykassir_id)
+
+
+def _upsert(batch) -> dict:
+    """
+    Записать пачку Sales.
+
+    Returns:
+        {'created', 'updated', 'previous_days'}: previous_days - (точка, день)
+        обновленных строк до обновления (день продажи мог измениться)
+    """
+    # Повтор id в пачке: берется последняя строка (ON CONFLICT не обновляет строку дважды)
+    unique = {(sale.location_id, sale.moykassir_id): sale for sale in batch}
+    location_ids = {location_id for location_id, _ in unique}
+    existing = {}
+    for location_id, moykassir_id, day in Sales.objects.filter(
+        location_id__in=location_ids,
+        moykassir_id__in={moykassir_id for _, moykassir_id in unique},
+    ).values_list('location_id', 'moykassir_id', 'date'):
+        existing[(location_id, moykassir_id)] = day
+    Sales.objects.bulk_create(
+        unique.values(),
+        update_conflicts=True,
+        unique_fields=['location', 'moykassir_id'],
+        update_fields=['product', 'date', 'quantity'],
+    )
+    updated = len(existing.keys() & unique.keys())
+    return {
+        'created': len(unique) - updated,
+        'updated': updated,
+        'previous_days': {(key[0], day) for key, day in existing.items() if key in unique},
+    }
+
+
+def ingest_sales(records, production_id=None) -> dict:
+    """
+    Загрузить строки выгрузки кассы в Sales.
+
+    Строки с ошибками пропускаются и попадают в errors, остальные
+    записываются. Вызывать внутри transaction.atomic(), если загрузка
+    должна быть атомарной вместе с курсором.
+
+    Args:
+        records: итерируемые строки выгрузки (dict)
+        production_id: принимать только точки этого производства (None - все)
+
+    Returns:
+        dict: received, created, updated, skipped, errors, unmatched
+              (ненайденные продукты по группам),
+              affected - (location_id, date), для которых пересчитана сводка
+    """
+    resolver = SalesResolver(production_id)
+    result = {'received': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+    affected = set()
+
+    def parsed():
+        for index, record in enumerate(records):
+            result['received'] += 1
+            try:
+                sale = _parse_record(record, resolver)
+            except ValueError as e:
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_ERRORS:
+                    result['errors'].append({'index': index, 'error': str(e)})
+                continue
+            affected.add((sale.location_id, sale.date))
+            yield sale
+
+    for batch in batched(parsed(), BATCH_SIZE):
+        counts = _upsert(batch)
+        result['created'] += counts['created']
+        result['updated'] += counts['updated']
+        affected |= counts['previous_days']
+    refresh_daily_rollup(affected)
+    result['unmatched'] = resolver.unmatched_groups(MAX_ERRORS)
+    result['affected'] = affected
+    return result
+
+
+def sync_moykassir(client=None, max_pages=None, reset=False) -> dict:
+    """
+    Загрузить новые продажи из API кассы, начиная с сохраненного курсора.
+
+    Каждая страница пишется в отдельной транзакции вместе с курсором.
+
+    Returns:
+        dict: pages, received, created, updated, skipped, errors, cursor
+    """
+    client = client or MoyKassirClient()
+    checkpoint, _ = SalesSyncCheckpoint.objects.get_or_create(source=SOURCE)
+    if reset:
+        checkpoint.cursor = ''
+    totals = {'pages': 0, 'received': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+
+    cursor = checkpoint.cursor
+    while max_pages is None or totals['pages'] < max_pages:
+        try:
+            items, next_cursor = client.fetch_page(cursor)
+        except MoyKassirError as e:
+            checkpoint.last_error = str(e)
+            checkpoint.save(update_fields=['last_error', 'updated_at'])
+            raise
+
+        with transaction.atomic():
+            result = ingest_sales(items)
+            if next_cursor:
+                checkpoint.cursor = next_cursor
+            checkpoint.rows_synced += result['created'] + result['updated']
+            checkpoint.last_synced_at = timezone.now()
+            checkpoint.last_error = ''
+            checkpoint.save()
+
+        totals['pages'] += 1
+        for key in ('received', 'created', 'updated', 'skipped'):
+            totals[key] += result[key]
+        totals['errors'].extend(result['errors'][:MAX_ERRORS - len(totals['errors'])])
+        if not next_cursor:
+            break
+        cursor = next_cursor
+
+    totals['cursor'] = checkpoint.cursor
+    logger.info(f"МойКассир: страниц {totals['pages']}, новых {totals['created']}, "
+                f"обновлено {totals['updated']}, пропущено {totals['skipped']}")
+    return totals
@@ -0,0 +1,162 @@
+"""
+Сводка продаж по дням (DailySalesRollup).
+
+Строка сводки - сумма Sales за (точка, продукт, день). После записи
+продаж пересчитываются только затронутые пары (точка, день):
+refresh_daily_rollup берет их продажи одним GROUP BY и заменяет строки
+сводки. Запросы периода и динамики читают сводку: объем работы
+зависит от числа дней и продуктов, а не от числа чеков.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+
+from core.tabular import batched
+from sales.models import DailySalesRollup, Sales
+
+# Пар (точка, день) на один запрос пересчета
+REFRESH_CHUNK = 500
+BATCH_SIZE = 1000
+# Период полного пересчета за один проход
+REBUILD_WINDOW_DAYS = 31
+
+
+def _pairs_filter(pairs):
+    dates_by_location = defaultdict(set)
+    for location_id, day in pairs:
+        dates_by_location[location_id].add(day)
+    condition = Q()
+    for location_id, dates in dates_by_location.items():
+        condition |= Q(location_id=location_id, date__in=dates)
+    return condition
+
+
+def _write(sales_queryset, rollup_queryset) -> int:
+    """Заменить строки сводки rollup_queryset суммами продаж sales_queryset."""
+    totals = (
+        sales_queryset
+        .values('location_id', 'product_id', 'date')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    rollup_queryset.delete()
+    written = 0
+    rows = (
+        DailySalesRollup(location_id=row['location_id'], product_id=row['product_id'],
+                         date=row['date'], quantity=row['total'])
+        for row in totals.iterator() if row['total']
+    )
+    for batch in batched(rows, BATCH_SIZE):
+        # Параллельный пересчет той же пары мог успеть вставить строку
+        DailySalesRollup.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['location', 'date', 'product'],
+            update_fields=['quantity', 'updated_at'],
+        )
+        written += len(batch)
+    return written
+
+
+def refresh_daily_rollup(pairs) -> int:
+    """
+    Пересчитать сводку для пар (location_id, date).
+
+    Returns:
+        число записанных строк сводки
+    """
+    written = 0
+    with transaction.atomic():
+        for chunk in batched(set(pairs), REFRESH_CHUNK):
+            condition = _pairs_filter(chunk)
+            written += _write(Sales.objects.filter(condition),
+                              DailySalesRollup.objects.filter(condition))
+    return written
+
+
+def rebuild_daily_rollup(location_id=None, date_from=None, date_to=None) -> int:
+    """
+    Полностью пересчитать сводку (по точке и/или периоду) окнами по
+    REBUILD_WINDOW_DAYS дней, каждое окно - своя транзакция.
+
+    Returns:
+        число записанных строк сводки
+    """
+    sales = Sales.objects.all()
+    if location_id:
+        sales = sales.filter(location_id=location_id)
+    if date_from:
+        sales = sales.filter(date__gte=date_from)
+    if date_to:
+        sales = sales.filter(date__lte=date_to)
+
+    bounds = sales.order_by().aggregate(first=Min('date'), last=Max('date'))
+    first, last = bounds['first'], bounds['last']
+    rollup = DailySalesRollup.objects.all()
+    if location_id:
+        rollup = rollup.filter(location_id=location_id)
+    if first is None:
+        # Продаж нет: убрать устаревшие строки сводки в этом диапазоне
+        if date_from:
+            rollup = rollup.filter(date__gte=date_from)
+        if date_to:
+            rollup = rollup.filter(date__lte=date_to)
+        rollup.delete()
+        return 0
+
+    # Дни диапазона до первой и после последней продажи
+    if date_from:
+        rollup.filter(date__gte=date_from, date__lt=first).delete()
+    else:
+        rollup.filter(date__lt=first).delete()
+    if date_to:
+        rollup.filter(date__gt=last, date__lte=date_to).delete()
+    else:
+        rollup.filter(date__gt=last).delete()
+
+    written = 0
+    start = first
+    while start <= last:
+        end = min(start + timedelta(days=REBUILD_WINDOW_DAYS - 1), last)
+        with transaction.atomic():
+            written += _write(sales.filter(date__gte=start, date__lte=end),
+                              rollup.filter(date__gte=start, date__lte=end))
+        start = end + timedelta(days=1)
+    return written
+
+
+def period_sales(location_id, start_date, end_date) -> dict:
+    """Продажи точки за период по сводке: {product_id: количество}."""
+    rows = (
+        DailySalesRollup.objects
+        .filter(location_id=location_id, date__gte=start_date, date__lte=end_date)
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    return {product_id: int(total) for product_id, total in rows if total}
+
+
+def daily_sales_series(location_ids, start_date, end_date, product_id=None):
+    """
+    Динамика продаж по дням из сводки.
+
+    Returns:
+        list[dict]: date, product (если задан product_id - только он), quantity
+    """
+    rollup = DailySalesRollup.objects.filter(
+        location_id__in=location_ids, date__gte=start_date, date__lte=end_date)
+    if product_id:
+        rollup = rollup.filter(product_id=product_id)
+    return [
+        {'date': day.isoformat(), 'product': product, 'quantity': int(total)}
+        for day, product, total in (
+            rollup.values('date', 'product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by('date', 'product_id')
+            .values_list('date', 'product_id', 'total')
+        )
+    ]
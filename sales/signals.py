@@ -0,0 +1,70 @@
+"""
+Сигналы приложения sales.
+
+Запись Location сбрасывает кэш справочников производства,
+удаление пишется в журнал для delta sync.
+
+Запись и удаление Sales по одной (админка, ручной ввод) пересчитывают
+сводку по дням после коммита. Загрузка из кассы пишет bulk_create и
+пересчитывает сводку сама.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from products.signals import record_deletion, schedule_reference_bump
+from .models import Location, Sales
+from .services.rollup import refresh_daily_rollup
+
+
+@receiver(post_save, sender=Location)
+def location_saved(sender, instance, **kwargs):
+    schedule_reference_bump(instance.production_id)
+
+
+@receiver(post_delete, sender=Location)
+def location_deleted(sender, instance, origin=None, **kwargs):
+    record_deletion(instance.production_id, 'location', instance.pk, origin)
+    schedule_reference_bump(instance.production_id)
+
+
+def schedule_rollup_refresh(pairs):
+    pairs = set(pairs)
+    transaction.on_commit(lambda: refresh_daily_rollup(pairs))
+
+
+@receiver(pre_save, sender=Sales)
+def sales_before_save(sender, instance, **kwargs):
+    # День и точка до изменения: их сводку тоже нужно пересчитать
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = (
+            Sales.objects.filter(pk=instance.pk).values_list('location_id', 'date').first()
+        )
+
+
+@receiver(post_save, sender=Sales)
+def sales_saved(sender, instance, **kwargs):
+    pairs = {(instance.location_id, instance.date)}
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        pairs.add(previous)
+    schedule_rollup_refresh(pairs)
+
+
+@receiver(post_delete, sender=Sales)
+def sales_deleted(sender, instance, origin=None, **kwargs):
+    # При удалении точки / продукта строки сводки удаляются каскадом
+    if getattr(origin, 'model', type(origin)) is not Sales:
+        return
+    # Удаление queryset: одна задача пересчета на все строки
+    pending = getattr(origin, '_rollup_pairs', None)
+    if pending is None:
+        pending = set()
+        try:
+            origin._rollup_pairs = pending
+        except AttributeError:
+            pass
+        transaction.on_commit(lambda: refresh_daily_rollup(pending))
+    pending.add((instance.location_id, instance.date))
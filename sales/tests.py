@@ -1,3 +1,228 @@
+import json
+import threading
+from datetime import date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products.models import Ingredient, Product
+from users.models import Production, User
+from .models import DailySalesRollup, Location, Incoming, IngredientInventory, Sales, SalesSyncCheckpoint
+from .serializers import IncomingSerializer, IngredientInventorySerializer
+from .services.incoming_import import import_incomings
+from .services.moykassir import MoyKassirClient, MoyKassirError, ingest_sales, sync_moykassir
+
+
+class ValuesListTests(TestCase):
+    """Быстрые списки должны совпадать с выводом serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        for index, unit in enumerate(['g', 'kg', 'pcs']):
+            ingredient = Ingredient.objects.create(
+                production=production, title=f'Ингредиент {index}', unit=unit)
+            Incoming.objects.create(
+                ingredient=ingredient,
+                location=location,
+                date=date(2026, 1, index + 1),
+                quantity=Decimal('1.5'),
+                comment='накладная',
+            )
+            IngredientInventory.objects.create(
+                ingredient=ingredient, location=location, quantity=Decimal('3.25'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_incoming_list_matches_serializer(self):
+        response = self.client.get('/api/incoming/')
+
+        self.assertEqual(response.status_code, 200)
+        expected = IncomingSerializer(Incoming.objects.all(), many=True).data
+        self.assertEqual(response.json(), [dict(item) for item in expected])
+
+    def test_ingredient_inventory_list_matches_serializer(self):
+        response = self.client.get('/api/ingredient-inventories/')
+
+        self.assertEqual(response.status_code, 200)
+        expected = IngredientInventorySerializer(
+            IngredientInventory.objects.order_by('ingredient__title'), many=True).data
+        self.assertEqual(response.json(), [dict(item) for item in expected])
+
+
+class IncomingImportTests(TestCase):
+    """Количество больше колонки Incoming.quantity - ошибка строки, а не DataError."""
+
+    def test_quantity_over_column_limit_is_row_error(self):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        location = Location.objects.create(production=production, title='Цех', code='C1')
+        Ingredient.objects.create(production=production, title='Мука', unit='kg')
+        rows = [
+            ('Номенклатура', 'Количество'),
+            ('Мука', '5'),
+            ('Мука', '10000000'),
+            ('Мука', '1e30'),
+        ]
+
+        result = import_incomings(rows, production.id, location_id=location.id, date='2026-01-31')
+
+        self.assertEqual((result['created'], result['rows_failed']), (0, 2))
+        self.assertTrue(all('больше допустимого' in error for error in result['errors']))
+        self.assertFalse(Incoming.objects.exists())
+
+
+class StubKassirHandler(BaseHTTPRequestHandler):
+    """Заглушка API кассы: страницы выгрузки по курсору."""
+
+    pages = {}
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        cursor = parse_qs(url.query).get('cursor', [''])[0]
+        type(self).requests.append((url.path, cursor, self.headers.get('Authorization')))
+        if cursor not in self.pages:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps(self.pages[cursor]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MoyKassirSyncTests(TestCase):
+    """Загрузка продаж из кассы через локальную заглушку API."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), StubKassirHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        other = Production.objects.create(name='Другая', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.location = Location.objects.create(production=production, title='Цех', code='C1')
+        Location.objects.create(production=other, title='Чужой цех', code='X1')
+        cls.bread = Product.objects.create(production=production, title='Багет')
+        cls.bun = Product.objects.create(production=production, title='Булочка')
+
+    def setUp(self):
+        StubKassirHandler.requests = []
+        StubKassirHandler.pages = {
+            '': {'items': [
+                {'id': 'r1', 'location_code': 'C1', 'product': 'багет', 'date': '2026-01-30', 'quantity': 3},
+                {'id': 'r2', 'location_code': 'c1', 'product': 'Булочка ', 'date': '30.01.2026', 'quantity': 5},
+            ], 'next_cursor': 'p2'},
+            'p2': {'items': [
+                {'id': 'r3', 'location_code': 'C1', 'product': 'Багет', 'date': '2026-01-31T09:00:00', 'quantity': 2},
+                {'id': 'r4', 'location_code': 'C1', 'product': 'Круассан', 'date': '2026-01-31', 'quantity': 1},
+                {'id': 'r5', 'location_code': 'X1', 'product': 'Багет', 'date': '2026-01-31', 'quantity': 1},
+            ], 'next_cursor': None},
+        }
+
+    def client_for_stub(self, page_size=2):
+        return MoyKassirClient(base_url=self.base_url, token='secret', page_size=page_size)
+
+    def test_sync_pages_and_checkpoint(self):
+        result = sync_moykassir(self.client_for_stub())
+
+        self.assertEqual(result['pages'], 2)
+        self.assertEqual((result['created'], result['updated'], result['skipped']), (3, 0, 2))
+        self.assertEqual(
+            sorted(Sales.objects.values_list('moykassir_id', 'product__title', 'quantity', 'date')),
+            [('r1', 'Багет', 3, date(2026, 1, 30)),
+             ('r2', 'Булочка', 5, date(2026, 1, 30)),
+             ('r3', 'Багет', 2, date(2026, 1, 31))],
+        )
+        checkpoint = SalesSyncCheckpoint.objects.get(source='moykassir')
+        self.assertEqual(checkpoint.cursor, 'p2')
+        self.assertEqual(checkpoint.rows_synced, 3)
+        self.assertEqual(StubKassirHandler.requests[0], ('/sales', '', 'Bearer secret'))
+
+    def test_resync_is_idempotent(self):
+        sync_moykassir(self.client_for_stub())
+        StubKassirHandler.pages['p2']['items'][0]['quantity'] = 7
+
+        result = sync_moykassir(self.client_for_stub())
+
+        # Продолжили с сохраненного курсора, строка обновлена, а не задублирована
+        self.assertEqual([cursor for _, cursor, _ in StubKassirHandler.requests], ['', 'p2', 'p2'])
+        self.assertEqual((result['created'], result['updated']), (0, 1))
+        self.assertEqual(Sales.objects.count(), 3)
+        self.assertEqual(Sales.objects.get(moykassir_id='r3').quantity, 7)
+
+    def test_sync_updates_daily_rollup(self):
+        sync_moykassir(self.client_for_stub())
+        # Строка r1 перенесена на другой день: старый день пересчитывается
+        StubKassirHandler.pages['p2']['items'].append(
+            {'id': 'r1', 'location_code': 'C1', 'product': 'Багет', 'date': '2026-01-31', 'quantity': 3})
+
+        sync_moykassir(self.client_for_stub())
+
+        self.assertEqual(
+            sorted(DailySalesRollup.objects.values_list('date', 'product__title', 'quantity')),
+            [(date(2026, 1, 30), 'Булочка', 5), (date(2026, 1, 31), 'Багет', 5)],
+        )
+
+    def test_failed_page_keeps_checkpoint(self):
+        del StubKassirHandler.pages['p2']
+
+        with self.assertRaises(MoyKassirError):
+            sync_moykassir(self.client_for_stub())
+
+        checkpoint = SalesSyncCheckpoint.objects.get(source='moykassir')
+        self.assertEqual(checkpoint.cursor, 'p2')
+        self.assertTrue(checkpoint.last_error)
+        self.assertEqual(Sales.objects.count(), 2)
+
+    def test_ingest_endpoint_is_limited_to_user_production(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        items = StubKassirHandler.pages['p2']['items']
+
+        response = client.post('/api/sales/ingest/', {'items': items}, format='json')
+        repeat = client.post('/api/sales/ingest/', {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['skipped']), (1, 2))
+        self.assertEqual((repeat.json()['created'], repeat.json()['updated']), (0, 1))
+        self.assertEqual(Sales.objects.count(), 1)
+
+    def test_ingest_rejects_fractional_and_oversized_quantities(self):
+        items = [
+            {'id': 'q1', 'location_code': 'C1', 'product': 'Багет', 'date': '2026-01-31', 'quantity': 2},
+            {'id': 'q2', 'location_code': 'C1', 'product': 'Багет', 'date': '2026-01-31', 'quantity': 2.5},
+            {'id': 'q3', 'location_code': 'C1', 'product': 'Багет', 'date': '2026-01-31',
+             'quantity': 2147483648},
+        ]
+
+        result = ingest_sales(items)
 
-# Create your tests here.
+        self.assertEqual((result['created'], result['skipped']), (1, 2))
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2])
+        self.assertEqual(list(Sales.objects.values_list('moykassir_id', 'quantity')), [('q1', 2)])
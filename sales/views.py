@@ -1,3 +1,105 @@
-from django.shortcuts import render
+"""
+Views приложения sales.
+"""
 
-# Create your views here.
+from datetime import date
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.db_router import read_from_replica
+from .models import Location
+from .services.moykassir import ingest_sales
+from .services.rollup import daily_sales_series
+
+MAX_INGEST_ROWS = 10000
+MAX_SERIES_DAYS = 366
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest_sales_view(request):
+    """
+    Принять выгрузку продаж кассы.
+
+    POST /api/sales/ingest/
+    Body: {"items": [{"id": "...", "location_code": "L1", "product": "Багет",
+                      "date": "2026-01-31", "quantity": 3}]}
+    Повторная отправка тех же id обновляет строки, а не дублирует их.
+    Принимаются только точки производства пользователя.
+    """
+    user = request.user
+    if getattr(user, 'role', None) == 'staff':
+        return Response(
+            {'error': 'Загружать продажи может только менеджер'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    production_id = getattr(user, 'production_id', None)
+    if not user.is_superuser and not production_id:
+        return Response(
+            {'error': 'Пользователь не привязан к производству'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    items = request.data.get('items') if isinstance(request.data, dict) else None
+    if not isinstance(items, list):
+        return Response(
+            {'error': 'Поле "items" должно быть списком'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > MAX_INGEST_ROWS:
+        return Response(
+            {'error': f'Можно передать не более {MAX_INGEST_ROWS} строк за раз'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    with transaction.atomic():
+        result = ingest_sales(items, production_id)
+    result.pop('affected')
+    return Response({'success': not result['errors'], **result})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def daily_sales_view(request):
+    """
+    Продажи по дням из сводки (для графиков и прогноза расхода).
+
+    GET /api/sales/daily/?date_from=2026-01-01&date_to=2026-01-31[&location=1][&product=2]
+    Без location - все точки производства пользователя.
+    Returns: [{"date", "product", "quantity"}]
+    """
+    params = request.query_params
+    try:
+        date_from = date.fromisoformat(params.get('date_from', ''))
+        date_to = date.fromisoformat(params.get('date_to', ''))
+    except ValueError:
+        return Response(
+            {'error': 'Укажите date_from и date_to в формате ГГГГ-ММ-ДД'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if date_from > date_to or (date_to - date_from).days >= MAX_SERIES_DAYS:
+        return Response(
+            {'error': f'Период должен быть не длиннее {MAX_SERIES_DAYS} дней'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    locations = Location.objects.all()
+    user = request.user
+    if not user.is_superuser:
+        production_id = getattr(user, 'production_id', None)
+        if not production_id:
+            return Response(
+                {'error': 'Пользователь не привязан к производству'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        locations = locations.filter(production_id=production_id)
+    if params.get('location'):
+        locations = locations.filter(id=params['location'])
+
+    with read_from_replica(user):
+        series = daily_sales_series(
+            locations.values('id'), date_from, date_to, product_id=params.get('product') or None)
+    return Response(series)
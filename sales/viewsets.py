@@ -1,18 +1,27 @@
 """ViewSets для REST API приложения sales."""
 
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from core.db_router import ReplicaReadMixin
+from core.export import StreamingExportMixin
+from core.fast_read import ValuesListMixin
+from core.reference_cache import ReferenceCacheListMixin
+from core.tabular import TabularError
+from products.models import CHOICES_UNIT
 from .models import Location, Incoming, IngredientInventory
 from .serializers import (
     LocationSerializer,
     IncomingSerializer,
     IngredientInventorySerializer,
+    BulkIncomingRowSerializer,
 )
+from .services.incoming_import import create_incomings, import_incomings_from_file
 
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ReferenceCacheListMixin, viewsets.ModelViewSet):
     """ViewSet для локаций."""
 
     queryset = Location.objects.all()
@@ -21,6 +30,7 @@ class LocationViewSet(viewsets.ModelViewSet):
     search_fields = ('title', 'code', 'address')
     ordering_fields = ('title', 'created_at')
     ordering = ['title']
+    reference_cache_name = 'locations'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -107,7 +117,7 @@ class LocationViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class IncomingViewSet(viewsets.ModelViewSet):
+class IncomingViewSet(ReplicaReadMixin, ValuesListMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """ViewSet для поступлений ингредиентов."""
 
     queryset = Incoming.objects.all()
@@ -116,6 +126,20 @@ class IncomingViewSet(viewsets.ModelViewSet):
     search_fields = ('ingredient__title', 'location__title')
     ordering_fields = ('date', 'created_at')
     ordering = ['-date']
+    export_filename = 'incoming'
+    export_fields = (
+        ('id', 'id'),
+        ('date', 'date'),
+        ('location', 'location_id'),
+        ('location_title', 'location__title'),
+        ('ingredient', 'ingredient_id'),
+        ('ingredient_title', 'ingredient__title'),
+        ('quantity', 'quantity'),
+        ('unit_display', 'ingredient__unit', dict(CHOICES_UNIT).get),
+        ('comment', 'comment'),
+        ('created_at', 'created_at'),
+    )
+    MAX_BULK_ROWS = 2000
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -166,8 +190,120 @@ class IncomingViewSet(viewsets.ModelViewSet):
         self._validate_production(self.request, serializer)
         serializer.save()
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Массово создать поступления (строки накладной).
+
+        POST /api/incoming/bulk/
+        Body: {
+            "location": 1, "date": "2026-01-31", "comment": "Накладная 15",
+            "items": [{"ingredient": 2, "quantity": "1.250"},
+                      {"ingredient": 3, "quantity": 4, "location": 2, "date": "2026-01-30"}]
+        }
+        location / date / comment верхнего уровня используются для строк без своих
+        значений. При ошибке хотя бы в одной строке ничего не сохраняется.
+        """
+        user = request.user
+        if not user.is_superuser and not getattr(user, 'production_id', None):
+            return Response(
+                {'error': 'Пользователь не привязан к производству'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(request.data, dict) or not isinstance(request.data.get('items'), list):
+            return Response(
+                {'error': 'Поле "items" должно быть списком'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        items = request.data['items']
+        if len(items) > self.MAX_BULK_ROWS:
+            return Response(
+                {'error': f'Можно передать не более {self.MAX_BULK_ROWS} строк за раз'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        defaults_serializer = BulkIncomingRowSerializer(partial=True, data={
+            key: request.data[key] for key in ('location', 'date', 'comment')
+            if request.data.get(key) not in (None, '')
+        })
+        if not defaults_serializer.is_valid():
+            return Response(
+                {'error': 'Некорректные значения по умолчанию', 'errors': defaults_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = BulkIncomingRowSerializer(data=item)
+            if serializer.is_valid():
+                rows.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        result = create_incomings(
+            rows, getattr(user, 'production_id', None), defaults_serializer.validated_data,
+            save=not errors)
+        errors = sorted(errors + result['errors'], key=lambda error: error['index'])
+        if errors:
+            return Response(
+                {'success': False, 'error': 'Поступления не сохранены: есть ошибки в строках',
+                 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'success': True, 'created': len(result['created']),
+             'ids': [incoming.id for incoming in result['created']]},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_file(self, request):
+        """
+        Загрузить поступления из файла (.xlsx / .csv / .tsv).
+
+        POST /api/incoming/import/  (multipart: file, [location], [date], [comment])
+        Колонки: Номенклатура, Количество, [Дата], [Точка], [Комментарий];
+        location / date используются для строк без своих значений.
+        При ошибках в строках ничего не сохраняется (ответ 400 с errors).
+        """
+        user = request.user
+        if not user.is_superuser and not getattr(user, 'production_id', None):
+            return Response(
+                {'error': 'Пользователь не привязан к производству'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if 'file' not in request.FILES:
+            return Response(
+                {'error': 'Файл не предоставлен'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file = request.FILES['file']
+        try:
+            result = import_incomings_from_file(
+                file,
+                name=file.name,
+                production_id=getattr(user, 'production_id', None),
+                location_id=request.data.get('location') or None,
+                date=request.data.get('date') or None,
+                comment=request.data.get('comment', ''),
+            )
+        except (TabularError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if result['rows_failed']:
+            return Response(
+                {'error': 'Файл содержит ошибки, поступления не загружены', **result},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'message': f"Загружено поступлений: {result['created']}", **result},
+            status=status.HTTP_201_CREATED
+        )
+
 
-class IngredientInventoryViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientInventoryViewSet(ReplicaReadMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для просмотра текущих остатков номенклатуры."""
 
     queryset = IngredientInventory.objects.select_related('ingredient', 'location')
@@ -27,9 +27,16 @@ until python manage.py migrate --noinput; do
   sleep 3
 done
 
+echo "Creating cache table (only for CACHE_BACKEND=db)..."
+python manage.py createcachetable
+
 echo "Collecting static..."
 python manage.py collectstatic --noinput
 
+echo "Starting import job sweeper..."
+# Подбирает загрузки, брошенные перезапущенным воркером (см. process_import_jobs)
+python manage.py process_import_jobs --loop "${IMPORT_JOB_SWEEP_SECONDS:-300}" &
+
 echo "Starting gunicorn..."
 exec gunicorn core.wsgi:application \
   --bind 0.0.0.0:${PORT:-8000} \
@@ -0,0 +1,128 @@
+"""
+Бэкенд аутентификации с кэшем пользователя.
+
+SessionAuthentication на каждый запрос загружает User по id из сессии,
+а обращения к user.production дают еще один запрос. CachedModelBackend
+хранит пользователя вместе с производством (select_related) в кэше,
+так что в установившемся режиме запрос не делает SQL для аутентификации.
+В пределах одного запроса пользователь и так кэшируется
+AuthenticationMiddleware (request.user ленивый и вычисляется один раз).
+
+В кэше лежат значения полей, а не pickle модели: пароль (его хеш) туда
+не попадает. Пользователь из кэша собирается с отложенным полем password
+и готовым хешем сессии (User.get_session_auth_hash), save() такого
+объекта пароль не затирает.
+
+Запись сбрасывается сигналами при сохранении/удалении User и Production
+и при выходе из системы (см. users/signals.py). QuerySet.update() сигналов
+не шлет: после массового изменения пользователей (например, блокировки
+через update(is_active=False)) вызывайте invalidate_user_context, иначе
+старые данные живут в кэше до USER_CONTEXT_CACHE_TIMEOUT.
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, 'USER_CONTEXT_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'USER_CONTEXT_CACHE_TIMEOUT', 300)
+
+
+def _user_key(user_id):
+    # v2: значения полей без пароля вместо pickle модели
+    return f'user-context:v2:{user_id}'
+
+
+def _field_values(instance, exclude=()):
+    return {field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields if field.attname not in exclude}
+
+
+def _from_values(model, values):
+    """Экземпляр модели из значений полей; недостающие поля - отложенные."""
+    return model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+
+def production_payload(user):
+    """Данные производства пользователя для фронтенда (staff не видит реквизиты)."""
+    production = getattr(user, 'production', None)
+    if not production:
+        return None
+    if getattr(user, 'role', None) == 'staff':
+        return None
+    return {
+        'id': production.id,
+        'unique_key': production.unique_key,
+        'name': production.name,
+        'city': production.city,
+        'legal_name': production.legal_name,
+        'inn': production.inn,
+    }
+
+
+def get_cached_user(user_id):
+    """User с загруженным production из кэша или БД. None, если нет такого."""
+    cache = _cache()
+    key = _user_key(user_id)
+    try:
+        context = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Кэш пользователей недоступен: {e}")
+        context = None
+    UserModel = get_user_model()
+    if context is not None:
+        user = _from_values(UserModel, context['user'])
+        if context['production'] is not None:
+            user.production = _from_values(user._meta.get_field('production').related_model,
+                                           context['production'])
+        user._session_auth_hash = context['session_auth_hash']
+        user._production_payload = context['payload']
+        return user
+
+    try:
+        user = UserModel._default_manager.select_related('production').get(pk=user_id)
+    except UserModel.DoesNotExist:
+        return None
+
+    payload = production_payload(user)
+    context = {
+        'user': _field_values(user, exclude=('password',)),
+        'production': _field_values(user.production) if user.production else None,
+        'session_auth_hash': user.get_session_auth_hash(),
+        'payload': payload,
+    }
+    try:
+        cache.set(key, context, timeout=_timeout())
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить пользователя {user_id} в кэш: {e}")
+    user._production_payload = payload
+    return user
+
+
+def invalidate_user_context(*user_ids):
+    """Удалить пользователей из кэша."""
+    if not user_ids:
+        return
+    try:
+        _cache().delete_many([_user_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Не удалось сбросить кэш пользователей {user_ids}: {e}")
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берет пользователя сессии из кэша."""
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
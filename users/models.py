@@ -154,3 +154,11 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username}, ({self.get_role_display()})"
+
+    def get_session_auth_hash(self):
+        # Пользователь из кэша сессии загружен без пароля (users/backends.py):
+        # хеш сессии посчитан при записи в кэш, пароль из БД не читается
+        cached = getattr(self, '_session_auth_hash', None)
+        if cached is not None and 'password' in self.get_deferred_fields():
+            return cached
+        return super().get_session_auth_hash()
@@ -0,0 +1,47 @@
+"""
+Сигналы приложения users.
+
+Сбрасывают кэш пользователей (см. users/backends.py) при изменении
+пользователя, его производства и при выходе из системы.
+"""
+
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .backends import invalidate_user_context
+from .models import Production, User
+
+
+def schedule_user_invalidation(*user_ids):
+    """
+    Сбросить кэш сразу и еще раз после коммита транзакции.
+
+    Повторный сброс не дает параллельному запросу закэшировать
+    данные, прочитанные до коммита.
+    """
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if user_ids:
+        invalidate_user_context(*user_ids)
+        transaction.on_commit(lambda: invalidate_user_context(*user_ids))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    schedule_user_invalidation(instance.pk)
+
+
+@receiver(post_save, sender=Production)
+@receiver(pre_delete, sender=Production)
+def production_changed(sender, instance, **kwargs):
+    # При удалении production у пользователей обнуляется через UPDATE
+    # без post_save, поэтому id собираются до удаления
+    schedule_user_invalidation(*instance.users.values_list('id', flat=True))
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        schedule_user_invalidation(user.pk)
@@ -1,3 +1,134 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core import metrics
+from core.throttling import REJECTED_METRIC
+from .backends import _user_key, get_cached_user
+from .models import Production, User
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'assistant_user': '2/min',
+        'assistant_ip': '10/min',
+        'assistant_production': '3/min',
+    },
+})
+class AssistantThrottleTests(TestCase):
+    """Отклоненные запросы одного пользователя не расходуют лимит производства."""
+
+    @classmethod
+    def setUpTestData(cls):
+        production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=production)
+        cls.colleague = User.objects.create_user(
+            'manager2', password='pass', role='manager', production=production)
+
+    def setUp(self):
+        cache.clear()
+
+    def _chat(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/assistant/chat/', {'message': 'привет'}, format='json').status_code
+
+    def _tokens(self, scope, ident):
+        tokens, _ = cache.get(f'throttle:{scope}:{ident}')
+        return tokens
+
+    def test_user_retries_do_not_drain_production_bucket(self):
+        statuses = [self._chat(self.user) for _ in range(5)]
+
+        self.assertEqual(statuses, [200, 200, 429, 429, 429])
+        self.assertEqual(self._chat(self.colleague), 200)
+        self.assertEqual(self._chat(self.colleague), 429)
+
+    def test_rejection_has_retry_after_and_debits_no_bucket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for _ in range(2):
+            client.post('/api/assistant/chat/', {'message': 'привет'}, format='json')
+
+        response = client.post('/api/assistant/chat/', {'message': 'привет'}, format='json')
+
+        self.assertEqual(response.status_code, 429)
+        # 2/min: токен пополняется за 30 секунд
+        self.assertIn(int(response['Retry-After']), range(29, 31))
+        production = f'production:{self.user.production_id}'
+        self.assertAlmostEqual(self._tokens('assistant_production', production), 1, delta=0.1)
+
+        self.assertEqual(self._chat(self.colleague), 200)
+        self.assertEqual(self._chat(self.colleague), 429)
+        # Отказ по ведру производства не списал токен из ведра коллеги
+        self.assertAlmostEqual(self._tokens('assistant_user', f'user:{self.colleague.pk}'), 1, delta=0.1)
+        counters = metrics.snapshot()
+        self.assertEqual(
+            (counters[REJECTED_METRIC], counters['throttle.assistant_user.rejected'],
+             counters['throttle.assistant_production.rejected'], counters['throttle.assistant_ip.rejected']),
+            (2, 1, 1, 0),
+        )
+
+
+class UserContextCacheTests(TestCase):
+    """Пользователь сессии в кэше: без пароля, сбрасывается при изменениях и выходе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.production = Production.objects.create(name='Пекарня', city='Москва', legal_name='ИП')
+        cls.user = User.objects.create_user(
+            'manager', password='pass', role='manager', production=cls.production)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.login(username='manager', password='pass')
+
+    def _cached(self):
+        return cache.get(_user_key(self.user.id))
+
+    def test_session_user_is_cached_without_password(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+
+        context = self._cached()
+        self.assertNotIn('password', context['user'])
+        self.assertNotIn(self.user.password, repr(context))
+        with self.assertNumQueries(0):
+            user = get_cached_user(self.user.id)
+            self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+            self.assertEqual(user.production.name, 'Пекарня')
+        # Сессия проверяется по хешу из кэша, пользователь не разлогинивается
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+
+    def test_cache_is_reset_on_user_and_production_save(self):
+        self.client.get('/api/auth/me/')
+        self.user.first_name = 'Анна'
+        self.user.save()
+        self.assertIsNone(self._cached())
+
+        self.client.get('/api/auth/me/')
+        self.production.name = 'Кондитерская'
+        self.production.save()
+        self.assertIsNone(self._cached())
+        self.assertEqual(get_cached_user(self.user.id).production.name, 'Кондитерская')
+
+    def test_cache_is_reset_on_logout(self):
+        self.client.get('/api/auth/me/')
+        self.assertIsNotNone(self._cached())
+
+        self.client.post('/api/auth/logout/')
+
+        self.assertIsNone(self._cached())
+
+    def test_saving_cached_user_keeps_password(self):
+        get_cached_user(self.user.id)
+        user = get_cached_user(self.user.id)  # из кэша, password отложен
+
+        user.first_name = 'Анна'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('pass'))
@@ -12,22 +12,14 @@ from rest_framework.response import Response
 from django.contrib.auth import authenticate, login, logout
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie
+from .backends import production_payload
 from .models import ProductionInvite, Production, User
 
 def _production_payload(user):
-    production = getattr(user, 'production', None)
-    if not production:
-        return None
-    if getattr(user, 'role', None) == 'staff':
-        return None
-    return {
-        'id': production.id,
-        'unique_key': production.unique_key,
-        'name': production.name,
-        'city': production.city,
-        'legal_name': production.legal_name,
-        'inn': production.inn,
-    }
+    # CachedModelBackend кладет готовые данные производства вместе с пользователем
+    if hasattr(user, '_production_payload'):
+        return user._production_payload
+    return production_payload(user)
 
 
 @api_view(['POST'])